@@ -0,0 +1,329 @@
+"""
+試合データの集計値（通算・対戦チーム別・年度別・ホーム/ビジター別）を保持する。
+
+集計値は「キー → Bucket（試合数・勝敗数・各カラムの合計など）」の形で持ち、
+試合の追加・編集・削除のたびに該当する Bucket に差分を足し引きするだけで更新する。
+このため /summary や /totals の集計部分は、履歴の長さに関係なく一定時間で求まる。
+
+別プロセス（他のgunicornワーカー）による書き込みなどで差分を追えなかった場合は、
+データバージョンの不一致を検知して次回参照時に全件から作り直す。
+作り直しは frame_buckets() で、行ごとのループではなくカラム単位の演算と groupby でまとめて行う。
+"""
+import math
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from metrics import stage
+
+
+RESULT_MAP = {'勝': 1, '敗': -1, '引分': 0}
+
+
+def _to_number(value):
+    """数値に変換できなければ None（pd.to_numeric(errors='coerce') 相当）"""
+    if value is None:
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(number) else number
+
+
+def _is_blank(value):
+    if value is None or value == '':
+        return True
+    try:
+        return bool(pd.isna(value))
+    except (TypeError, ValueError):
+        return False
+
+
+def parse_game_minutes(value):
+    """'3:05' や '3時間5分' 形式の試合時間を分に変換する。変換できなければ None"""
+    if _is_blank(value):
+        return None
+    m = re.match(r"(\d+)[^\d]?(\d+)?", str(value))
+    if not m:
+        return None
+    h = int(m.group(1))
+    mi = int(m.group(2)) if m.group(2) else 0
+    return h * 60 + mi
+
+
+def parse_attendance(value):
+    """'36,288人' や 36288.0 形式の入場者数を整数に変換する。変換できなければ None"""
+    if _is_blank(value):
+        return None
+    a = str(value).replace('人', '').replace(',', '').strip()
+    try:
+        return int(float(a))
+    except (TypeError, ValueError):
+        return None
+
+
+def game_minutes(values):
+    """parse_game_minutes() のSeries版（変換できない値は NaN）"""
+    parts = values.astype(str).str.extract(r'^(\d+)[^\d]?(\d+)?')
+    hours = pd.to_numeric(parts[0], errors='coerce')
+    minutes = pd.to_numeric(parts[1], errors='coerce').fillna(0)
+    return hours * 60 + minutes
+
+
+def attendance_values(values):
+    """parse_attendance() のSeries版（変換できない値は NaN）"""
+    text = values.astype(str).str.replace('人', '', regex=False).str.replace(',', '', regex=False).str.strip()
+    return np.trunc(pd.to_numeric(text, errors='coerce'))
+
+
+def _blank(values):
+    """_is_blank() のSeries版"""
+    return values.isna() | (values.astype(object) == '')
+
+
+def _column(df, col):
+    if col in df.columns:
+        return df[col]
+    return pd.Series(np.nan, index=df.index, dtype=object)
+
+
+def cumulative_results(results):
+    """勝ち+1・負け-1・それ以外0 の累積（先頭に0を付けたリスト）"""
+    if len(results) == 0:
+        return []
+    steps = results.map(RESULT_MAP).fillna(0).astype(np.int64)
+    return [0] + steps.cumsum().tolist()
+
+
+def current_streak(results):
+    """先頭から同じ結果が続く数と、その結果（results は新しい順）"""
+    if len(results) == 0:
+        return 0, None
+    first = results.iloc[0]
+    if _is_blank(first):
+        return 1, first
+    changed = results.ne(first).to_numpy()
+    return int(changed.argmax()) if changed.any() else len(results), first
+
+
+class Bucket:
+    """
+    1つの集計キーに対する累計値。
+    sums は数値カラムごとの合計（欠損・非数値は0扱い）。
+    """
+    __slots__ = ('games', 'win', 'lose', 'draw', 'sums',
+                 'time_total', 'time_count', 'att_total', 'att_count')
+
+    def __init__(self):
+        self.games = 0
+        self.win = 0
+        self.lose = 0
+        self.draw = 0
+        self.sums = {}
+        self.time_total = 0
+        self.time_count = 0
+        self.att_total = 0
+        self.att_count = 0
+
+    def apply(self, row, sign, numeric_columns):
+        self.games += sign
+        result = row.get('勝敗')
+        if result == '勝':
+            self.win += sign
+        elif result == '敗':
+            self.lose += sign
+        elif result == '引分':
+            self.draw += sign
+        for col in numeric_columns:
+            number = _to_number(row.get(col))
+            if number is not None:
+                self.sums[col] = self.sums.get(col, 0.0) + sign * number
+        # 試合時間_分 がない（移行前の）行は試合時間の文字列から求める
+        minutes = _to_number(row.get('試合時間_分'))
+        minutes = int(minutes) if minutes is not None else parse_game_minutes(row.get('試合時間'))
+        if minutes is not None:
+            self.time_total += sign * minutes
+            self.time_count += sign
+        attendance = parse_attendance(row.get('入場者数'))
+        if attendance is not None:
+            self.att_total += sign * attendance
+            self.att_count += sign
+
+    @classmethod
+    def from_totals(cls, totals, numeric_columns):
+        """frame_buckets() で集計した1行（games・win・…・各数値カラムの合計）から作る"""
+        bucket = cls()
+        for name in ('games', 'win', 'lose', 'draw', 'time_total', 'time_count', 'att_total', 'att_count'):
+            setattr(bucket, name, int(totals[name]))
+        bucket.sums = {col: float(totals[col]) for col in numeric_columns}
+        return bucket
+
+    def total(self, col):
+        return self.sums.get(col, 0.0)
+
+    def mean(self, col):
+        return self.total(col) / self.games if self.games > 0 else 0
+
+    def win_rate(self):
+        denominator = self.win + self.lose
+        return round(self.win / denominator, 3) if denominator > 0 else 0
+
+
+def frame_buckets(df, numeric_columns):
+    """
+    試合データ全体から MatchAggregates と同じ集計キーの {キー: Bucket} を作る。
+    数値ブロックの変換・試合時間/入場者数の解析・勝敗の判定はカラム単位で1回ずつ行い、
+    キーの種類ごとに groupby で合計する。
+    """
+    if df.empty:
+        return {}
+    numeric_columns = [col for col in numeric_columns if col in df.columns]
+    results = _column(df, '勝敗')
+    opponent = _column(df, '相手チーム')
+    dates = pd.to_datetime(_column(df, '日付'), errors='coerce')
+    home_away = _column(df, 'ホーム/ビジター')
+    team = _column(df, 'チーム名')
+
+    # 取り込み時に数値にしたカラム（試合時間_分・入場者数）はそのまま使い、
+    # 移行前の行だけ文字列から求める
+    minutes = pd.to_numeric(_column(df, '試合時間_分'), errors='coerce')
+    legacy = minutes.isna()
+    if legacy.any():
+        minutes = minutes.where(~legacy, game_minutes(_column(df, '試合時間')[legacy]))
+    attendance = _column(df, '入場者数')
+    if pd.api.types.is_numeric_dtype(attendance):
+        attendance = np.trunc(attendance.astype(float))
+    else:
+        attendance = attendance_values(attendance)
+    values = df[numeric_columns].apply(pd.to_numeric, errors='coerce').fillna(0.0)
+    values['games'] = 1
+    values['win'] = (results == '勝').astype(np.int64)
+    values['lose'] = (results == '敗').astype(np.int64)
+    values['draw'] = (results == '引分').astype(np.int64)
+    values['time_total'] = minutes.fillna(0)
+    values['time_count'] = minutes.notna().astype(np.int64)
+    values['att_total'] = attendance.fillna(0)
+    values['att_count'] = attendance.notna().astype(np.int64)
+
+    valid = ~_blank(results)
+    has_opponent = ~_blank(opponent)
+    dated = dates.notna()
+    filtered = valid & ~team.fillna('').astype(str).str.contains('その他', regex=False)
+    specs = [
+        (('all',), pd.Series(True, index=df.index), None),
+        (('dated',), dated, None),
+        (('valid',), valid, None),
+        (('filtered',), filtered, None),
+        ('opponent_all', has_opponent, opponent),
+        ('opponent', valid & has_opponent, opponent),
+        ('year', valid & dated, dates.dt.year),
+        ('home_away', dated & ~_blank(home_away), home_away),
+    ]
+    buckets = {}
+    for kind, mask, by in specs:
+        if not mask.any():
+            continue
+        selected = values[mask]
+        if by is None:
+            buckets[kind] = Bucket.from_totals(selected.sum(), numeric_columns)
+            continue
+        keys = by[mask]
+        if kind == 'year':
+            keys = keys.astype(np.int64)
+        for key, totals in selected.groupby(keys, sort=False).sum().iterrows():
+            buckets[(kind, key.item() if hasattr(key, 'item') else key)] = Bucket.from_totals(totals, numeric_columns)
+    return buckets
+
+
+class MatchAggregates:
+    """
+    試合データの集計状態。
+    ストレージの変更通知(MatchChange)を受け取って差分更新し、
+    バージョンが合わない場合は MatchDataCache から全件を読み直して作り直す。
+
+    集計キー:
+        ('all',)                 全試合
+        ('dated',)               日付が有効な試合
+        ('valid',)               勝敗が入っている試合
+        ('filtered',)            勝敗が入っていて、チーム名が「その他」でない試合
+        ('opponent_all', 相手)    全試合の対戦チーム別
+        ('opponent', 相手)        勝敗が入っている試合の対戦チーム別
+        ('year', 年)             勝敗が入っている試合の年度別
+        ('home_away', 区分)       日付が有効な試合のホーム/ビジター別
+    """
+    def __init__(self, cache, numeric_columns):
+        self.cache = cache
+        self.numeric_columns = list(numeric_columns)
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._version = None
+
+    def _keys(self, row):
+        keys = [('all',)]
+        result = row.get('勝敗')
+        opponent = row.get('相手チーム')
+        opponent = None if _is_blank(opponent) else opponent
+        if opponent is not None:
+            keys.append(('opponent_all', opponent))
+        date = pd.to_datetime(row.get('日付'), errors='coerce')
+        if not _is_blank(date):
+            keys.append(('dated',))
+            home_away = row.get('ホーム/ビジター')
+            if not _is_blank(home_away):
+                keys.append(('home_away', home_away))
+        if not _is_blank(result):
+            keys.append(('valid',))
+            if opponent is not None:
+                keys.append(('opponent', opponent))
+            if not _is_blank(date):
+                keys.append(('year', int(date.year)))
+            if 'その他' not in str(row.get('チーム名') or ''):
+                keys.append(('filtered',))
+        return keys
+
+    def _apply(self, row, sign):
+        for key in self._keys(row):
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = Bucket()
+            bucket.apply(row, sign, self.numeric_columns)
+            if bucket.games == 0 and len(key) > 1:
+                del self._buckets[key]
+
+    def _rebuild(self):
+        df, version = self.cache.get_with_version()
+        with stage('aggregate'):
+            self._buckets = frame_buckets(df, self.numeric_columns)
+        self._version = version
+
+    def on_change(self, change):
+        """ストレージの書き込み通知を受けて差分を反映する"""
+        with self._lock:
+            if change.removed is None or self._version != change.version_before:
+                # 差分を追えないので次回参照時に作り直す
+                self._version = None
+                return
+            for row in change.removed:
+                self._apply(row, -1)
+            for row in change.added:
+                self._apply(row, 1)
+            self._version = change.version_after
+
+    def _ensure_current(self):
+        if self._version is None or self._version != self.cache.version():
+            self._rebuild()
+
+    def bucket(self, *key):
+        """集計キーに対応する Bucket（存在しなければ空の Bucket）"""
+        with self._lock:
+            self._ensure_current()
+            return self._buckets.get(key) or Bucket()
+
+    def group(self, kind):
+        """kind（'opponent', 'year' など）ごとの {キー: Bucket} を返す"""
+        with self._lock:
+            self._ensure_current()
+            return {key[1]: bucket for key, bucket in self._buckets.items() if key[0] == kind}
@@ -1,23 +1,63 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, abort, g, Response
+from flask import before_render_template, template_rendered, get_flashed_messages
+from markupsafe import Markup
+import functools
+import hashlib
+import numpy as np
 import pandas as pd
 import os
 from datetime import datetime, timedelta
 
 import requests
-from bs4 import BeautifulSoup
+import click
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import re  # 正規表現モジュール
 import sys
-import traceback
-from get_match_url_from_schedule_patch import get_match_url_from_schedule
+import time
+from get_match_url_from_schedule_patch import get_match_url_from_schedule, get_schedule_index
+from box_score import BoxScoreError, SIDE_BY_HOME_AWAY, extract_player_stats, parse_box_html, pick_stats
+from storage import create_match_storage
+from http_client import get_client
+from box_cache import get_box_cache
+from job_queue import JobQueue, DONE, FAILED
+from match_cache import MatchDataCache
+from match_query import EQUALITY_FILTERS, MatchQuery, MatchQueryIndex
+from page_cache import RenderCache
+import exports
+import compression
+from compression import StaticAssets
+from aggregates import (Bucket, MatchAggregates, attendance_values, cumulative_results, current_streak, frame_buckets,
+                        game_minutes, parse_attendance, parse_game_minutes)
+from player_store import PlayerStatsStore
+from player_ledger import PlayerGameLedger
+import metrics
+from metrics import stage, scrape_failure
+from app_logging import debug_sampled, get_logger
+import profiler
 
 # Initialize the Flask application
 app = Flask(__name__)
+logger = get_logger(__name__)
 app.secret_key = 'your_secret_key_here' # Flaskのflashメッセージに必要
 
 # --- Application Configuration ---
 DATA_DIR = 'data'
 CSV_FILE = os.path.join(DATA_DIR, 'matches.csv')
 BACKUP_COUNTER_FILE = os.path.join(DATA_DIR, 'backup_counter.txt')
+BATTERS_CSV = os.path.join(DATA_DIR, 'batters_stats.csv')
+PITCHERS_CSV = os.path.join(DATA_DIR, 'pitchers_stats.csv')
+# 試合ごとの選手成績台帳（通算成績はこの台帳の集計結果）
+BATTER_GAMES_CSV = os.path.join(DATA_DIR, 'batters_games.csv')
+PITCHER_GAMES_CSV = os.path.join(DATA_DIR, 'pitchers_games.csv')
+# スクレイピング・記録ジョブの保存先とワーカー数（0 の場合はリクエスト内でその場で実行）
+JOBS_DB = os.path.join(DATA_DIR, 'jobs.db')
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+# 試合データの保存先（'sqlite' = data/matches.db（既定）, 'csv' = matches.csv を直接使う従来方式）
+# csv は1試合書き込むたびにファイル全体を書き直すので、履歴が増えると遅くなる。
+# sqlite のデータベースがまだない場合は、起動時に matches.csv の内容を1回だけ取り込む
+MATCH_STORAGE_BACKEND = os.environ.get('MATCH_STORAGE', 'sqlite')
+# 描画済みHTMLのキャッシュに保存する合計サイズの上限（バイト）
+RENDER_CACHE_BYTES = int(os.environ.get('RENDER_CACHE_BYTES', str(32 * 1024 * 1024)))
 
 # CSVファイルの定義を更新
 # 打者成績と投手成績の項目を明確に分離
@@ -28,8 +68,21 @@ CSV_HEADERS = [
     # 自チームの投手成績
     '自チーム_被本塁打', '自チーム_与四球', '自チーム_与死球', '自チーム_奪三振', '自チーム_与暴投', '自チーム_与ボーク',
     # 相手チームの打撃成績
-    '相手チーム_打数', '相手チーム_安打', '相手チーム_本塁打', '相手チーム_盗塁','試合時間','入場者数' , 'コメント'
+    '相手チーム_打数', '相手チーム_安打', '相手チーム_本塁打', '相手チーム_盗塁','試合時間','入場者数' , 'コメント',
+    # 試合時間を分にした値（集計用。画面には出さない）
+    '試合時間_分'
 ]
+# 整数で保存するカラム（取り込み時に変換する。既存のデータは flask migrate-match-columns で変換）
+INTEGER_COLUMNS = ['試合時間_分', '入場者数']
+# 全試合詳細に表示しないカラム
+HIDDEN_COLUMNS = ['試合時間_分']
+# 選手成績CSVのカラム
+BATTER_COLUMNS = ['選手名','チーム名','打数','安打','打点','盗塁','本塁打','三振','四球','死球','犠打','犠飛']
+# 投球回は 1/3 回単位なので整数のアウト数（投球アウト数）で持つ
+PITCHER_COLUMNS = ['選手名','チーム名','投球数','投球アウト数','打者数','被安打','被本塁打','与四球','与死球','奪三振','暴投','ボーク','失点']
+
+# 数値として扱わないカラム（これ以外のCSV_HEADERSは数値カラム）
+TEXT_COLUMNS = ['日付', 'チーム名', 'ホーム/ビジター', '相手チーム', '勝敗', 'URL', '試合時間', 'コメント']
 
 # Ensure the data directory exists and initialize the CSV file if it's new or empty
 if not os.path.exists(DATA_DIR):
@@ -37,6 +90,32 @@ if not os.path.exists(DATA_DIR):
 if not os.path.exists(CSV_FILE) or os.path.getsize(CSV_FILE) == 0:
     pd.DataFrame(columns=CSV_HEADERS).to_csv(CSV_FILE, index=False, encoding='utf-8-sig') # BOM付きUTF-8で保存
 
+# 試合データの読み書きはすべてこのストレージ経由で行う
+match_storage = create_match_storage(MATCH_STORAGE_BACKEND, DATA_DIR, CSV_HEADERS, csv_path=CSV_FILE,
+                                     integer_columns=INTEGER_COLUMNS)
+# 参照系のページはCSVを毎回パースせず、データバージョンで無効化されるキャッシュを使う
+match_cache = MatchDataCache(match_storage, TEXT_COLUMNS)
+# /summary・/totals 用の集計状態。書き込みのたびに差分だけ更新する
+match_aggregates = MatchAggregates(match_cache, [col for col in CSV_HEADERS if col not in TEXT_COLUMNS])
+match_storage.add_listener(match_aggregates.on_change)
+# 全試合詳細・試合結果一覧・/api/matches の絞り込みと並べ替え（並び順はデータバージョンごとに作る）
+match_index = MatchQueryIndex(match_cache)
+# 選手成績は (選手名, チーム名) キーで1試合分ずつまとめて加算する
+batter_store = PlayerStatsStore(BATTERS_CSV, BATTER_COLUMNS)
+pitcher_store = PlayerStatsStore(PITCHERS_CSV, PITCHER_COLUMNS)
+batter_ledger = PlayerGameLedger(BATTER_GAMES_CSV, batter_store)
+pitcher_ledger = PlayerGameLedger(PITCHER_GAMES_CSV, pitcher_store)
+# ページ・部分テンプレートの描画結果は、依存するデータのバージョンが変わるまで使い回す
+DATA_SOURCES = {
+    'matches': match_storage.version,
+    'players': lambda: (batter_store.version(), pitcher_store.version(),
+                        batter_ledger.version(), pitcher_ledger.version()),
+}
+render_cache = RenderCache(RENDER_CACHE_BYTES)
+match_storage.add_listener(lambda change: render_cache.invalidate('matches'))
+# static/ のフィンガープリントと事前圧縮したデータ
+static_assets = StaticAssets(app.static_folder)
+
 # バックアップカウンターの初期化
 def initialize_backup_counter():
     """バックアップカウンターファイルを初期化"""
@@ -75,15 +154,19 @@ def create_backup():
         backup_filename = f'matches_backup_{timestamp}.csv'
         backup_path = os.path.join(DATA_DIR, backup_filename)
         
+        # SQLiteの場合はCSV形式で書き出してバックアップとする
+        if MATCH_STORAGE_BACKEND != 'csv':
+            match_storage.export_csv(backup_path)
+            logger.info("バックアップを作成しました: %s", backup_filename)
         # ファイルが存在する場合のみバックアップを作成
-        if os.path.exists(CSV_FILE):
+        elif os.path.exists(CSV_FILE):
             import shutil
             shutil.copy2(CSV_FILE, backup_path)
-            print(f"バックアップを作成しました: {backup_filename}")
+            logger.info("バックアップを作成しました: %s", backup_filename)
         else:
-            print("matches.csvが見つからないため、バックアップを作成できませんでした。")
-    except Exception as e:
-        print(f"バックアップ作成中にエラーが発生しました: {e}")
+            logger.warning("matches.csvが見つからないため、バックアップを作成できませんでした。")
+    except Exception:
+        logger.exception("バックアップ作成中にエラーが発生しました")
 
 # Mapping for NPB team names: Key is the display name, Value is the NPB website's short name
 TEAM_NAME_MAPPING_NPB = {
@@ -163,13 +246,221 @@ def extract_match_stats(my_bat_tr, opp_pitch_tr, my_pitch_tr, opp_bat_tr):
     return my_stats
 
 
+# --- 計測（/metrics で Prometheus のテキスト形式を返す） ---
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def observe_request_duration(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        # ラベルはURLそのものではなくルートのパターン（/edit_match/<int:row_id> など）
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, route=route,
+                                        method=request.method, status=response.status_code)
+    return response
+
+def start_render_timer(sender, template, context, **extra):
+    g.render_started = time.perf_counter()
+
+def observe_render_duration(sender, template, context, **extra):
+    started = g.pop('render_started', None)
+    if started is not None:
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - started, stage='render')
+
+before_render_template.connect(start_render_timer, app)
+template_rendered.connect(observe_render_duration, app)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """
+    計測値を Prometheus のテキスト形式で返す。
+    認証はないので、公開する環境ではリバースプロキシの内側に置き、外からは /metrics に届かないようにする。
+    """
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+# --- プロファイル（X-Profile ヘッダー / ?_profile= または PROFILE_SAMPLE_RATE で有効。profiler.py 参照） ---
+@app.before_request
+def start_request_profiler():
+    if request.endpoint == 'static':
+        return
+    authorized = profiler.authorized(request.headers, request.args)
+    if authorized or profiler.sampled():
+        g.profiler = profiler.StackSampler().start()
+        g.profile_authorized = authorized
+
+def finish_request_profile():
+    """計測中なら止めて書き出し、パスを返す（計測していなければ None）"""
+    sampler = g.pop('profiler', None)
+    if sampler is None:
+        return None
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    return profiler.write_profile(sampler.stop(), f"{request.method}_{route}")
+
+@app.after_request
+def write_request_profile(response):
+    path = finish_request_profile()
+    # サーバー上のパスは、トークンでプロファイルを求めた（管理者の）リクエストにだけ返す
+    if path is not None and g.pop('profile_authorized', False):
+        response.headers['X-Profile-File'] = path
+    return response
+
+@app.teardown_request
+def stop_request_profiler(exc):
+    # ビューで例外が起きて after_request が呼ばれなかった場合も、サンプリングのスレッドを止める
+    finish_request_profile()
+
+def profiled_job(kind, handler):
+    """
+    ジョブの処理も PROFILE_SAMPLE_RATE の割合で計測する（スクレイピングはジョブで実行されるため）
+    """
+    def run(**params):
+        with profiler.profile(f"job_{kind}", enabled=profiler.sampled()):
+            return handler(**params)
+    return run
+
+# --- 描画キャッシュ（page_cache.py 参照）と条件付きリクエスト ---
+def data_version(*sources):
+    """sources（DATA_SOURCES のキー）の現在のバージョンをまとめたもの"""
+    return tuple(DATA_SOURCES[source]() for source in sources)
+
+def template_set_version():
+    """templates/ のファイルの内容から作るバージョン（テンプレートを変えたら ETag も変わるようにする）"""
+    digest = hashlib.sha256()
+    for root, _, files in sorted(os.walk(app.template_folder if os.path.isabs(app.template_folder)
+                                         else os.path.join(app.root_path, app.template_folder))):
+        for name in sorted(files):
+            with open(os.path.join(root, name), 'rb') as f:
+                digest.update(name.encode('utf-8') + b'\0' + f.read())
+    return digest.hexdigest()[:12]
+
+TEMPLATE_SET_VERSION = template_set_version()
+
+def page_etag(key, version):
+    """ページの ETag（URL・依存データのバージョン・テンプレート一式・static/ のフィンガープリントから作る）"""
+    static_version = tuple(static_assets.fingerprint(name) for name in sorted(os.listdir(app.static_folder)))
+    source = repr((key, version, TEMPLATE_SET_VERSION, static_version)).encode('utf-8')
+    return hashlib.sha256(source).hexdigest()[:32]
+
+def representation_etag(etag, encoding):
+    """圧縮したレスポンスは別の表現なので、ETag に圧縮方式を付ける"""
+    return f"{etag}-{encoding}" if encoding else etag
+
+def page_response(body, tag, encoding=None, status=200):
+    """cached_page のページを ETag 付きで返すレスポンス（304 のときは body なし）"""
+    response = Response(body, status=status, mimetype='text/html')
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    response.set_etag(tag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    return response
+
+def cached_page(*sources):
+    """
+    GET のページ全体の描画結果を、URL（クエリ文字列を含む）と sources のバージョンでキャッシュするデコレーター。
+    レスポンスには sources のバージョンから作った ETag を付け、If-None-Match が一致すれば描画せずに 304 を返す。
+    flash メッセージを表示する（または表示待ちの）リクエストでは、キャッシュも ETag も使わない。
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or '_flashes' in session:
+                return view(*args, **kwargs)
+            # バージョンは描画の前に取る（描画中に書き込まれたら、次のリクエストで描画し直される）
+            version = data_version(*sources)
+            key = ('page', request.full_path)
+            etag = page_etag(key, version)
+            encoding = compression.negotiate(request.accept_encodings)
+            tag = representation_etag(etag, encoding)
+            if request.if_none_match.contains(tag):
+                return page_response(None, tag, status=304)
+            if encoding is not None:
+                # 圧縮済みのデータがあれば、HTMLの文字列を経由せずにそのまま返す
+                body = render_cache.get(key + (encoding,), version)
+                if body is not None:
+                    return page_response(body, tag, encoding)
+            html = render_cache.get(key, version)
+            if html is None:
+                html = view(*args, **kwargs)
+                if not isinstance(html, str) or '_flashes' in session or get_flashed_messages():
+                    return html
+                render_cache.put(key, sources, version, html)
+            g.cached_page = (key, sources, version, etag)
+            return html
+        return wrapper
+    return decorator
+
+@app.after_request
+def compress_response(response):
+    """
+    HTML・JSON などを Accept-Encoding に合わせて圧縮する。
+    cached_page のページには ETag を付け、圧縮したデータも描画キャッシュに入れて使い回す。
+    """
+    page = g.pop('cached_page', None)
+    if page is not None and response.status_code == 200:
+        response.headers['Cache-Control'] = 'no-cache'
+    if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+            or 'Content-Encoding' in response.headers or not compression.compressible(response.mimetype)):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = compression.negotiate(request.accept_encodings)
+    if page is not None:
+        key, sources, version, etag = page
+        response.set_etag(representation_etag(etag, encoding))
+        if encoding is None:
+            return response
+        # ETag と表現を合わせるため、cached_page のページは小さくても圧縮する
+        body = render_cache.get_or_render(key + (encoding,), sources, version,
+                                          lambda: compression.compress(response.get_data(), encoding))
+    else:
+        if encoding is None or response.content_length is None or response.content_length < compression.MIN_SIZE:
+            return response
+        body = compression.compress(response.get_data(), encoding)
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+# --- 静的ファイル（フィンガープリント付きURL・事前圧縮） ---
+@app.url_defaults
+def add_static_fingerprint(endpoint, values):
+    """url_for('static', filename=...) に ?v=<フィンガープリント> を付ける"""
+    if endpoint == 'static' and 'filename' in values and 'v' not in values:
+        fingerprint = static_assets.fingerprint(values['filename'])
+        if fingerprint:
+            values['v'] = fingerprint
+
+def serve_static(filename):
+    """
+    static/ のファイルを事前圧縮したデータで返す。
+    URL のフィンガープリントが今の内容と一致すれば1年間キャッシュさせ（immutable）、そうでなければ毎回確認させる。
+    """
+    asset = static_assets.get(filename)
+    if asset is None:
+        return app.send_static_file(filename)
+    encoding = compression.negotiate(request.accept_encodings, tuple(asset.encoded))
+    response = Response(asset.encoded[encoding] if encoding else asset.data, mimetype=asset.mimetype)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.set_etag(representation_etag(asset.fingerprint, encoding))
+    if request.args.get('v') == asset.fingerprint:
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+app.view_functions['static'] = serve_static
+
 
 @app.route('/')
+@cached_page('matches')
 def top():
     """
     TOPページ（通算サマリーなど簡易情報）
     """
-    summary = analyze_matches(CSV_FILE)
+    summary = analyze_matches()
     return render_template('top.html', summary=summary)
 
 
@@ -178,15 +469,8 @@ def record():
     """
     試合記録ページ（フォーム＋記録一覧）
     """
-    import pandas as pd
-    def save_match_row(row, csv_path=CSV_FILE):
-        import pandas as pd
-        try:
-            df = pd.read_csv(csv_path, encoding='utf-8-sig')
-        except (FileNotFoundError, pd.errors.EmptyDataError):
-            df = pd.DataFrame(columns=row.keys())
-        df = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
-        df.to_csv(csv_path, index=False, encoding='utf-8-sig')
+    def save_match_row(row):
+        match_storage.insert(row)
         # バックアップカウンターを増やす
         increment_backup_counter()
 
@@ -214,94 +498,79 @@ def record():
                 '自チーム_打数': '', '自チーム_安打': '', '自チーム_本塁打': '', '自チーム_盗塁': '', '自チーム_四球': '', '自チーム_死球': '', '自チーム_三振': '',
                 '自チーム_被本塁打': '', '自チーム_与四球': '', '自チーム_与死球': '', '自チーム_奪三振': '', '自チーム_与暴投': '', '自チーム_与ボーク': '',
                 '相手チーム_打数': '', '相手チーム_安打': '', '相手チーム_本塁打': '', '相手チーム_盗塁': '',
-                '試合時間':'', '入場者数':'',
+                '試合時間':'', '入場者数':'', '試合時間_分': '',
                 'コメント': comment
             }
             save_match_row(row)
             return redirect(url_for('top'))
         else:
-            if request.method == 'POST':
-                target_date_str = request.form['target_date']
-                team_name_input = request.form['team_name']
-                comment = request.form.get('comment', '')
-
-                match_url, home_away_status = get_match_url_from_schedule(target_date_str, team_name_input)
-
-        if match_url and home_away_status:
-            success, message = scrape_and_record_match_from_url(match_url, team_name_input, home_away_status, comment)
-            if success:
-                flash(message, 'success')
-            else:
-                flash(message, 'error')
-        else:
-            flash(f"'{team_name_input}' の試合が {target_date_str} の日程ページで見つかりませんでした。", 'error')
-            
-        return redirect(url_for('top'))
+            # 日程・試合ページの取得と記録はジョブとして実行し、ここではすぐに返す
+            return enqueue_record_job(request.form['target_date'], request.form['team_name'],
+                                      request.form.get('comment', ''))
     teams = [
         "中日ドラゴンズ", "読売ジャイアンツ", "阪神タイガース", "広島東洋カープ",
         "横浜DeNAベイスターズ", "東京ヤクルトスワローズ",
         "オリックス・バファローズ", "福岡ソフトバンクホークス", "千葉ロッテマリーンズ",
         "東北楽天ゴールデンイーグルス", "北海道日本ハムファイターズ", "埼玉西武ライオンズ"
     ]
-    return render_template('record.html', teams=teams, today=datetime.today().strftime('%Y-%m-%d'))
+    # 保存済みの日程インデックスからその日の試合を表示する（ここでは通信しない）
+    target_date = request.args.get('date') or datetime.today().strftime('%Y-%m-%d')
+    try:
+        games = get_schedule_index().games_on(target_date)
+    except ValueError:
+        target_date = datetime.today().strftime('%Y-%m-%d')
+        games = get_schedule_index().games_on(target_date)
+    return render_template('record.html', teams=teams, today=target_date, games=games)
 
-@app.route('/summary')
-def summary():
+def match_page(default_sort):
+    """
+    クエリパラメータ（/api/matches と同じ）で絞り込んだ試合の1ページ分を返す。
+    一覧ページ用なので、不正な指定は flash で知らせて既定の条件で表示する。
+    戻り値: (MatchQuery, QueryPage)
+    """
+    try:
+        query = MatchQuery.from_args(request.args, default_sort=default_sort)
+    except ValueError as e:
+        flash(str(e), 'error')
+        query = MatchQuery.from_args({}, default_sort=default_sort)
+    return query, match_index.query(query)
+
+def render_summary_stats():
     """
-    通算成績ページ（試合数・勝敗・対戦チームごとの成績・全試合詳細）
+    通算成績ページの集計部分（試合数・勝敗・対戦チームごとの成績・年度ごとの成績・カテゴリ別合計）を描画する
     """
-    matches_path = os.path.join(DATA_DIR, 'matches.csv')
     try:
-        df = pd.read_csv(matches_path, encoding='utf-8-sig')
+        df = match_cache.get()
     except Exception:
         df = pd.DataFrame()
 
-    # --- 基本集計 ---
-    valid_df = df[df['勝敗'].notnull() & (df['勝敗'] != '')]
-    # コメント列のNaNを空文字に
-    if 'コメント' in df.columns:
-        df['コメント'] = df['コメント'].fillna('')
+    # --- 基本集計（差分更新される集計状態から取得） ---
+    valid = match_aggregates.bucket('valid')
     # 日付順に並べる（昇順）
     if '日付' in df.columns:
         df = df.copy()
         df['日付'] = pd.to_datetime(df['日付'], errors='coerce')
         df = df.sort_values('日付')
-    total_games = len(valid_df)
-    win_count = (valid_df['勝敗'] == '勝').sum()
-    lose_count = (valid_df['勝敗'] == '敗').sum()
-    draw_count = (valid_df['勝敗'] == '引分').sum()
-    denominator = win_count + lose_count
-    win_rate = round(win_count / denominator, 3) if denominator > 0 else 0
+    total_games = valid.games
+    win_count = valid.win
+    lose_count = valid.lose
+    draw_count = valid.draw
+    win_rate = valid.win_rate()
     # 累積勝敗リスト生成（全件・空欄0扱い）
-    result_map = {'勝': 1, '敗': -1, '引分': 0}
-    if '勝敗' in df.columns and len(df) > 0:
-        result_values = df['勝敗'].map(result_map).fillna(0).tolist()
-        cumulative_results = [0]
-        for v in result_values:
-            cumulative_results.append(cumulative_results[-1] + v)
-    else:
-        cumulative_results = []
+    cumulative = cumulative_results(df['勝敗']) if '勝敗' in df.columns else []
 
     # --- 対戦チームごとの試合数・勝率 ---
     vs_team_stats = []
-    if not valid_df.empty:
-        grouped = valid_df.groupby('相手チーム')
-        for team, group in grouped:
-            games = len(group)
-            win = (group['勝敗'] == '勝').sum()
-            lose = (group['勝敗'] == '敗').sum()
-            draw = (group['勝敗'] == '引分').sum()
-            denominator = win + lose
-            rate = round(win / denominator, 3) if denominator > 0 else 0
-            vs_team_stats.append({
-                'team': team,
-                'games': games,
-                'win': win,
-                'lose': lose,
-                'draw': draw,
-                'win_rate': rate
-            })
-        vs_team_stats = sorted(vs_team_stats, key=lambda x: x['games'], reverse=True)
+    for team, group in sorted(match_aggregates.group('opponent').items()):
+        vs_team_stats.append({
+            'team': team,
+            'games': group.games,
+            'win': group.win,
+            'lose': group.lose,
+            'draw': group.draw,
+            'win_rate': group.win_rate()
+        })
+    vs_team_stats = sorted(vs_team_stats, key=lambda x: x['games'], reverse=True)
 
     # --- カテゴリ別合計・平均テーブル用データ ---
     # 打撃成績カテゴリ
@@ -324,122 +593,42 @@ def summary():
     # 基本成績カテゴリ
     basic_columns = ['得点', '失点']
     
-    # 「その他」チームを除外したデータフレームを作成
-    filtered_df = valid_df.copy()
-    if 'チーム名' in filtered_df.columns:
-        filtered_df = filtered_df[~filtered_df['チーム名'].str.contains('その他', na=False)]
-    
-    # カテゴリ別の辞書を作成
-    batting_sum = {}
-    batting_avg = {}
-    pitching_sum = {}
-    pitching_avg = {}
-    opponent_sum = {}
-    opponent_avg = {}
-    basic_sum = {}
-    basic_avg = {}
-    
-    # 打撃成績の集計
-    for col in batting_columns:
-        if col in filtered_df.columns:
-            vals = pd.to_numeric(filtered_df[col], errors='coerce').fillna(0)
-            batting_sum[col.replace('自チーム_', '')] = int(vals.sum())
-            batting_avg[col.replace('自チーム_', '')] = round(vals.mean(), 2) if len(vals) > 0 else 0
-        else:
-            batting_sum[col.replace('自チーム_', '')] = '-'
-            batting_avg[col.replace('自チーム_', '')] = '-'
-    
-    # 投手成績の集計
-    for col in pitching_columns:
-        if col in filtered_df.columns:
-            vals = pd.to_numeric(filtered_df[col], errors='coerce').fillna(0)
-            pitching_sum[col.replace('自チーム_', '')] = int(vals.sum())
-            pitching_avg[col.replace('自チーム_', '')] = round(vals.mean(), 2) if len(vals) > 0 else 0
-        else:
-            pitching_sum[col.replace('自チーム_', '')] = '-'
-            pitching_avg[col.replace('自チーム_', '')] = '-'
-    
-    # 相手チーム成績の集計
-    for col in opponent_columns:
-        if col in filtered_df.columns:
-            vals = pd.to_numeric(filtered_df[col], errors='coerce').fillna(0)
-            opponent_sum[col.replace('相手チーム_', '')] = int(vals.sum())
-            opponent_avg[col.replace('相手チーム_', '')] = round(vals.mean(), 2) if len(vals) > 0 else 0
-        else:
-            opponent_sum[col.replace('相手チーム_', '')] = '-'
-            opponent_avg[col.replace('相手チーム_', '')] = '-'
-    
-    # 基本成績の集計
-    for col in basic_columns:
-        if col in filtered_df.columns:
-            vals = pd.to_numeric(filtered_df[col], errors='coerce').fillna(0)
-            basic_sum[col] = int(vals.sum())
-            basic_avg[col] = round(vals.mean(), 2) if len(vals) > 0 else 0
-        else:
-            basic_sum[col] = '-'
-            basic_avg[col] = '-'
+    # 「その他」チームを除外した試合の集計
+    filtered = match_aggregates.bucket('filtered')
+
+    def category_stats(columns, prefix=''):
+        sums = {}
+        avgs = {}
+        for col in columns:
+            key = col.replace(prefix, '') if prefix else col
+            sums[key] = int(filtered.total(col))
+            avgs[key] = round(filtered.mean(col), 2) if filtered.games > 0 else 0
+        return sums, avgs
+
+    batting_sum, batting_avg = category_stats(batting_columns, '自チーム_')
+    pitching_sum, pitching_avg = category_stats(pitching_columns, '自チーム_')
+    opponent_sum, opponent_avg = category_stats(opponent_columns, '相手チーム_')
+    basic_sum, basic_avg = category_stats(basic_columns)
     
     # 後方互換性のため、元のsum_dictとavg_dictも保持
     all_columns = batting_columns + pitching_columns + opponent_columns + basic_columns
-    sum_dict = {}
-    avg_dict = {}
-    for col in all_columns:
-        if col in filtered_df.columns:
-            vals = pd.to_numeric(filtered_df[col], errors='coerce').fillna(0)
-            sum_dict[col] = int(vals.sum())
-            avg_dict[col] = round(vals.mean(), 2) if len(vals) > 0 else 0
-        else:
-            sum_dict[col] = '-'
-            avg_dict[col] = '-'
+    sum_dict, avg_dict = category_stats(all_columns)
 
-    # 試合時間（平均・合計/分換算）
+    # 試合時間（平均・合計/分換算）と入場者数（平均・合計）は全試合が対象
+    overall = match_aggregates.bucket('all')
     avg_time = '-'
     sum_time = '-'
-    if '試合時間' in df.columns and not df['試合時間'].isnull().all():
-        import re
-        times = []
-        for t in df['試合時間'].dropna():
-            m = re.match(r"(\d+)[^\d]?(\d+)?", str(t))
-            if m:
-                h = int(m.group(1))
-                mi = int(m.group(2)) if m.group(2) else 0
-                times.append(h*60+mi)
-        if times:
-            avg_time = f"{int(sum(times)/len(times)//60)}時間{int(sum(times)/len(times)%60)}分"
-            total_min = sum(times)
-            sum_time = f"{total_min//60}時間{total_min%60}分"
-
-    # 入場者数（平均・合計/数値化）
+    if overall.time_count > 0:
+        avg_min = overall.time_total / overall.time_count
+        avg_time = f"{int(avg_min//60)}時間{int(avg_min%60)}分"
+        sum_time = f"{overall.time_total//60}時間{overall.time_total%60}分"
+
     avg_att = '-'
     sum_att = '-'
-    print(f"[DEBUG] 入場者数列の存在: {'入場者数' in df.columns}")
-    if '入場者数' in df.columns:
-        print(f"[DEBUG] 入場者数データ: {df['入場者数'].tolist()}")
-        print(f"[DEBUG] 入場者数が全てnull: {df['入場者数'].isnull().all()}")
-        if not df['入場者数'].isnull().all():
-            nums = []
-            for a in df['入場者数'].dropna():
-                a = str(a).replace('人','').replace(',','').strip()
-                print(f"[DEBUG] 処理中の入場者数: '{a}'")
-                try:
-                    # 浮動小数点数を整数に変換
-                    nums.append(int(float(a)))
-                except:
-                    print(f"[DEBUG] 数値変換失敗: '{a}'")
-                    continue
-            print(f"[DEBUG] 有効な入場者数: {nums}")
-            if nums:
-                avg_att = int(sum(nums)/len(nums))
-                sum_att = sum(nums)
-                print(f"[DEBUG] 平均入場者数: {avg_att}, 合計入場者数: {sum_att}")
-    
-    # デバッグ情報を削除して、最終的な値を確認
-    print(f"[DEBUG] 最終的なavg_att: {avg_att}")
-    print(f"[DEBUG] 最終的なsum_att: {sum_att}")
-
-    # --- 全試合詳細 ---
-    all_matches = df.to_dict(orient='records') if not df.empty else []
-    columns = list(df.columns) if not df.empty else []
+    if overall.att_count > 0:
+        avg_att = int(overall.att_total / overall.att_count)
+        sum_att = overall.att_total
+    logger.debug("入場者数 平均: %s 合計: %s", avg_att, sum_att)
 
     # --- 通算成績指標（「その他」チームを除外した計算） ---
     def safe_div(a, b):
@@ -479,48 +668,21 @@ def summary():
     opp_hr_rate_val = safe_div(opp_hr, opp_at_bats) if opp_at_bats else None
     opp_hr_rate = f"{round(opp_hr_rate_val*100,2)}%" if opp_hr_rate_val is not None else '-'
 
-    # all_matchesの日付を必ず文字列化
-    for m in all_matches:
-        if '日付' in m and m['日付'] is not None:
-            if hasattr(m['日付'], 'strftime'):
-                m['日付'] = m['日付'].strftime('%Y-%m-%d')
-            else:
-                m['日付'] = str(m['日付'])[:10]
-
     # --- 年度ごとの試合数・勝率集計 ---
     yearly_stats = []
-    if not valid_df.empty and '日付' in valid_df.columns:
-        # 日付から年度を抽出
-        valid_df_copy = valid_df.copy()
-        valid_df_copy['年度'] = pd.to_datetime(valid_df_copy['日付'], errors='coerce').dt.year
-        
-        # 年度ごとにグループ化して集計
-        yearly_grouped = valid_df_copy.groupby('年度')
-        for year, group in yearly_grouped:
-            if pd.isna(year):  # 年度が取得できない場合はスキップ
-                continue
-            
-            year_games = len(group)
-            year_win = (group['勝敗'] == '勝').sum()
-            year_lose = (group['勝敗'] == '敗').sum()
-            year_draw = (group['勝敗'] == '引分').sum()
-            year_denominator = year_win + year_lose
-            year_win_rate = round(year_win / year_denominator, 3) if year_denominator > 0 else 0
-            
-            # numpy型をPython標準型に変換
-            yearly_stats.append({
-                'year': int(year),
-                'games': int(year_games),
-                'win': int(year_win.item() if hasattr(year_win, 'item') else year_win),
-                'lose': int(year_lose.item() if hasattr(year_lose, 'item') else year_lose),
-                'draw': int(year_draw.item() if hasattr(year_draw, 'item') else year_draw),
-                'win_rate': float(year_win_rate)
-            })
-        
-        # 年度順にソート（新しい年度が上に）
-        yearly_stats = sorted(yearly_stats, key=lambda x: x['year'], reverse=True)
-
-    return render_template('summary.html',
+    for year, group in match_aggregates.group('year').items():
+        yearly_stats.append({
+            'year': int(year),
+            'games': int(group.games),
+            'win': int(group.win),
+            'lose': int(group.lose),
+            'draw': int(group.draw),
+            'win_rate': float(group.win_rate())
+        })
+    # 年度順にソート（新しい年度が上に）
+    yearly_stats = sorted(yearly_stats, key=lambda x: x['year'], reverse=True)
+
+    return render_template('summary_stats.html',
         total_games=total_games,
         win_count=win_count,
         lose_count=lose_count,
@@ -541,31 +703,48 @@ def summary():
         sum_time=sum_time,
         avg_att=avg_att,
         sum_att=sum_att,
-        matches=all_matches,
-        columns=columns,
         avg_batting=avg_batting,
         hr_rate=hr_rate,
         ops=ops,
         era=era,
         opp_avg=opp_avg,
         opp_hr_rate=opp_hr_rate,
-        cumulative_results=cumulative_results,
+        cumulative_results=cumulative,
         yearly_stats=yearly_stats
     )
 
+@app.route('/summary')
+@cached_page('matches')
+def summary():
+    """
+    通算成績ページ（集計部分と全試合詳細）
+    集計部分は試合データが変わるまで描画結果を使い回すので、全試合詳細のページ送りでは集計し直さない
+    """
+    stats_html = render_cache.get_or_render(('fragment', 'summary_stats'), ('matches',), data_version('matches'),
+                                            render_summary_stats)
+    # --- 全試合詳細（表示するページの分だけ渡す） ---
+    query, page = match_page('date')
+    columns = [col for col in page.rows.columns if col not in HIDDEN_COLUMNS and col != 'row_id'] if page.total else []
+    return render_template('summary.html',
+        stats_html=Markup(stats_html),
+        matches=page.records(columns, missing=''),
+        columns=columns,
+        page=page,
+        page_args=query.filter_args()
+    )
+
 @app.route('/edit_match/<int:row_id>', methods=['GET', 'POST'])
 def edit_match(row_id):
-    df = pd.read_csv(CSV_FILE, encoding='utf-8-sig')
-    if row_id < 0 or row_id >= len(df):
+    row = match_storage.get(row_id)
+    if row is None:
         flash('該当する試合データがありません', 'danger')
         return redirect(url_for('summary'))
     if request.method == 'POST':
         new_comment = request.form.get('comment', '').strip()
-        df.at[row_id, 'コメント'] = new_comment
-        df.to_csv(CSV_FILE, index=False, encoding='utf-8-sig')
+        match_storage.update(row_id, {'コメント': new_comment})
         flash('コメントを更新しました', 'success')
         return redirect(url_for('summary'))
-    comment = df.at[row_id, 'コメント'] if 'コメント' in df.columns else ''
+    comment = row.get('コメント', '')
     return render_template('edit_match.html', comment=comment)
 
 @app.route('/edit_match_by_date', methods=['GET', 'POST'])
@@ -586,83 +765,87 @@ def edit_match_by_date():
         flash('日付とチーム名が必要です', 'danger')
         return redirect(url_for('summary'))
     
-    df = pd.read_csv(CSV_FILE, encoding='utf-8-sig')
+    # 日付とチーム名で試合を特定（最初にマッチする行）
+    row_index = match_storage.find_row_id(date, team)
     
-    # 日付とチーム名で試合を特定
-    mask = (df['日付'] == date) & (df['チーム名'] == team)
-    matching_rows = df[mask]
-    
-    if len(matching_rows) == 0:
+    if row_index is None:
         flash('該当する試合データがありません', 'danger')
         return redirect(url_for('summary'))
     
-    # 最初のマッチする行を取得
-    row_index = matching_rows.index[0]
-    
     if request.method == 'POST':
         new_comment = request.form.get('comment', '').strip()
-        df.at[row_index, 'コメント'] = new_comment
-        df.to_csv(CSV_FILE, index=False, encoding='utf-8-sig')
+        match_storage.update(row_index, {'コメント': new_comment})
         flash('コメントを更新しました', 'success')
         return redirect(url_for('summary'))
     
-    comment = df.at[row_index, 'コメント'] if 'コメント' in df.columns else ''
+    row = match_storage.get(row_index)
+    comment = row.get('コメント', '') if row else ''
     return render_template('edit_match.html', comment=comment, date=date, team=team)
 
+def _scaled_rate(numerator, denominator, digits):
+    """
+    numerator / denominator を小数 digits 桁で四捨五入し、10**digits 倍した整数（分母が0の行は0）。
+    整数のまま計算するので、浮動小数点の丸め誤差で端数の扱いが変わることがない。
+    """
+    scale = 10 ** digits
+    valid = denominator > 0
+    den = denominator.where(valid, 1)
+    return ((2 * scale * numerator + den) // (2 * den)).where(valid, 0)
+
+def _rate(numerator, denominator, digits):
+    """numerator / denominator を小数 digits 桁で四捨五入した値。分母が0の行は '-'"""
+    return (_scaled_rate(numerator, denominator, digits) / 10 ** digits).astype(object).where(denominator > 0, '-')
+
+def add_batting_rates(df):
+    """
+    打者成績に 打率・出塁率・OPS をカラム単位の演算で付け加える（打数0の選手は '-'）
+    """
+    df = df.copy()
+    ab, h, hr = df['打数'], df['安打'], df['本塁打']
+    on_base = h + df['四球'] + df['死球']
+    obp_den = ab + df['四球'] + df['死球'] + (df['犠飛'] if '犠飛' in df.columns else 0)
+    tb = h + hr * 3  # 2塁打・3塁打データがなければ近似
+    df['打率'] = _rate(h, ab, 3)
+    df['出塁率'] = _rate(on_base, obp_den, 3)
+    # OPS = 出塁率 + 長打率（それぞれ小数3桁に丸めてから足す。出塁率が出せない場合は0）
+    ops = (_scaled_rate(on_base, obp_den, 3) + _scaled_rate(tb, ab, 3)) / 1000
+    df['OPS'] = ops.astype(object).where(ab > 0, '-')
+    return df
+
+def add_pitching_rates(df):
+    """
+    投手成績に 投球回（'5 2/3' 形式）・防御率・奪三振率 をカラム単位の演算で付け加える（投球回0の投手は '-'）
+    """
+    df = df.copy()
+    outs = df['投球アウト数']
+    thirds = outs % 3
+    df['投球回'] = (outs // 3).astype(str) + np.where(thirds > 0, ' ' + thirds.astype(str) + '/3', '')
+    # 9イニング = 27アウトあたり
+    df['防御率'] = _rate(df['失点'] * 27, outs, 2)
+    df['奪三振率'] = _rate(df['奪三振'] * 27, outs, 2)
+    return df
+
 @app.route('/players')
+@cached_page('players')
 def players():
     """
     選手通算成績ページ（打者・投手成績）
+    ?season=YYYY を付けるとその年の試合だけを台帳から集計して表示する
     """
-    import pandas as pd
-    batters_df = pd.read_csv('data/batters_stats.csv', encoding='utf-8-sig')
-    pitchers_df = pd.read_csv('data/pitchers_stats.csv', encoding='utf-8-sig')
+    season = request.args.get('season', '').strip()
+    if season.isdigit():
+        batters_df = batter_ledger.rollup(season=int(season))
+        pitchers_df = pitcher_ledger.rollup(season=int(season))
+    else:
+        season = ''
+        batters_df = batter_store.read_all()
+        pitchers_df = pitcher_store.read_all()
 
-    # 打者成績の計算
-    batters_stats = []
-    for row in batters_df.to_dict(orient='records'):
-        try:
-            ab = int(row.get('打数', 0))
-            h = int(row.get('安打', 0))
-            hr = int(row.get('本塁打', 0))
-            bb = int(row.get('四球', 0))
-            hbp = int(row.get('死球', 0))
-            sf = int(row.get('犠飛', 0)) if '犠飛' in row else 0
-            tb = h + hr * 3  # 2塁打・3塁打データがなければ近似
-            # 打率
-            row['打率'] = round(h / ab, 3) if ab > 0 else '-'
-            # 出塁率
-            obp_den = ab + bb + hbp + sf
-            row['出塁率'] = round((h + bb + hbp) / obp_den, 3) if obp_den > 0 else '-'
-            # OPS
-            slg = round(tb / ab, 3) if ab > 0 else 0
-            row['OPS'] = round((row['出塁率'] if isinstance(row['出塁率'], float) else 0) + slg, 3) if ab > 0 else '-'
-        except Exception:
-            row['打率'] = row['出塁率'] = row['OPS'] = '-'
-        batters_stats.append(row)
-
-    # 投手成績の計算
-    pitchers_stats = []
-    for row in pitchers_df.to_dict(orient='records'):
-        try:
-            ip_raw = str(row.get('投球回', '0'))
-            # 投球回が x.y 形式（例: 12.2 = 12回2/3）
-            if '.' in ip_raw:
-                ip_main, ip_frac = ip_raw.split('.')
-                ip = int(ip_main) + int(ip_frac) / 3
-            else:
-                ip = float(ip_raw)
-            runs = int(row.get('失点', 0))
-            so = int(row.get('奪三振', 0))
-            # 防御率
-            row['防御率'] = round(9 * runs / ip, 2) if ip > 0 else '-'
-            # 奪三振率
-            row['奪三振率'] = round(9 * so / ip, 2) if ip > 0 else '-'
-        except Exception:
-            row['防御率'] = row['奪三振率'] = '-'
-        pitchers_stats.append(row)
-
-    return render_template('players.html', batters_stats=batters_stats, pitchers_stats=pitchers_stats)
+    batters_stats = add_batting_rates(batters_df).to_dict(orient='records')
+    pitchers_stats = add_pitching_rates(pitchers_df).to_dict(orient='records')
+
+    return render_template('players.html', batters_stats=batters_stats, pitchers_stats=pitchers_stats,
+                           season=season, seasons=batter_ledger.seasons())
 
 
 
@@ -718,19 +901,9 @@ def record_manual_match():
         '勝敗': win_loss_away_team, 'URL': '手動入力', **default_stats
     }
 
-    new_data_df = pd.DataFrame([match_data_home_team, match_data_away_team])
-
     try:
-        existing_df = pd.read_csv(CSV_FILE, encoding='utf-8-sig')
-        # 既存データと結合する前に、重複する可能性のある古いデータを削除
-        existing_df = existing_df[~((existing_df['日付'] == date_str) & (existing_df['チーム名'].isin([home_team_input, away_team_input])))]
-        updated_df = pd.concat([existing_df, new_data_df], ignore_index=True)
-        updated_df.to_csv(CSV_FILE, index=False, encoding='utf-8-sig')
-        # バックアップカウンターを増やす
-        increment_backup_counter()
-        flash("試合結果を手動で記録しました！", 'success')
-    except (FileNotFoundError, pd.errors.EmptyDataError):
-        new_data_df.to_csv(CSV_FILE, index=False, encoding='utf-8-sig')
+        # 重複する可能性のある古いデータ（同日・同チーム）は置き換える
+        match_storage.insert_many([match_data_home_team, match_data_away_team], replace=True)
         # バックアップカウンターを増やす
         increment_backup_counter()
         flash("試合結果を手動で記録しました！", 'success')
@@ -740,126 +913,37 @@ def record_manual_match():
     return redirect(url_for('top'))
 
 
-def scrape_and_record_match_from_url(match_url, selected_team_full_name, home_away_status, comment=None):
+def fetch_box_html(match_url):
     """
-    指定されたURLから試合データをスクレイピングし、CSVに記録する。
-    ホーム/ビジターとdivのIDに基づく新しいロジックで実装。
+    box.htmlを1回だけ取得して (絶対URL, HTML文字列) を返す。
     """
-    import os
-    import pandas as pd
-    import requests
-    from bs4 import BeautifulSoup
-    import re
-    from datetime import datetime
-
-    # CSV保存先
-    csv_path = CSV_FILE if 'CSV_FILE' in globals() else os.path.join(os.path.dirname(__file__), 'data', 'matches.csv')
-
+    client = get_client()
     # URL補正
-    headers = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
-    }
-    full_url = "https://npb.jp" + match_url if match_url.startswith("/") else match_url
-    response = requests.get(full_url,headers=headers)
-    response.raise_for_status()
-    response.encoding = 'utf-8'
-    soup = BeautifulSoup(response.text, 'html.parser')
-
-    # 試合日付取得
-    game_tit_div = soup.find('div', class_='game_tit')
-    if not game_tit_div or not game_tit_div.find('time'):
-        return False, "試合タイトル部または日付が取得できませんでした。"
-    game_date_elem = game_tit_div.find('time')
-    date_match = re.search(r'(\d{4})年(\d{1,2})月(\d{1,2})日', game_date_elem.text)
-    if not date_match:
-        return False, "試合日付が取得できませんでした。"
-    match_date = datetime(int(date_match.group(1)), int(date_match.group(2)), int(date_match.group(3))).strftime('%Y-%m-%d')
-    game_info_p = soup.find('p', class_='game_info')
-    info_text = game_info_p.get_text(strip=True) if game_info_p else ""
-    # 試合時間は「5時間13分」→「5:13」の形で抽出・変換
-    m = re.search(r'試合時間\s*([0-9]{1,2})時間([0-9]{1,2})分', info_text)
-    if m:
-        match_time = f"{int(m.group(1))}:{m.group(2).zfill(2)}"
-    else:
-        match_time = ""
-    # 入場者数は数字のみ抽出（例: 36,292 → 36292）
-    m = re.search(r'入場者\s*([0-9,]+)', info_text)
-    attendance = m.group(1).replace(",", "") if m else ""
-    # スコア取得
-    linescore = soup.find('table', id='tablefix_ls')
-    if not linescore:
-        return False, "スコアテーブルが見つかりません。"
-    away_row = linescore.find('tr', class_='top')
-    home_row = linescore.find('tr', class_='bottom')
-    if not away_row or not home_row:
-        return False, "スコア行が見つかりません。"
-    
-    # デバッグ情報を追加
-    print(f"[DEBUG] away_row HTML: {away_row}")
-    print(f"[DEBUG] home_row HTML: {home_row}")
-    
-    # より詳細なデバッグ情報
-    print(f"[DEBUG] away_row.find('span'): {away_row.find('span')}")
-    print(f"[DEBUG] home_row.find('span'): {home_row.find('span')}")
-    print(f"[DEBUG] away_row.find('th'): {away_row.find('th')}")
-    print(f"[DEBUG] home_row.find('th'): {home_row.find('th')}")
-
-    # チーム名取得をより堅牢に
-    def extract_team_name(row):
-        """複数の方法でチーム名を抽出"""
-        # 方法1: span要素（クラス名に関係なく）
-        team_span = row.find('span')
-        if team_span:
-            return team_span.text.strip()
-        
-        # 方法2: th要素内のspan
-        team_th = row.find('th')
-        if team_th:
-            span_in_th = team_th.find('span')
-            if span_in_th:
-                return span_in_th.text.strip()
-            else:
-                return team_th.text.strip()
-        
-        # 方法3: 最初のtdから取得
-        first_td = row.find('td')
-        if first_td:
-            return first_td.get_text(strip=True)
-        
-        # 方法4: 行全体から数字以外の部分を抽出
-        row_text = row.get_text(strip=True)
-        import re
-        match = re.search(r'^([^\d]+)', row_text)
-        if match:
-            return match.group(1).strip()
-        
-        return "不明"
-    
-    away_team_text = extract_team_name(away_row)
-    home_team_text = extract_team_name(home_row)
-    
-    print(f"[DEBUG] away_team_text: {away_team_text}")
-    print(f"[DEBUG] home_team_text: {home_team_text}")
-    
-    away_team_full_name = get_team_full_name(away_team_text)
-    home_team_full_name = get_team_full_name(home_team_text)
+    full_url = client.url(match_url)
+    return full_url, client.get_text(full_url)
 
-    def safe_int(text):
-        try:
-            return int(text.strip())
-        except (ValueError, AttributeError):
-            return 0
-
-    away_score = safe_int(away_row.find('td', class_='total-1').text)
-    home_score = safe_int(home_row.find('td', class_='total-1').text)
-
-    # 成績抽出用関数
-    def get_th_stats(div_id, indices):
-        div = soup.find('div', id=div_id)
-        if not div or not div.find('tfoot') or not div.find('tfoot').find('tr'):
-            return [None]*len(indices)
-        ths = div.find('tfoot').find('tr').find_all('th')
-        return [ths[i].text.strip() if len(ths) > i else None for i in indices]
+def load_box_score(match_url):
+    """
+    試合の解析結果を (絶対URL, parse_box_score() の辞書) で返す。
+    解析済みの試合はキャッシュから返し、通信もHTML解析もしない。
+    """
+    full_url = get_client().url(match_url)
+    cache = get_box_cache()
+    parsed = cache.load(full_url)
+    if parsed is None:
+        _, html = fetch_box_html(full_url)
+        parsed = parse_box_html(html)
+        cache.store(full_url, parsed)
+    return full_url, parsed
+
+def build_match_records(parsed, selected_team_full_name, home_away_status, full_url, comment=None):
+    """
+    parse_box_score() の結果から、指定チーム側の試合行と選手成績を組み立てる。
+    戻り値: (my_team_row, batters, pitchers)
+    """
+    away_team_full_name = get_team_full_name(parsed['away_team'])
+    home_team_full_name = get_team_full_name(parsed['home_team'])
+    team_stats = parsed['team_stats']
 
     # 記録用辞書
     stats = {
@@ -891,43 +975,29 @@ def scrape_and_record_match_from_url(match_url, selected_team_full_name, home_aw
         '相手チーム_与ボーク': ''
     }
 
-    # ホーム/ビジターで探索先を切り替え
-    if home_away_status == 'ホーム':
-        # 自チーム打撃
-        my_bat = get_th_stats('table_bottom_b', [3, 5, 7])  # 4,6,8番目
-        stats['自チーム_打数'], stats['自チーム_安打'], stats['自チーム_盗塁'] = my_bat
-        # 相手投手
-        opp_pitch = get_th_stats('table_bottom_p', [7, 8, 9, 10, 11, 12])  # 8,9,10,11,12,13番目
-        print("[DEBUG] opp_pitch:", opp_pitch)
-        stats['相手チーム_本塁打'], stats['自チーム_与四球'], stats['自チーム_与死球'], stats['自チーム_奪三振'], stats['自チーム_与暴投'], stats['自チーム_与ボーク'] = opp_pitch
-        # 相手打撃
-        opp_bat = get_th_stats('table_top_b', [3, 5, 7])  # 4,6,8番目
-        stats['相手チーム_打数'], stats['相手チーム_安打'], stats['相手チーム_盗塁'] = opp_bat
-        # 自チーム投手
-        my_pitch = get_th_stats('table_top_p', [7, 8, 9, 10, 11, 12])  # 8,9,10,11,12,13番目
-        print("[DEBUG] my_pitch:", my_pitch)
-        stats['自チーム_本塁打'], stats['自チーム_四球'], stats['自チーム_死球'], stats['自チーム_三振'], stats['自チーム_被本塁打'], stats['相手チーム_奪三振'] = my_pitch[:6]  # 必要に応じてindex調整
-    else:
-        # 自チーム打撃
-        my_bat = get_th_stats('table_top_b', [3, 5, 7])  # 4,6,8番目
-        stats['自チーム_打数'], stats['自チーム_安打'], stats['自チーム_盗塁'] = my_bat
-        # 相手投手
-        opp_pitch = get_th_stats('table_top_p', [7, 8, 9, 10, 11, 12])  # 8,9,10,11,12,13番目
-        print("[DEBUG] opp_pitch:", opp_pitch)
-        stats['相手チーム_本塁打'], stats['自チーム_与四球'], stats['自チーム_与死球'], stats['自チーム_奪三振'], stats['自チーム_与暴投'], stats['自チーム_与ボーク'] = opp_pitch
-        # 相手打撃
-        opp_bat = get_th_stats('table_bottom_b', [3, 5, 7])  # 4,6,8番目
-        stats['相手チーム_打数'], stats['相手チーム_安打'], stats['相手チーム_盗塁'] = opp_bat
-        # 自チーム投手
-        my_pitch = get_th_stats('table_bottom_p', [7, 8, 9, 10, 11, 12])  # 8,9,10,11,12,13番目
-        print("[DEBUG] my_pitch:", my_pitch)
-        stats['自チーム_本塁打'], stats['自チーム_四球'], stats['自チーム_死球'], stats['自チーム_三振'], stats['自チーム_被本塁打'], stats['相手チーム_奪三振'] = my_pitch[:6]
+    # ホーム/ビジターで探索先を切り替え（自チーム側 / 相手チーム側の表）
+    my_side = SIDE_BY_HOME_AWAY.get(home_away_status, 'top')
+    opp_side = 'top' if my_side == 'bottom' else 'bottom'
+    # 自チーム打撃
+    my_bat = pick_stats(team_stats[f'table_{my_side}_b'], [3, 5, 7])  # 4,6,8番目
+    stats['自チーム_打数'], stats['自チーム_安打'], stats['自チーム_盗塁'] = my_bat
+    # 相手投手
+    opp_pitch = pick_stats(team_stats[f'table_{my_side}_p'], [7, 8, 9, 10, 11, 12])  # 8,9,10,11,12,13番目
+    debug_sampled(logger, "opp_pitch: %s", opp_pitch)
+    stats['相手チーム_本塁打'], stats['自チーム_与四球'], stats['自チーム_与死球'], stats['自チーム_奪三振'], stats['自チーム_与暴投'], stats['自チーム_与ボーク'] = opp_pitch
+    # 相手打撃
+    opp_bat = pick_stats(team_stats[f'table_{opp_side}_b'], [3, 5, 7])  # 4,6,8番目
+    stats['相手チーム_打数'], stats['相手チーム_安打'], stats['相手チーム_盗塁'] = opp_bat
+    # 自チーム投手
+    my_pitch = pick_stats(team_stats[f'table_{opp_side}_p'], [7, 8, 9, 10, 11, 12])  # 8,9,10,11,12,13番目
+    debug_sampled(logger, "my_pitch: %s", my_pitch)
+    stats['自チーム_本塁打'], stats['自チーム_四球'], stats['自チーム_死球'], stats['自チーム_三振'], stats['自チーム_被本塁打'], stats['相手チーム_奪三振'] = my_pitch[:6]  # 必要に応じてindex調整
 
     # スコア・勝敗
     if home_away_status == 'ホーム':
-        my_score, opp_score, opp_name = home_score, away_score, away_team_full_name
+        my_score, opp_score, opp_name = parsed['home_score'], parsed['away_score'], away_team_full_name
     else:
-        my_score, opp_score, opp_name = away_score, home_score, home_team_full_name
+        my_score, opp_score, opp_name = parsed['away_score'], parsed['home_score'], home_team_full_name
 
     win_loss = "引分"
     if my_score > opp_score: win_loss = "勝"
@@ -935,34 +1005,43 @@ def scrape_and_record_match_from_url(match_url, selected_team_full_name, home_aw
 
     # CSV出力
     my_team_row = {
-        '日付': match_date, 'チーム名': selected_team_full_name, 'ホーム/ビジター': home_away_status,
+        '日付': parsed['date'], 'チーム名': selected_team_full_name, 'ホーム/ビジター': home_away_status,
         '相手チーム': opp_name, '得点': my_score, '失点': opp_score,
-        '勝敗': win_loss, 'URL': full_url, **stats, '試合時間': match_time, '入場者数': attendance,
+        '勝敗': win_loss, 'URL': full_url, **stats, '試合時間': parsed['game_time'], '入場者数': parse_attendance(parsed['attendance']),
+        '試合時間_分': parse_game_minutes(parsed['game_time']),
         'コメント': comment if comment is not None else ''
     }
+    return my_team_row, parsed['batters'][my_side], parsed['pitchers'][my_side]
+
+def scrape_and_record_match_from_url(match_url, selected_team_full_name, home_away_status, comment=None):
+    """
+    指定されたURLから試合データをスクレイピングし、CSVに記録する。
+    box.htmlの取得・パースは1回だけ行い（解析済みならキャッシュを使い）、スコア・チーム成績・選手成績すべてに使う。
+    """
+    try:
+        full_url, parsed = load_box_score(match_url)
+    except requests.RequestException as e:
+        scrape_failure('fetch_error')
+        return False, f"試合ページを取得できませんでした: {e}"
+    except BoxScoreError as e:
+        scrape_failure('parse_error')
+        return False, str(e)
+
+    my_team_row, batters, pitchers = build_match_records(parsed, selected_team_full_name, home_away_status, full_url, comment)
+    match_date = my_team_row['日付']
+    opp_name = my_team_row['相手チーム']
 
     # --- 個別選手成績も保存 ---
     try:
-        batters, pitchers = scrape_player_stats_from_box(match_url, home_away_status)
         if batters:
-            update_batter_stats(batters, selected_team_full_name)
+            update_batter_stats(batters, selected_team_full_name, full_url, match_date)
         if pitchers:
-            update_pitcher_stats(pitchers, selected_team_full_name)
-    except Exception as e:
-        print(f"[ERROR] 選手成績保存時にエラー: {e}")
-
+            update_pitcher_stats(pitchers, selected_team_full_name, full_url, match_date)
+    except Exception:
+        logger.exception("選手成績保存時にエラー")
 
-    try:
-        df = pd.read_csv(csv_path, encoding='utf-8-sig')
-        df = df[~((df['日付'] == match_date) & (df['チーム名'] == selected_team_full_name))]
-        df = pd.concat([df, pd.DataFrame([my_team_row])], ignore_index=True)
-    except (FileNotFoundError, pd.errors.EmptyDataError, KeyError):
-        df = pd.DataFrame([my_team_row])
-    for col in CSV_HEADERS:
-        if col not in df.columns:
-            df[col] = ''
-    df = df[CSV_HEADERS]
-    df.to_csv(csv_path, index=False, encoding='utf-8-sig')
+    # 同日・同チームの既存行は置き換える（CSV_HEADERSにないカラムは保存しない）
+    match_storage.upsert(my_team_row)
     
     # バックアップカウンターを増やす
     increment_backup_counter()
@@ -971,35 +1050,225 @@ def scrape_and_record_match_from_url(match_url, selected_team_full_name, home_aw
 
 @app.route('/record_specific_match', methods=['POST'])
 def record_specific_match():
-    if request.method == 'POST':
-        target_date_str = request.form['target_date']
-        team_name_input = request.form['team_name']
-        comment = request.form.get('comment', '')
-
-        match_url, home_away_status = get_match_url_from_schedule(target_date_str, team_name_input)
-
-        if match_url and home_away_status:
-            success, message = scrape_and_record_match_from_url(match_url, team_name_input, home_away_status, comment)
-            if success:
-                flash(message, 'success')
-            else:
-                flash(message, 'error')
-        else:
-            flash(f"'{team_name_input}' の試合が {target_date_str} の日程ページで見つかりませんでした。", 'error')
-            
+    return enqueue_record_job(request.form['target_date'], request.form['team_name'],
+                              request.form.get('comment', ''))
+
+# --- ジョブ ---
+def record_match_job(target_date, team_name, comment=''):
+    """
+    ジョブ: 日程ページから試合URLを探し、試合結果と選手成績を記録する。
+    """
+    match_url, home_away_status = get_match_url_from_schedule(target_date, team_name, TEAM_NAME_MAPPING_NPB)
+    if not (match_url and home_away_status):
+        scrape_failure('not_in_schedule')
+        return False, f"'{team_name}' の試合が {target_date} の日程ページで見つかりませんでした。"
+    return scrape_and_record_match_from_url(match_url, team_name, home_away_status, comment)
+
+def backfill_job(team_name, start_date, end_date, overwrite=False):
+    """
+    ジョブ: 期間内の試合をまとめて取得・記録する。
+    """
+    recorded, skipped, failures = backfill_matches(team_name, datetime.strptime(start_date, '%Y-%m-%d'),
+                                                   datetime.strptime(end_date, '%Y-%m-%d'), overwrite=overwrite)
+    return not failures, backfill_message(team_name, recorded, skipped, failures)
+
+job_queue = JobQueue(JOBS_DB, {'record': profiled_job('record', record_match_job),
+                               'backfill': profiled_job('backfill', backfill_job)}, workers=JOB_WORKERS)
+
+def enqueue_job(kind, key, params, accepted_message):
+    """
+    ジョブを積んでジョブIDをすぐに返す。
+    同じ key のジョブが待機中・実行中ならそのジョブにまとめる。
+    完了したら、次にページを開いたときに結果をflashで表示する（session['jobs'] で追跡）。
+    """
+    job_id, created = job_queue.submit(kind, key, params)
+    if job_id not in session.get('jobs', []):
+        session['jobs'] = session.get('jobs', []) + [job_id]
+    if created:
+        flash(f"{accepted_message}（ジョブID: {job_id}）", 'success')
+    else:
+        flash(f"同じ内容の処理を実行中です（ジョブID: {job_id}）", 'info')
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(job_id=job_id, created=created, status_url=url_for('job_status', job_id=job_id)), 202
     return redirect(url_for('top'))
 
+def enqueue_record_job(target_date, team_name, comment=''):
+    return enqueue_job('record', f"{target_date}|{team_name}",
+                       {'target_date': target_date, 'team_name': team_name, 'comment': comment},
+                       f"{target_date} の {team_name} の試合の記録を受け付けました")
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """
+    ジョブの状態（queued / running / done / failed）をJSONで返す
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        abort(404)
+    return jsonify(job)
+
+@app.before_request
+def flash_finished_jobs():
+    """
+    このブラウザから投入したジョブのうち、終わったものの結果をflashで表示する
+    """
+    job_ids = session.get('jobs')
+    if not job_ids or request.endpoint in ('static', 'job_status'):
+        return
+    pending = []
+    for job_id in job_ids:
+        job = job_queue.get(job_id)
+        if job is None:
+            continue
+        if job['status'] in (DONE, FAILED):
+            flash(job['message'], 'success' if job['status'] == DONE else 'error')
+        else:
+            pending.append(job_id)
+    session['jobs'] = pending
+
+# --- 一括取得（バックフィル） ---
+# 試合ページを並列に取得するワーカー数（同じホストへの間隔は http_client 側で制限する）
+BACKFILL_WORKERS = int(os.environ.get('BACKFILL_WORKERS', '4'))
+
+def resolve_team_games(team_full_name, start_date, end_date):
+    """
+    日程インデックスから、期間内にチームが戦った試合を [(日付, 試合URL, ホーム/ビジター), ...] で返す。
+    """
+    npb_team_name = TEAM_NAME_MAPPING_NPB.get(team_full_name, team_full_name)
+    index = get_schedule_index()
+    games = []
+    day = start_date
+    while day <= end_date:
+        date_str = day.strftime('%Y-%m-%d')
+        entry = index.lookup(date_str, npb_team_name)
+        if entry and entry[0]:
+            games.append((date_str, entry[0], entry[1]))
+        day += timedelta(days=1)
+    return games
+
+def backfill_matches(team_full_name, start_date, end_date, workers=BACKFILL_WORKERS, overwrite=False, comment=''):
+    """
+    期間内のチームの試合をまとめて取得し、試合結果と選手成績を一括で記録する。
+    試合ページの取得・解析は workers 本のスレッドで並列に行い、
+    書き込みは試合データ・打者台帳・投手台帳それぞれ1回だけにする。
+    overwrite=False の場合、記録済み（同じ日付・チーム）の試合は取得しない。
+    戻り値: (記録した試合数, スキップした試合数, 失敗した試合 [(日付, メッセージ), ...])
+    """
+    games = resolve_team_games(team_full_name, start_date, end_date)
+    skipped = 0
+    df = match_cache.get()
+    # 記録済みの試合のコメント（取得し直しても消さない）
+    recorded = {}
+    if not df.empty:
+        for date_str, team, text in zip(df['日付'].dt.strftime('%Y-%m-%d'), df['チーム名'], df['コメント']):
+            recorded[(date_str, team)] = text if isinstance(text, str) else ''
+    if not overwrite:
+        pending = [g for g in games if (g[0], team_full_name) not in recorded]
+        skipped = len(games) - len(pending)
+        games = pending
+
+    parsed_games, failures = [], []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(load_box_score, url): (date_str, url, status) for date_str, url, status in games}
+        for future in as_completed(futures):
+            date_str, url, status = futures[future]
+            try:
+                full_url, parsed = future.result()
+            except (requests.RequestException, BoxScoreError) as e:
+                scrape_failure('parse_error' if isinstance(e, BoxScoreError) else 'fetch_error')
+                logger.error("%s %s の取得に失敗: %s", date_str, url, e)
+                failures.append((date_str, str(e)))
+                continue
+            parsed_games.append((date_str, full_url, status, parsed))
+    parsed_games.sort(key=lambda g: g[0])
+
+    rows, batter_games, pitcher_games = [], [], []
+    for date_str, full_url, status, parsed in parsed_games:
+        row, batters, pitchers = build_match_records(parsed, team_full_name, status, full_url,
+                                                     recorded.get((date_str, team_full_name)) or comment)
+        rows.append(row)
+        if batters:
+            batter_games.append((full_url, row['日付'], team_full_name, batters))
+        if pitchers:
+            pitcher_games.append((full_url, row['日付'], team_full_name, pitchers))
+    if batter_games:
+        batter_ledger.record_games(batter_games)
+    if pitcher_games:
+        pitcher_ledger.record_games(pitcher_games)
+    if rows:
+        match_storage.insert_many(rows, replace=True)
+        increment_backup_counter()
+    failures.sort()
+    return len(rows), skipped, failures
+
+def reingest_player_stats(workers=BACKFILL_WORKERS):
+    """
+    記録済みの全試合（URLのある行）の選手成績を、試合の解析結果から台帳に記録し直す。
+    解析結果はキャッシュを優先し、ない試合だけ workers 本のスレッドで取得する。
+    戻り値: (記録し直した試合数, 失敗した試合 [(日付, メッセージ), ...])
+    """
+    df = match_storage.read_all()
+    targets = [(str(date_str), url, team, home_away)
+               for date_str, url, team, home_away in zip(df['日付'], df['URL'], df['チーム名'], df['ホーム/ビジター'])
+               if isinstance(url, str) and url.startswith('http')]
+    batter_games, pitcher_games, failures = [], [], []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(load_box_score, url): (date_str, team, home_away) for date_str, url, team, home_away in targets}
+        for future in as_completed(futures):
+            date_str, team, home_away = futures[future]
+            try:
+                full_url, parsed = future.result()
+            except (requests.RequestException, BoxScoreError) as e:
+                scrape_failure('parse_error' if isinstance(e, BoxScoreError) else 'fetch_error')
+                failures.append((date_str, str(e)))
+                continue
+            side = SIDE_BY_HOME_AWAY.get(home_away, 'top')
+            if parsed['batters'][side]:
+                batter_games.append((full_url, parsed['date'], team, parsed['batters'][side]))
+            if parsed['pitchers'][side]:
+                pitcher_games.append((full_url, parsed['date'], team, parsed['pitchers'][side]))
+    batter_games.sort(key=lambda g: (g[1], g[0]))
+    pitcher_games.sort(key=lambda g: (g[1], g[0]))
+    if batter_games:
+        batter_ledger.record_games(batter_games)
+    if pitcher_games:
+        pitcher_ledger.record_games(pitcher_games)
+    failures.sort()
+    return len(targets) - len(failures), failures
+
+def backfill_message(team_full_name, recorded, skipped, failures):
+    message = f"{team_full_name}: {recorded} 試合を記録しました（記録済みでスキップ: {skipped} 試合）。"
+    if failures:
+        message += " 取得に失敗: " + ", ".join(date_str for date_str, _ in failures)
+    return message
+
+@app.route('/admin/backfill', methods=['GET', 'POST'])
+def admin_backfill():
+    """
+    チームと期間を指定して試合結果をまとめて取得するページ
+    """
+    if request.method == 'POST':
+        team_name = request.form.get('team_name', '').strip()
+        try:
+            start_date = datetime.strptime(request.form['start_date'], '%Y-%m-%d')
+            end_date = datetime.strptime(request.form['end_date'], '%Y-%m-%d')
+        except (KeyError, ValueError):
+            flash("開始日・終了日を正しく指定してください。", 'error')
+            return redirect(url_for('admin_backfill'))
+        if team_name not in TEAM_NAME_MAPPING_NPB or start_date > end_date:
+            flash("チーム名または期間が正しくありません。", 'error')
+            return redirect(url_for('admin_backfill'))
+        start, end = start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
+        return enqueue_job('backfill', f"{team_name}|{start}|{end}",
+                           {'team_name': team_name, 'start_date': start, 'end_date': end,
+                            'overwrite': bool(request.form.get('overwrite'))},
+                           f"{team_name} の {start}〜{end} の一括取得を受け付けました")
+    today = datetime.today().strftime('%Y-%m-%d')
+    return render_template('backfill.html', teams=list(TEAM_NAME_MAPPING_NPB), today=today)
+
 @app.route('/results')
+@cached_page('matches')
 def results():
-    try:
-        df = pd.read_csv(CSV_FILE, encoding='utf-8-sig')
-        if not df.empty and '日付' in df.columns:
-            df['日付'] = pd.to_datetime(df['日付'], errors='coerce')
-            df = df.dropna(subset=['日付'])
-            df = df.sort_values(by='日付', ascending=False)
-            df['日付'] = df['日付'].dt.strftime('%Y-%m-%d')
-    except (FileNotFoundError, pd.errors.EmptyDataError):
-        df = pd.DataFrame(columns=CSV_HEADERS) # CSVがないか空の場合は空のDataFrameを作成
     # 表示するカラムを選択（必要に応じて調整してください）
     display_columns = [
      '日付', 'チーム名', 'ホーム/ビジター', '相手チーム', '得点', '失点', '勝敗', 'URL',
@@ -1010,194 +1279,140 @@ def results():
     # 相手チームの打撃成績
     '相手チーム_打数', '相手チーム_安打', '相手チーム_本塁打', '相手チーム_盗塁', '試合時間','入場者数' , 'コメント'
     ]
-    
-    # 実際のDataFrameに存在するカラムのみを選択
-    available_display_columns = [col for col in display_columns if col in df.columns]
-    
+    # 新しい試合から、表示するページの分だけ渡す
+    query, page = match_page('-date')
+    # 実際のデータに存在するカラムのみを選択
+    available_display_columns = [col for col in display_columns if col in page.rows.columns]
+
     # 集計サマリーを取得
-    summary = analyze_matches(CSV_FILE)
-    return render_template('results.html', 
-                           matches=df[available_display_columns].to_dict(orient='records'),
+    summary = analyze_matches()
+    return render_template('results.html',
+                           matches=page.records(available_display_columns, missing=''),
                            columns=available_display_columns,
-                           summary=summary)
+                           summary=summary,
+                           page=page,
+                           page_args=query.filter_args())
+
+@app.route('/api/matches')
+def api_matches():
+    """
+    試合データをJSONで返す（絞り込み・並べ替え・カーソルによるページ送り）。
+    パラメータは match_query.MatchQuery.from_args() を参照。続きは next_cursor を cursor に渡して取得する。
+    """
+    try:
+        query = MatchQuery.from_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    page = match_index.query(query)
+    return jsonify({
+        'matches': page.records([col for col in CSV_HEADERS if col not in HIDDEN_COLUMNS]),
+        'total': page.total,
+        'next_cursor': page.next_cursor,
+    })
+
+# /export/<データ>.csv・.ndjson で書き出せる選手成績（カラム・数値カラムを持つストアまたは台帳）
+PLAYER_EXPORTS = {
+    'batters': batter_store,
+    'pitchers': pitcher_store,
+    'batters_games': batter_ledger,
+    'pitchers_games': pitcher_ledger,
+}
+EXPORT_MIMETYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+@app.route('/export/<dataset>.<any(csv, ndjson):fmt>')
+def export_data(dataset, fmt):
+    """
+    試合データ（matches）・選手成績（batters / pitchers）・試合ごとの選手成績台帳（batters_games / pitchers_games）を
+    CSV または NDJSON で少しずつ返す（exports.py 参照）。
+    絞り込み・並べ替えは /api/matches と同じパラメータ（limit・cursor は無視）。
+    選手成績で使えるのは team と、台帳の from / to だけ。
+    """
+    try:
+        query = MatchQuery.from_args(request.args)
+        if dataset == 'matches':
+            columns = CSV_HEADERS
+            rows = match_index.iter_rows(query, columns)
+        elif dataset in PLAYER_EXPORTS:
+            source = PLAYER_EXPORTS[dataset]
+            unsupported = [name for name, col in EQUALITY_FILTERS.items() if col in query.equals and col != 'チーム名']
+            if unsupported:
+                raise ValueError(f"{dataset} は {', '.join(unsupported)} で絞り込めません")
+            if (query.date_from or query.date_to) and '日付' not in source.columns:
+                raise ValueError(f"{dataset} は日付で絞り込めません（試合ごとの台帳 {dataset}_games を使ってください）")
+            columns = source.columns
+            # メモリ上の累計・台帳（差分ログ・取消行を反映済み）から返す。CSVの書き直しは更新側に任せる
+            rows = exports.iter_frame_rows(
+                source.read_all(), columns, source.stat_columns,
+                date_from=query.date_from.strftime('%Y-%m-%d') if query.date_from else None,
+                date_to=query.date_to.strftime('%Y-%m-%d') if query.date_to else None,
+                team=query.equals.get('チーム名'))
+        else:
+            abort(404)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    body = exports.iter_csv(columns, rows) if fmt == 'csv' else exports.iter_ndjson(columns, rows)
+    return Response(body, mimetype=EXPORT_MIMETYPES[fmt],
+                    headers={'Content-Disposition': f'attachment; filename={dataset}.{fmt}'})
 
 # --- 選手成績スクレイピング ---
-def scrape_player_stats_from_box(box_url, home_away_status):
+def scrape_player_stats_from_box(box_url, home_away_status, soup=None):
     """
     指定チームのbox.htmlから打者・投手ごとの成績をリストで抽出する。
+    取得・パース済みのsoupを渡した場合はそれを使い、再取得しない（渡さない場合は解析結果のキャッシュを使う）。
     戻り値: (batters, pitchers)
     batters: [{'選手名': str, '打数': int, '安打': int, '打点': int, '盗塁': int, '本塁打': int, '三振': int} ...]
-    pitchers: [{'選手名': str, '投球回': int, '打者数': int, '被安打': int, '奪三振': int, '被本塁打': int, ...} ...]
-    """
-    import requests
-    from bs4 import BeautifulSoup
-    import re
-    from urllib.parse import urljoin
-    batters, pitchers = [], []
-    # 相対パスなら絶対URL化
-    box_url = urljoin('https://npb.jp', box_url)
-    try:
-        res = requests.get(box_url)
-        res.encoding = 'utf-8'
-        soup = BeautifulSoup(res.text, 'html.parser')
-        # 打者成績
-        if home_away_status == 'ホーム':
-            bat_div = soup.find('div', id='table_bottom_b')
-            bat_table = bat_div.find('table', id='tablefix_b_b') if bat_div else None
-        else:
-            bat_div = soup.find('div', id='table_top_b')
-            bat_table = bat_div.find('table', id='tablefix_t_b') if bat_div else None
-        if bat_table and bat_table.find('tbody'):
-            for tr in bat_table.find('tbody').find_all('tr'):
-                tds = tr.find_all('td', recursive=False)
-                if not tds or len(tds) < 9:
-                    continue
-                player_td = tr.find('td', class_='player')
-                if not player_td:
-                    continue
-                player_name = player_td.text.strip()
-                # 必要なtd数が揃っているか
-                batter = {
-                    '選手名': player_name,
-                    '打数': int(tds[3].text.strip()) if tds[3].text.strip().isdigit() else 0,
-                    '安打': int(tds[5].text.strip()) if tds[5].text.strip().isdigit() else 0,
-                    '打点': int(tds[6].text.strip()) if tds[6].text.strip().isdigit() else 0,
-                    '盗塁': int(tds[7].text.strip()) if tds[7].text.strip().isdigit() else 0,
-                    '本塁打': sum('本' in td.get_text() for td in tds[5:]),
-                    '三振': sum('三　振' in td.get_text() for td in tds),
-                    '四球': sum('四' in td.get_text() for td in tds),
-                    '死球': sum('死　球' in td.get_text() for td in tds),
-                    '犠打': sum('犠打' in td.get_text() for td in tds),
-                    '犠飛': sum('犠飛' in td.get_text() for td in tds)
-                }
-                batters.append(batter)
-        # 投手成績
-        if home_away_status == 'ビジター':
-            pitch_div = soup.find('div', id='table_top_p')
-            pitch_table = pitch_div.find('table', id='tablefix_t_p') if pitch_div else None
-        else:
-            pitch_div = soup.find('div', id='table_bottom_p')
-            pitch_table = pitch_div.find('table', id='tablefix_b_p') if pitch_div else None
-        if pitch_table and pitch_table.find('tbody'):
-            for tr in pitch_table.find('tbody').find_all('tr'):
-                tds = tr.find_all('td', recursive=False)
-                if not tds or len(tds) < 13:
-                    continue
-                player_td = tr.find('td', class_='player')
-                if not player_td:
-                    continue
-                player_name = player_td.text.strip()
-                # 投球回（5つ目<td>内の<th>から数字のみ）
-                tokkyukai = 0
-                th_in_td = tds[4].find('th') if tds[4] else None
-                if th_in_td:
-                    match = re.search(r'\d+', th_in_td.text)
-                    if match:
-                        tokkyukai = int(match.group())
-                pitcher = {
-                    '選手名': player_name,
-                    '投球回': tokkyukai,
-                    '投球数': int(tds[2].text.strip()) if tds[2].text.strip().isdigit() else 0,
-                    '打者数': int(tds[3].text.strip()) if tds[3].text.strip().isdigit() else 0,
-                    '被安打': int(tds[5].text.strip()) if tds[5].text.strip().isdigit() else 0,
-                    '被本塁打': int(tds[6].text.strip()) if tds[6].text.strip().isdigit() else 0,
-                    '与四球': int(tds[7].text.strip()) if tds[7].text.strip().isdigit() else 0,
-                    '与死球': int(tds[8].text.strip()) if tds[8].text.strip().isdigit() else 0,
-                    '奪三振': int(tds[9].text.strip()) if tds[9].text.strip().isdigit() else 0,
-                    '暴投': int(tds[10].text.strip()) if tds[10].text.strip().isdigit() else 0,
-                    'ボーク': int(tds[11].text.strip()) if tds[11].text.strip().isdigit() else 0,
-                    '失点': int(tds[12].text.strip()) if tds[12].text.strip().isdigit() else 0
-                }
-                pitchers.append(pitcher)
-    except Exception as e:
-        print(f"[ERROR] 選手個人成績スクレイピング失敗: {e}")
-    return batters, pitchers
-
-def update_batter_stats(batters, team_full_name):
+    pitchers: [{'選手名': str, '投球アウト数': int, '打者数': int, '被安打': int, '奪三振': int, '被本塁打': int, ...} ...]
     """
-    打者成績をdata/batters_stats.csvに累積加算で保存。
+    side = SIDE_BY_HOME_AWAY.get(home_away_status, 'top')
+    if soup is None:
+        try:
+            _, parsed = load_box_score(box_url)
+        except Exception as e:
+            logger.error("選手個人成績スクレイピング失敗: %s", e)
+            return [], []
+        return parsed['batters'][side], parsed['pitchers'][side]
+    return extract_player_stats(soup, side)
+
+def update_batter_stats(batters, team_full_name, match_url, match_date=''):
     """
-    BATTERS_CSV = os.path.join('data', 'batters_stats.csv')
-    COLUMNS = ['選手名','チーム名','打数','安打','打点','盗塁','本塁打','三振','四球','死球','犠打','犠飛']
-    # 必要なカラムのみで初期化
-    if not os.path.exists(BATTERS_CSV):
-        df = pd.DataFrame(columns=COLUMNS)
-        df.to_csv(BATTERS_CSV, index=False, encoding='utf-8-sig')
-    else:
-        df = pd.read_csv(BATTERS_CSV, encoding='utf-8-sig')
-    for b in batters:
-        # 選手名＋チーム名で一意
-        mask = (df['選手名'] == b['選手名']) & (df['チーム名'] == team_full_name)
-        if mask.any():
-            df.loc[mask, '打数'] = df.loc[mask, '打数'].fillna(0).astype(int) + b.get('打数',0)
-            df.loc[mask, '安打'] = df.loc[mask, '安打'].fillna(0).astype(int) + b.get('安打',0)
-            df.loc[mask, '打点'] = df.loc[mask, '打点'].fillna(0).astype(int) + b.get('打点',0)
-            df.loc[mask, '盗塁'] = df.loc[mask, '盗塁'].fillna(0).astype(int) + b.get('盗塁',0)
-            df.loc[mask, '本塁打'] = df.loc[mask, '本塁打'].fillna(0).astype(int) + b.get('本塁打',0)
-            df.loc[mask, '三振'] = df.loc[mask, '三振'].fillna(0).astype(int) + b.get('三振',0)
-            df.loc[mask, '四球'] = df.loc[mask, '四球'].fillna(0).astype(int) + b.get('四球',0)
-            df.loc[mask, '死球'] = df.loc[mask, '死球'].fillna(0).astype(int) + b.get('死球',0)
-            df.loc[mask, '犠打'] = df.loc[mask, '犠打'].fillna(0).astype(int) + b.get('犠打',0)
-            df.loc[mask, '犠飛'] = df.loc[mask, '犠飛'].fillna(0).astype(int) + b.get('犠飛',0)
-        else:
-            row = {
-                '選手名': b['選手名'],
-                'チーム名': team_full_name,
-                '打数': b.get('打数',0),
-                '安打': b.get('安打',0),
-                '打点': b.get('打点',0),
-                '盗塁': b.get('盗塁',0),
-                '本塁打': b.get('本塁打',0),
-                '三振': b.get('三振',0),
-                '四球': b.get('四球',0),
-                '死球': b.get('死球',0),
-                '犠打': b.get('犠打',0),
-                '犠飛': b.get('犠飛',0)
-            }
-            df = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
-    df.to_csv(BATTERS_CSV, index=False, encoding='utf-8-sig')
+    打者成績を試合台帳(data/batters_games.csv)に記録し、data/batters_stats.csvに累積加算で保存。
+    同じ試合(match_url)を記録し直した場合は前回分を差し引いてから加算する。
+    """
+    batter_ledger.record_game(match_url, match_date, team_full_name, batters)
 
-def update_pitcher_stats(pitchers, team_full_name):
+def update_pitcher_stats(pitchers, team_full_name, match_url, match_date=''):
     """
-    投手成績をdata/pitchers_stats.csvに累積加算で保存。
-    pitchers: [{'選手名', '投球回', '打者数', '被安打', '奪三振', '被本塁打'} ...]
+    投手成績を試合台帳(data/pitchers_games.csv)に記録し、data/pitchers_stats.csvに累積加算で保存。
+    pitchers: [{'選手名', '投球アウト数', '打者数', '被安打', '奪三振', '被本塁打'} ...]
     team_full_name: チーム名
     """
-    import pandas as pd
-    import os
-    PITCHERS_CSV = os.path.join('data', 'pitchers_stats.csv')
-    COLUMNS = ['選手名','チーム名','投球数','投球回','打者数','被安打','被本塁打','与四球','与死球','奪三振','暴投','ボーク','失点']
-    if not os.path.exists(PITCHERS_CSV):
-        df = pd.DataFrame(columns=COLUMNS)
-        df.to_csv(PITCHERS_CSV, index=False, encoding='utf-8-sig')
-    else:
-        df = pd.read_csv(PITCHERS_CSV, encoding='utf-8-sig')
-    for p in pitchers:
-        mask = (df['選手名'] == p['選手名']) & (df['チーム名'] == team_full_name)
-        if mask.any():
-            df.loc[mask, '投球数'] = df.loc[mask, '投球数'].fillna(0).astype(int) + p.get('投球数',0)
-            df.loc[mask, '投球回'] = df.loc[mask, '投球回'].fillna(0).astype(int) + p.get('投球回',0)
-            df.loc[mask, '打者数'] = df.loc[mask, '打者数'].fillna(0).astype(int) + p.get('打者数',0)
-            df.loc[mask, '被安打'] = df.loc[mask, '被安打'].fillna(0).astype(int) + p.get('被安打',0)
-            df.loc[mask, '被本塁打'] = df.loc[mask, '被本塁打'].fillna(0).astype(int) + p.get('被本塁打',0)
-            df.loc[mask, '与四球'] = df.loc[mask, '与四球'].fillna(0).astype(int) + p.get('与四球',0)
-            df.loc[mask, '与死球'] = df.loc[mask, '与死球'].fillna(0).astype(int) + p.get('与死球',0)
-            df.loc[mask, '奪三振'] = df.loc[mask, '奪三振'].fillna(0).astype(int) + p.get('奪三振',0)
-            df.loc[mask, '暴投'] = df.loc[mask, '暴投'].fillna(0).astype(int) + p.get('暴投',0)
-            df.loc[mask, 'ボーク'] = df.loc[mask, 'ボーク'].fillna(0).astype(int) + p.get('ボーク',0)
-            df.loc[mask, '失点'] = df.loc[mask, '失点'].fillna(0).astype(int) + p.get('失点',0)
-        else:
-            row = {
-                '選手名': p['選手名'], 'チーム名': team_full_name,
-                '投球数': p.get('投球数',0), '投球回': p.get('投球回',0), '打者数': p.get('打者数',0), '被安打': p.get('被安打',0), '被本塁打': p.get('被本塁打',0),
-                '与四球': p.get('与四球',0), '与死球': p.get('与死球',0), '奪三振': p.get('奪三振',0), '暴投': p.get('暴投',0), 'ボーク': p.get('ボーク',0), '失点': p.get('失点',0)
-            }
-            df = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
-    df.to_csv(PITCHERS_CSV, index=False, encoding='utf-8-sig')
+    pitcher_ledger.record_game(match_url, match_date, team_full_name, pitchers)
 
-def analyze_matches(csv_path):
+def remove_player_stats_for_match(match_url, team_full_name=None):
+    """
+    試合(match_url)分の選手成績を台帳と通算成績から取り除く。
+    """
+    if not match_url or match_url == '手動入力':
+        return
+    batter_ledger.remove_game(match_url, team_full_name)
+    pitcher_ledger.remove_game(match_url, team_full_name)
+
+@stage('aggregate')
+def analyze_matches(df=None):
+    """
+    日付が有効な試合の通算成績・直近5試合・連勝/連敗・ホーム/ビジター別成績。
+    df を省略した場合は記録済みの全試合が対象で、件数は差分更新される集計状態から取る。
+    """
     try:
-        df = pd.read_csv(csv_path, encoding='utf-8-sig')
+        if df is None:
+            df = match_cache.get()
+            bucket = match_aggregates.bucket
+        else:
+            df = df.copy()
+            buckets = frame_buckets(df, [])
+
+            def bucket(*key):
+                return buckets.get(key) or Bucket()
     except Exception:
         return {}
 
@@ -1210,13 +1425,10 @@ def analyze_matches(csv_path):
     df = df.dropna(subset=['日付'])
     df = df.sort_values(by='日付', ascending=False)
 
-    # 観戦数
-    total_games = len(df)
-
-    # 勝敗カウント
-    win = (df['勝敗'] == '勝').sum()
-    lose = (df['勝敗'] == '敗').sum()
-    draw = (df['勝敗'] == '引分').sum()
+    # 観戦数・勝敗カウント
+    dated = bucket('dated')
+    total_games = dated.games
+    win, lose, draw = dated.win, dated.lose, dated.draw
 
     # 勝率（引分は分母に入れない）
     denominator = win + lose
@@ -1228,29 +1440,13 @@ def analyze_matches(csv_path):
     recent5 = recent5_df.to_dict(orient='records')
 
     # 現在の波（連勝・連敗数）
-    streak = 0
-    last = None
-    for result in df['勝敗']:
-        if last is None:
-            last = result
-            streak = 1
-        elif result == last:
-            streak += 1
-        else:
-            break
-    current_streak = f"{streak}{last}" if last else "-"
+    streak, last = current_streak(df['勝敗'])
+    streak_text = f"{streak}{last}" if last else "-"
 
     # 本拠地/ビジター成績
-    home_df = df[df['ホーム/ビジター'] == 'ホーム']
-    visitor_df = df[df['ホーム/ビジター'] == 'ビジター']
-
-    home_win = (home_df['勝敗'] == '勝').sum()
-    home_lose = (home_df['勝敗'] == '敗').sum()
-    home_draw = (home_df['勝敗'] == '引分').sum()
-
-    visitor_win = (visitor_df['勝敗'] == '勝').sum()
-    visitor_lose = (visitor_df['勝敗'] == '敗').sum()
-    visitor_draw = (visitor_df['勝敗'] == '引分').sum()
+    home, visitor = bucket('home_away', 'ホーム'), bucket('home_away', 'ビジター')
+    home_win, home_lose, home_draw = home.win, home.lose, home.draw
+    visitor_win, visitor_lose, visitor_draw = visitor.win, visitor.lose, visitor.draw
 
     home_total = home_win + home_lose + home_draw
     visitor_total = visitor_win + visitor_lose + visitor_draw
@@ -1262,66 +1458,57 @@ def analyze_matches(csv_path):
         '通算成績': {'勝': win, '敗': lose, '引分': draw},
         '通算勝率': win_rate,
         '直近5試合': recent5,
-        '現在の波': current_streak,
+        '現在の波': streak_text,
         'ホーム成績': {'勝': home_win, '敗': home_lose, '引分': home_draw, '勝率': f"{home_winrate:.3f}"},
         'ビジター成績': {'勝': visitor_win, '敗': visitor_lose, '引分': visitor_draw, '勝率': f"{visitor_winrate:.3f}"},
     }
 
 @app.route('/totals')
+@cached_page('matches')
 def totals():
-    matches_path = os.path.join(DATA_DIR, 'matches.csv')
-    try:
-        df = pd.read_csv(matches_path, encoding='utf-8-sig')
-    except Exception:
-        df = pd.DataFrame()
+    # 集計はすべて差分更新される集計状態から取得する（全試合が対象）
+    overall = match_aggregates.bucket('all')
+
+    def column_total(col):
+        return overall.total(col) if overall.games > 0 else 0
 
     # --- 基本集計 ---
-    total_games = len(df)
-    win = (df['勝敗'] == '勝').sum() if not df.empty else 0
-    lose = (df['勝敗'] == '敗').sum() if not df.empty else 0
-    draw = (df['勝敗'] == '引分').sum() if not df.empty else 0
+    total_games = overall.games
+    win = overall.win
+    lose = overall.lose
+    draw = overall.draw
     denominator = win + lose
     win_rate = round(win / denominator, 3) if denominator > 0 else 0
 
     # --- 通算打撃成績 ---
-    total_at_bats = df['自チーム_打数'].sum() if not df.empty else 0
-    total_hits = df['自チーム_安打'].sum() if not df.empty else 0
-    total_hr = df['自チーム_本塁打'].sum() if not df.empty else 0
+    total_at_bats = column_total('自チーム_打数')
+    total_hits = column_total('自チーム_安打')
+    total_hr = column_total('自チーム_本塁打')
     avg = round(total_hits / total_at_bats, 3) if total_at_bats > 0 else 0
     hr_rate = round(total_hr / total_at_bats, 3) if total_at_bats > 0 else 0
 
     # --- 通算投手成績（防御率）---
-    total_innings = 0
-    # 打数＋四球＋死球＋犠打＋犠飛＝打席数（犠打・犠飛はデータにない場合は打数＋四球＋死球）
     # 1試合9イニング換算
-    if not df.empty:
-        total_innings = total_games * 9
-    total_runs_allowed = df['失点'].sum() if not df.empty else 0
+    total_innings = total_games * 9
+    total_runs_allowed = column_total('失点')
     era = round(total_runs_allowed * 9 / total_innings, 2) if total_innings > 0 else 0
 
     # --- 通算被打率・被本塁打数 ---
-    opp_at_bats = df['相手チーム_打数'].sum() if not df.empty else 0
-    opp_hits = df['相手チーム_安打'].sum() if not df.empty else 0
-    opp_hr = df['相手チーム_本塁打'].sum() if not df.empty else 0
+    opp_at_bats = column_total('相手チーム_打数')
+    opp_hits = column_total('相手チーム_安打')
+    opp_hr = column_total('相手チーム_本塁打')
     opp_avg = round(opp_hits / opp_at_bats, 3) if opp_at_bats > 0 else 0
     # 被本塁打数は合計
     
     # --- 対戦チームごとの試合数・勝率 ---
     vs_team_stats = []
-    if not df.empty:
-        grouped = df.groupby('相手チーム')
-        for team, group in grouped:
-            games = len(group)
-            win = (group['勝敗'] == '勝').sum()
-            lose = (group['勝敗'] == '敗').sum()
-            denominator = win + lose
-            rate = round(win / denominator, 3) if denominator > 0 else 0
-            vs_team_stats.append({
-                'team': team,
-                'games': games,
-                'win_rate': rate
-            })
-        vs_team_stats = sorted(vs_team_stats, key=lambda x: x['games'], reverse=True)
+    for team, group in sorted(match_aggregates.group('opponent_all').items()):
+        vs_team_stats.append({
+            'team': team,
+            'games': group.games,
+            'win_rate': group.win_rate()
+        })
+    vs_team_stats = sorted(vs_team_stats, key=lambda x: x['games'], reverse=True)
 
     return render_template('totals.html',
         total_games=total_games,
@@ -1340,15 +1527,15 @@ def totals():
 @app.route('/delete_match/<int:row_id>', methods=['POST'])
 def delete_match(row_id):
     """
-    指定した行番号(row_id)の試合データをmatches.csvから削除する
+    指定した row_id（storage.py 参照。SQLite では行の主キー）の試合データを削除する
     """
-    import pandas as pd
-    matches_path = os.path.join(DATA_DIR, 'matches.csv')
     try:
-        df = pd.read_csv(matches_path, encoding='utf-8-sig')
-        if 0 <= row_id < len(df):
-            df = df.drop(df.index[row_id]).reset_index(drop=True)
-            df.to_csv(matches_path, index=False, encoding='utf-8-sig')
+        deleted = match_storage.delete(row_id)
+        if deleted is not None:
+            # 削除した試合の選手成績も通算から差し引く
+            url = deleted.get('URL')
+            if isinstance(url, str) and url:
+                remove_player_stats_for_match(url, deleted.get('チーム名'))
             flash('試合データを削除しました', 'success')
         else:
             flash('指定された試合データが存在しません', 'error')
@@ -1356,7 +1543,62 @@ def delete_match(row_id):
         flash(f'削除中にエラー: {e}', 'error')
     return redirect(url_for('summary'))
 
+@app.cli.command('export-matches')
+def export_matches_command():
+    """ストレージの試合データを matches.csv に書き出す"""
+    match_storage.export_csv(CSV_FILE)
+    print(f"{CSV_FILE} に書き出しました。")
+
+@app.cli.command('import-matches')
+def import_matches_command():
+    """matches.csv の内容でストレージを置き換える"""
+    match_storage.import_csv(CSV_FILE)
+    print(f"{CSV_FILE} を取り込みました。")
+
+@app.cli.command('migrate-match-columns')
+def migrate_match_columns_command():
+    """記録済みの試合の試合時間を分（試合時間_分）に、入場者数を整数に変換して保存し直す"""
+    df = match_storage.read_all()
+    for col in CSV_HEADERS:
+        if col not in df.columns:
+            df[col] = np.nan
+    minutes = pd.to_numeric(df['試合時間_分'], errors='coerce')
+    df['試合時間_分'] = minutes.fillna(game_minutes(df['試合時間']))
+    df['入場者数'] = attendance_values(df['入場者数'])
+    match_storage.replace_all(df[CSV_HEADERS])
+    print(f"{len(df)} 試合の試合時間・入場者数を変換しました"
+          f"（試合時間_分 {int(df['試合時間_分'].notna().sum())} 件, 入場者数 {int(df['入場者数'].notna().sum())} 件）。")
+
+@app.cli.command('rebuild-player-stats')
+@click.option('--from-box-scores', is_flag=True, help='記録済みの全試合の選手成績を試合の解析結果から台帳に記録し直してから作り直す')
+@click.option('--workers', default=BACKFILL_WORKERS, show_default=True, help='解析結果がない試合を並列に取得する数')
+def rebuild_player_stats_command(from_box_scores, workers):
+    """選手の通算成績を試合台帳から作り直す"""
+    if from_box_scores:
+        count, failures = reingest_player_stats(workers)
+        print(f"{count} 試合分の選手成績を記録し直しました。")
+        for date_str, message in failures:
+            print(f"[ERROR] {date_str}: {message}")
+    batter_ledger.rebuild_totals()
+    pitcher_ledger.rebuild_totals()
+    print(f"{BATTERS_CSV} と {PITCHERS_CSV} を台帳から作り直しました。")
+
+@app.cli.command('backfill')
+@click.argument('team')
+@click.argument('start')
+@click.argument('end')
+@click.option('--workers', default=BACKFILL_WORKERS, show_default=True, help='並列に取得する数')
+@click.option('--overwrite', is_flag=True, help='記録済みの試合も取得し直す')
+def backfill_command(team, start, end, workers, overwrite):
+    """TEAM の START〜END（YYYY-MM-DD）の試合をまとめて取得・記録する"""
+    if team not in TEAM_NAME_MAPPING_NPB:
+        raise click.BadParameter(f"チーム名は次のいずれか: {', '.join(TEAM_NAME_MAPPING_NPB)}", param_hint='TEAM')
+    start_date = datetime.strptime(start, '%Y-%m-%d')
+    end_date = datetime.strptime(end, '%Y-%m-%d')
+    recorded, skipped, failures = backfill_matches(team, start_date, end_date, workers=workers, overwrite=overwrite)
+    print(backfill_message(team, recorded, skipped, failures))
+
 if __name__ == '__main__':
     initialize_csv()
     initialize_backup_counter()
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,85 @@
+"""
+ログ出力の設定（標準の logging を使う）。
+
+各モジュールは get_logger(__name__) でロガーを取り、
+logger.debug("... %s", value) のように書式化を logging に任せる。
+DEBUG が無効なら引数は文字列にされないので、ホットパスでも書式化の処理はかからない。
+
+環境変数:
+    LOG_LEVEL        出力するレベル（DEBUG / INFO / WARNING / ERROR、既定 INFO）
+    LOG_FORMAT       'text'（既定）または 'json'（1行1レコードのJSON）
+    LOG_SAMPLE_RATE  debug_sampled() で出すログの割合（0〜1、既定 0.01）
+
+試合ページの解析など1リクエストで何度も通る処理のデバッグログは debug_sampled() を使い、
+DEBUG を有効にしても一部だけを出す。
+"""
+import json
+import logging
+import os
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+
+
+ROOT_LOGGER = 'baseball'
+
+_configured = False
+_configure_lock = threading.Lock()
+_sample_rate = 0.01
+
+
+class JsonFormatter(logging.Formatter):
+    """1レコードを1行のJSONにする"""
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def configure_logging(level=None, fmt=None, sample_rate=None, stream=None):
+    """
+    'baseball' 以下のロガーの出力先・レベル・形式を設定する。
+    引数を省略した項目は環境変数（なければ既定値）を使う。2回目以降は何もしない。
+    """
+    global _configured, _sample_rate
+    with _configure_lock:
+        if _configured:
+            return
+        level = (level or os.environ.get('LOG_LEVEL', 'INFO')).upper()
+        fmt = (fmt or os.environ.get('LOG_FORMAT', 'text')).lower()
+        if sample_rate is None:
+            sample_rate = float(os.environ.get('LOG_SAMPLE_RATE', '0.01'))
+        _sample_rate = min(max(sample_rate, 0.0), 1.0)
+
+        handler = logging.StreamHandler(stream or sys.stderr)
+        if fmt == 'json':
+            handler.setFormatter(JsonFormatter())
+        else:
+            handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s'))
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(getattr(logging, level, logging.INFO))
+        root.addHandler(handler)
+        root.propagate = False
+        _configured = True
+
+
+def get_logger(name):
+    """'baseball.<name>' のロガー（まだ設定されていなければ環境変数で設定する）"""
+    configure_logging()
+    return logging.getLogger(f'{ROOT_LOGGER}.{name}')
+
+
+def debug_sampled(logger, msg, *args):
+    """
+    ホットパス用のデバッグログ。DEBUG が有効なときだけ、LOG_SAMPLE_RATE の割合で出す。
+    DEBUG が無効なら乱数も引かず、書式化もしない。
+    """
+    if logger.isEnabledFor(logging.DEBUG) and random.random() < _sample_rate:
+        logger.debug(msg, *args, stacklevel=2)
@@ -0,0 +1,82 @@
+"""
+ベンチマーク結果の保存と比較。
+
+結果は {シナリオ名: {指標名: 値}} の辞書で、実行パラメータ（試合数・並列数・繰り返し回数など）と一緒に
+bench/baselines/<name>.json に {"params": {...}, "results": {...}} として保存する。
+パラメータが保存時と違う実行はベースラインと比べない（条件の違う数値を比べても意味がないため）。
+指標名が _per_s で終わるものは大きいほど良い、_ms / _s / _mib で終わるもの（時間・メモリ）は小さいほど良いとして、
+tolerance（既定 25%）を超えて悪化した指標を回帰として返す。それ以外の指標（件数など）は比べない。
+"""
+import json
+import os
+
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+
+def baseline_path(name):
+    return os.path.join(BASELINE_DIR, f'{name}.json')
+
+
+def load(name):
+    """保存済みのベースライン。なければ None"""
+    try:
+        with open(baseline_path(name), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save(name, results, params):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    with open(baseline_path(name), 'w', encoding='utf-8') as f:
+        json.dump({'params': params, 'results': results}, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(results, baseline, tolerance=0.25):
+    """ベースラインより tolerance を超えて悪化した指標を [(シナリオ, 指標, 基準値, 今回値), ...] で返す"""
+    regressions = []
+    for scenario, metrics in results.items():
+        base_metrics = baseline.get(scenario, {})
+        for metric, value in metrics.items():
+            base = base_metrics.get(metric)
+            if not isinstance(base, (int, float)) or not isinstance(value, (int, float)) or base <= 0:
+                continue
+            if metric.endswith('_per_s'):
+                worse = value < base * (1 - tolerance)
+            elif metric.endswith(('_ms', '_s', '_mib')):
+                worse = value > base * (1 + tolerance)
+            else:
+                continue
+            if worse:
+                regressions.append((scenario, metric, base, value))
+    return regressions
+
+
+def report(name, results, params, save_baseline=False, tolerance=0.25):
+    """
+    ベースラインと比べた結果を表示し、回帰があれば True を返す。
+    params は今回の実行パラメータの辞書で、ベースラインと違えば比べない。
+    save_baseline=True なら今回の結果をベースラインとして保存する。
+    """
+    # JSON に保存した値と比べるので、同じ形にしておく
+    params = json.loads(json.dumps(params))
+    if save_baseline:
+        save(name, results, params)
+        print(f"ベースラインを保存しました: {baseline_path(name)}")
+        return False
+    baseline = load(name)
+    if baseline is None:
+        print(f"ベースラインがありません（--save で {baseline_path(name)} に保存できます）")
+        return False
+    if baseline.get('params') != params:
+        print(f"ベースラインと実行パラメータが違うため比べません（ベースライン {baseline.get('params')}、今回 {params}。"
+              f"この条件で比べるには --save で保存し直してください）")
+        return False
+    regressions = compare(results, baseline['results'], tolerance)
+    for scenario, metric, base, value in regressions:
+        print(f"[回帰] {scenario} {metric}: {base:.3f} → {value:.3f}")
+    if not regressions:
+        print(f"ベースラインから {tolerance:.0%} を超える悪化はありません")
+    return bool(regressions)
@@ -0,0 +1,143 @@
+"""
+ベンチマーク用のNPB公式サイト風ページ（box.html・月別日程ページ）を作る。
+
+実際のページと同じ id / class 構造（game_tit, game_info, tablefix_ls,
+table_{top,bottom}_{b,p} の表と tfoot、日程の dateMMDD 行と team1/team2）を持ち、
+ヘッダー・記事・フッターなど解析に使わない部分も実ページに近い量だけ入れている。
+同じ seed からは常に同じページができる。
+
+    python bench/fixtures.py [出力先ディレクトリ]   # 既定: bench/fixtures
+"""
+import os
+import random
+import sys
+
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+NPB_TEAMS = ['中日', '巨人', '阪神', '広島', 'DeNA', 'ヤクルト', 'オリックス', 'ソフトバンク', 'ロッテ', '楽天', '日本ハム', '西武']
+
+PLAYS = ['遊ゴ', '中飛', '三　振', '四球', '右安', '左本', '死　球', '犠打', '犠飛', '二ゴ', '']
+
+
+def _inning_cells(rng, n=9):
+    return ''.join(f'<td>{rng.choice(PLAYS)}</td>' for _ in range(n))
+
+
+def _batter_table(rng, side, names):
+    rows = []
+    totals = [0] * 5
+    for i, name in enumerate(names):
+        values = (rng.randint(2, 5), rng.randint(0, 2), rng.randint(0, 3), rng.randint(0, 2), rng.randint(0, 1))
+        for k, v in enumerate(values):
+            totals[k] += v
+        rows.append(f'<tr><td>{i + 1}</td><td>(中)</td><td class="player">{name}</td>'
+                    + ''.join(f'<td>{v}</td>' for v in values) + _inning_cells(rng) + '</tr>')
+    foot = '<tr><th></th><th></th><th>合計</th>' + ''.join(f'<th>{v}</th>' for v in totals) + '</tr>'
+    return (f'<div id="table_{side}_b" class="table_batter"><table id="tablefix_{side[0]}_b">'
+            f'<thead><tr><th>打順</th></tr></thead><tbody>{"".join(rows)}</tbody><tfoot>{foot}</tfoot></table></div>')
+
+
+def _pitcher_table(rng, side, names):
+    rows = []
+    totals = [0] * 11
+    for name in names:
+        # 0回（1アウトも取れずに降板）の投手は整数部が空で、端数だけのこともある
+        innings = rng.randint(0, 7)
+        fraction = rng.choice(['', '1/3', '2/3'])
+        if innings == 0 and fraction:
+            innings = ''
+        # 投球数 打者数 | 投球回 | 被安打 被本塁打 与四球 与死球 奪三振 暴投 ボーク 失点 自責点
+        values = [rng.randint(10, 100), rng.randint(3, 28), rng.randint(0, 8), rng.randint(0, 2), rng.randint(0, 3),
+                  rng.randint(0, 1), rng.randint(0, 9), rng.randint(0, 1), 0, rng.randint(0, 4), rng.randint(0, 4)]
+        for k, v in enumerate(values):
+            totals[k] += v
+        innings_html = f'<table><tr><th>{innings}</th><th class="fraction">{fraction}</th></tr></table>'
+        rows.append(f'<tr><td>○</td><td class="player">{name}</td><td>{values[0]}</td><td>{values[1]}</td>'
+                    f'<td>{innings_html}</td>' + ''.join(f'<td>{v}</td>' for v in values[2:]) + '</tr>')
+    foot = ('<tr><th></th><th>合計</th>' + ''.join(f'<th>{v}</th>' for v in totals[:2]) + '<th>9</th>'
+            + ''.join(f'<th>{v}</th>' for v in totals[2:]) + '</tr>')
+    return (f'<div id="table_{side}_p" class="table_pitcher"><table id="tablefix_{side[0]}_p">'
+            f'<thead><tr><th>投手</th></tr></thead><tbody>{"".join(rows)}</tbody><tfoot>{foot}</tfoot></table></div>')
+
+
+def _linescore_row(rng, cls, team):
+    return (f'<tr class="{cls}"><th><span class="hide_sp">{team}</span></th>'
+            + ''.join(f'<td>{rng.randint(0, 2)}</td>' for _ in range(9))
+            + f'<td class="total-1">{rng.randint(0, 9)}</td><td class="total-2">{rng.randint(3, 14)}</td>'
+            f'<td class="total-2">0</td></tr>')
+
+
+def box_html(seed, away='DeNA', home='中日', date=(2025, 8, 15), filler=80):
+    """box.html 相当のページ。filler は記事ブロックの数（ページの大きさの調整用）"""
+    rng = random.Random(seed)
+    y, m, d = date
+    away_batters = [f'{away}打者{i}' for i in range(12)]
+    home_batters = [f'{home}打者{i}' for i in range(12)]
+    news = ''.join(
+        f'<div class="news"><p>{"試合記事の本文" * 30}</p><ul>'
+        + ''.join(f'<li><a href="/news/{i}/{j}">関連リンク{j}</a></li>' for j in range(20))
+        + '</ul></div>'
+        for i in range(filler))
+    return f'''<!DOCTYPE html><html lang="ja"><head><meta charset="utf-8"><title>{away} vs {home}</title>
+<script>var dataLayer = [];</script></head><body><header><nav>{"<a href='#'>メニュー</a>" * 50}</nav></header>
+<div id="contents"><div class="game_tit"><h3>{away} vs {home}</h3><time>{y}年{m}月{d}日（金）</time></div>
+<p class="game_info">バンテリンドーム ナゴヤ 開始 18:00 試合時間 {rng.randint(2, 4)}時間{rng.randint(0, 59)}分 入場者 {rng.randint(10000, 40000):,}人</p>
+<div class="linescore"><table id="tablefix_ls"><thead><tr><th></th></tr></thead><tbody>{_linescore_row(rng, "top", away)}{_linescore_row(rng, "bottom", home)}</tbody></table></div>
+{_batter_table(rng, "top", away_batters)}{_pitcher_table(rng, "top", [f'{away}投手{i}' for i in range(5)])}
+{_batter_table(rng, "bottom", home_batters)}{_pitcher_table(rng, "bottom", [f'{home}投手{i}' for i in range(5)])}
+{news}</div><footer>{"<p>フッター</p>" * 30}</footer></body></html>'''
+
+
+def season_games(year, month, days=range(1, 29), seed=0):
+    """
+    1か月分の対戦カード。[(日, 試合番号, ホーム, ビジター), ...]
+    日程ページと box.html の両方をこの一覧から作るので、内容が食い違わない。
+    """
+    rng = random.Random(seed)
+    games = []
+    for day in days:
+        teams = NPB_TEAMS[:]
+        rng.shuffle(teams)
+        for g in range(6):
+            games.append((day, g, teams[2 * g], teams[2 * g + 1]))
+    return games
+
+
+def box_path(year, month, day, game_no):
+    """日程ページから張られる試合ページのパス"""
+    return f'/scores/{year}/{month:02d}{day:02d}/{game_no}/'
+
+
+def schedule_html(year, month, days=range(1, 29), played_until=None, seed=0):
+    """月別日程ページ（schedule_MM_detail.html 相当）。played_until より後の日は試合結果へのリンクなし"""
+    cells = {}
+    for day, g, home, away in season_games(year, month, days, seed):
+        link = ''
+        if played_until is None or day <= played_until:
+            path = box_path(year, month, day, g)
+            link = f'<div class="link"><a href="{path}">試合結果</a> <a href="{path}stats/">成績</a></div>'
+        cells.setdefault(day, []).append(
+            f'<td><div class="team1">{home}</div><div class="score">3-2</div><div class="team2">{away}</div>{link}</td>')
+    rows = ''.join(f'<tr id="date{month:02d}{day:02d}"><th>{month}/{day}</th>{"".join(tds)}</tr>'
+                   for day, tds in cells.items())
+    return f'<html><body><table class="schedule"><tbody>{rows}</tbody></table></body></html>'
+
+
+def write_fixtures(out_dir=FIXTURE_DIR, count=12, year=2025, month=8):
+    """box.html を count 件と日程ページを out_dir に書き出し、box.html のパス一覧を返す"""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for i, (day, g, home, away) in enumerate(season_games(year, month)[:count]):
+        path = os.path.join(out_dir, f'box_{year}{month:02d}{day:02d}_{g}.html')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(box_html(i, away=away, home=home, date=(year, month, day)))
+        paths.append(path)
+    with open(os.path.join(out_dir, f'schedule_{year}_{month:02d}.html'), 'w', encoding='utf-8') as f:
+        f.write(schedule_html(year, month))
+    return paths
+
+
+if __name__ == '__main__':
+    for p in write_fixtures(sys.argv[1] if len(sys.argv) > 1 else FIXTURE_DIR):
+        print(p)
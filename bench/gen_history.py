@@ -0,0 +1,124 @@
+"""
+大量の観戦履歴（matches.csv・batters_stats.csv・pitchers_stats.csv）を作る。
+
+アプリと同じカラム・書式（BOM付きUTF-8、日付は YYYY-MM-DD、試合時間は H:MM と分（試合時間_分）、
+入場者数は整数、成績カラムは float 表記）で、rows 行ずつ書き出す。
+試合は主に1チーム（中日ドラゴンズ）を追いかけている想定で、ときどき他球団の試合も混ぜる。
+同じ rows・seed からは常に同じデータができる。
+
+    python bench/gen_history.py 10000 [出力先ディレクトリ]   # 既定: bench/data/10000/data
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_ROOT = os.path.join(BENCH_DIR, 'data')
+
+SIZES = {'1k': 1_000, '10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+TEAMS = [
+    '中日ドラゴンズ', '読売ジャイアンツ', '阪神タイガース', '広島東洋カープ', '横浜DeNAベイスターズ',
+    '東京ヤクルトスワローズ', 'オリックス・バファローズ', '福岡ソフトバンクホークス', '千葉ロッテマリーンズ',
+    '東北楽天ゴールデンイーグルス', '北海道日本ハムファイターズ', '埼玉西武ライオンズ',
+]
+
+MATCH_COLUMNS = [
+    '日付', 'チーム名', 'ホーム/ビジター', '相手チーム', '得点', '失点', '勝敗', 'URL',
+    '自チーム_打数', '自チーム_安打', '自チーム_本塁打', '自チーム_盗塁', '自チーム_四球', '自チーム_死球', '自チーム_三振',
+    '自チーム_被本塁打', '自チーム_与四球', '自チーム_与死球', '自チーム_奪三振', '自チーム_与暴投', '自チーム_与ボーク',
+    '相手チーム_打数', '相手チーム_安打', '相手チーム_本塁打', '相手チーム_盗塁', '試合時間', '入場者数', 'コメント',
+    '試合時間_分',
+]
+BATTER_COLUMNS = ['選手名', 'チーム名', '打数', '安打', '打点', '盗塁', '本塁打', '三振', '四球', '死球', '犠打', '犠飛']
+PITCHER_COLUMNS = ['選手名', 'チーム名', '投球数', '投球アウト数', '打者数', '被安打', '被本塁打', '与四球', '与死球', '奪三振', '暴投', 'ボーク', '失点']
+
+
+def size_rows(size):
+    """'10k' などの表記、または数値の文字列を行数にする"""
+    return SIZES.get(str(size).lower()) or int(size)
+
+
+def data_dir(rows):
+    return os.path.join(DATA_ROOT, str(rows), 'data')
+
+
+def generate_matches(rows, rng):
+    # 3〜10月の試合日（1日に何試合も記録されることもある）
+    days = rng.integers(0, 214, rows)
+    years = rng.integers(1990, 2026, rows)
+    dates = pd.to_datetime(years.astype(str), format='%Y') + pd.to_timedelta(59 + days, unit='D')
+    main_team = rng.random(rows) < 0.7
+    team_idx = np.where(main_team, 0, rng.integers(0, len(TEAMS), rows))
+    opp_idx = (team_idx + rng.integers(1, len(TEAMS), rows)) % len(TEAMS)
+    teams = np.array(TEAMS)
+    score = rng.poisson(3.8, rows)
+    lost = rng.poisson(3.8, rows)
+    result = np.where(score > lost, '勝', np.where(score < lost, '敗', '引分'))
+    hours = rng.integers(2, 5, rows)
+    minutes = rng.integers(0, 60, rows)
+    df = pd.DataFrame({
+        '日付': dates.strftime('%Y-%m-%d'),
+        'チーム名': teams[team_idx],
+        'ホーム/ビジター': np.where(rng.random(rows) < 0.5, 'ホーム', 'ビジター'),
+        '相手チーム': teams[opp_idx],
+        '得点': score,
+        '失点': lost,
+        '勝敗': result,
+        'URL': [f'https://npb.jp/scores/{d[:4]}/{d[5:7]}{d[8:]}/g-{i % 6}/box.html' for i, d in enumerate(dates.strftime('%Y-%m-%d'))],
+    })
+    stat_ranges = {
+        '自チーム_打数': (28, 40), '自チーム_安打': (3, 15), '自チーム_本塁打': (0, 4), '自チーム_盗塁': (0, 3),
+        '自チーム_四球': (0, 7), '自チーム_死球': (0, 2), '自チーム_三振': (2, 13), '自チーム_被本塁打': (0, 4),
+        '自チーム_与四球': (0, 7), '自チーム_与死球': (0, 2), '自チーム_奪三振': (2, 13), '自チーム_与暴投': (0, 2),
+        '自チーム_与ボーク': (0, 1), '相手チーム_打数': (28, 40), '相手チーム_安打': (3, 15), '相手チーム_本塁打': (0, 4),
+        '相手チーム_盗塁': (0, 3),
+    }
+    for col, (lo, hi) in stat_ranges.items():
+        df[col] = rng.integers(lo, hi + 1, rows).astype(float)
+    df['試合時間'] = [f'{h}:{m:02d}' for h, m in zip(hours, minutes)]
+    df['試合時間_分'] = hours * 60 + minutes
+    df['入場者数'] = rng.integers(8000, 46000, rows)
+    comments = np.array(['', '', '', '', '雨天', '延長戦', '逆転勝ち', 'ビール最高'])
+    df['コメント'] = comments[rng.integers(0, len(comments), rows)]
+    return df[MATCH_COLUMNS]
+
+
+def generate_players(rows, columns, stat_ranges, prefix, rng):
+    df = pd.DataFrame({
+        '選手名': [f'{prefix}{i:07d}' for i in range(rows)],
+        'チーム名': np.array(TEAMS)[np.where(rng.random(rows) < 0.7, 0, rng.integers(0, len(TEAMS), rows))],
+    })
+    for col in columns[2:]:
+        lo, hi = stat_ranges.get(col, (0, 5))
+        df[col] = rng.integers(lo, hi + 1, rows)
+    return df[columns]
+
+
+def write_history(rows, out_dir=None, seed=0):
+    """rows 行ずつの matches.csv・batters_stats.csv・pitchers_stats.csv を out_dir に書き出して out_dir を返す"""
+    out_dir = out_dir or data_dir(rows)
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    generate_matches(rows, rng).to_csv(os.path.join(out_dir, 'matches.csv'), index=False, encoding='utf-8-sig')
+    batter_ranges = {'打数': (1, 550), '安打': (0, 170), '打点': (0, 90), '盗塁': (0, 30), '本塁打': (0, 40),
+                     '三振': (0, 140), '四球': (0, 80)}
+    generate_players(rows, BATTER_COLUMNS, batter_ranges, '打者', rng).to_csv(
+        os.path.join(out_dir, 'batters_stats.csv'), index=False, encoding='utf-8-sig')
+    pitcher_ranges = {'投球数': (10, 3000), '投球アウト数': (3, 540), '打者数': (3, 750), '被安打': (0, 180),
+                      '奪三振': (0, 200), '失点': (0, 90)}
+    generate_players(rows, PITCHER_COLUMNS, pitcher_ranges, '投手', rng).to_csv(
+        os.path.join(out_dir, 'pitchers_stats.csv'), index=False, encoding='utf-8-sig')
+    with open(os.path.join(out_dir, 'backup_counter.txt'), 'w') as f:
+        f.write('0')
+    return out_dir
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        sys.exit(f"usage: python {sys.argv[0]} ROWS（{'/'.join(SIZES)} または行数） [出力先ディレクトリ]")
+    rows = size_rows(sys.argv[1])
+    print(write_history(rows, sys.argv[2] if len(sys.argv) > 2 else None))
@@ -0,0 +1,178 @@
+"""
+NPB公式サイトの代わりにローカルで動かすHTTPサーバー（ベンチマーク・動作確認用）。
+
+- /games/YYYY/schedule_MM_detail.html : 月別日程ページ
+- /scores/YYYY/MMDD/N/box.html         : 試合ページ
+を返す。fixture_dir に同じパス構成で保存したページ（実際に保存したページなど）があればそれを、
+なければ bench/fixtures.py で作ったページを返す（日程と試合ページの対戦カードは一致する）。
+
+遅延（latency + 0〜jitter 秒）、エラー（error_rate の割合で 503）、
+応答しない接続（hang_rate の割合で hang_seconds 秒待ってから切断）を混ぜられる。
+日程ページには ETag を付け、If-None-Match が一致すれば 304 を返す。
+
+アプリをこのサーバーに向けるには NPB_BASE_URL を指定する。
+    python bench/npb_standin.py --port 8001 --latency 0.05 --error-rate 0.05
+    NPB_BASE_URL=http://127.0.0.1:8001 flask run
+"""
+import argparse
+import hashlib
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fixtures  # noqa: E402
+
+
+SCHEDULE_PATH = re.compile(r'^/games/(\d{4})/schedule_(\d{2})_detail\.html$')
+BOX_PATH = re.compile(r'^/scores/(\d{4})/(\d{2})(\d{2})/(\d+)/(?:box\.html)?$')
+
+
+class StandinServer:
+    """
+    スレッドで動くスタンドインサーバー。start() で起動して base_url を返す。
+    """
+    def __init__(self, host='127.0.0.1', port=0, fixture_dir=None, latency=0.0, jitter=0.0,
+                 error_rate=0.0, hang_rate=0.0, hang_seconds=30.0, seed=0):
+        self.fixture_dir = fixture_dir
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.hangs = 0
+        self.not_modified = 0
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _random(self):
+        with self._rng_lock:
+            return self._rng.random()
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _fixture(self, path):
+        if not self.fixture_dir:
+            return None
+        file_path = os.path.join(self.fixture_dir, path.lstrip('/'))
+        if path.endswith('/'):
+            file_path = os.path.join(file_path, 'box.html')
+        try:
+            with open(file_path, 'rb') as f:
+                return f.read()
+        except (FileNotFoundError, IsADirectoryError):
+            return None
+
+    def page(self, path):
+        """path のページ本文（bytes）。該当するページがなければ None"""
+        body = self._fixture(path)
+        if body is not None:
+            return body
+        m = SCHEDULE_PATH.match(path)
+        if m:
+            return fixtures.schedule_html(int(m.group(1)), int(m.group(2))).encode('utf-8')
+        m = BOX_PATH.match(path)
+        if m:
+            year, month, day, game_no = (int(g) for g in m.groups())
+            for d, g, home, away in fixtures.season_games(year, month):
+                if (d, g) == (day, game_no):
+                    return fixtures.box_html(d * 10 + g, away=away, home=home, date=(year, month, day)).encode('utf-8')
+        return None
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _send(self, status, body=b'', headers=None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                server._count('requests')
+                delay = server.latency + (server._random() * server.jitter if server.jitter else 0)
+                if delay:
+                    time.sleep(delay)
+                if server.hang_rate and server._random() < server.hang_rate:
+                    server._count('hangs')
+                    time.sleep(server.hang_seconds)
+                    self.close_connection = True
+                    return
+                if server.error_rate and server._random() < server.error_rate:
+                    server._count('errors')
+                    self._send(503, b'Service Unavailable')
+                    return
+                body = server.page(self.path.split('?')[0])
+                if body is None:
+                    self._send(404, b'Not Found')
+                    return
+                headers = {'Content-Type': 'text/html; charset=utf-8'}
+                if SCHEDULE_PATH.match(self.path):
+                    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                    headers['ETag'] = etag
+                    if self.headers.get('If-None-Match') == etag:
+                        server._count('not_modified')
+                        self._send(304, headers={'ETag': etag})
+                        return
+                self._send(200, body, headers)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='NPB公式サイトのスタンドインサーバー')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--fixture-dir', help='URLと同じパス構成で保存したページのディレクトリ')
+    parser.add_argument('--latency', type=float, default=0.0, help='応答までの遅延（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='遅延に加える 0〜jitter 秒のばらつき')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='503 を返す割合')
+    parser.add_argument('--hang-rate', type=float, default=0.0, help='応答しない接続の割合')
+    parser.add_argument('--hang-seconds', type=float, default=30.0)
+    args = parser.parse_args()
+    server = StandinServer(args.host, args.port, args.fixture_dir, args.latency, args.jitter,
+                           args.error_rate, args.hang_rate, args.hang_seconds)
+    print(f"NPB stand-in: {server.base_url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
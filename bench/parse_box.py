@@ -0,0 +1,86 @@
+"""
+box.html の解析ベンチマーク。
+
+保存済みのページごとに、
+- full        : ページ全体を html.parser で解析（従来の方法）
+- fast        : 必要な部分だけを FAST_PARSER（lxml があれば lxml）で解析
+- fast-html   : 必要な部分だけを html.parser で解析（lxml がない環境と同じ）
+の parse_box_score() までの時間（中央値）とピークメモリ（tracemalloc）を出す。
+どの方法でも解析結果が同じことも確認する。
+
+    python bench/parse_box.py [box.html ...]   # 省略時は tests/pages と bench/fixtures のページ（なければ作る）
+"""
+import contextlib
+import glob
+import io
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from box_score import FAST_PARSER, make_box_soup, parse_box_score  # noqa: E402
+from fixtures import FIXTURE_DIR, write_fixtures  # noqa: E402
+from record_pages import PAGES_DIR  # noqa: E402
+
+
+MODES = [
+    ('full', {'mode': 'full'}),
+    ('fast', {'mode': 'fast'}),
+    ('fast-html', {'mode': 'fast', 'parser': 'html.parser'}),
+]
+
+REPEAT = int(os.environ.get('BENCH_REPEAT', '10'))
+
+
+def parse(html, options):
+    # parse_box_score() のデバッグ出力は計測の邪魔なので捨てる
+    with contextlib.redirect_stdout(io.StringIO()):
+        return parse_box_score(make_box_soup(html, **options))
+
+
+def measure(html, options):
+    """(時間の中央値[ms], ピークメモリ[KiB], 解析結果)"""
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        parse(html, options)
+        times.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    result = parse(html, options)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), peak / 1024, result
+
+
+def main(paths):
+    if not paths:
+        paths = sorted(glob.glob(os.path.join(FIXTURE_DIR, 'box_*.html'))) or write_fixtures()
+        paths = sorted(glob.glob(os.path.join(PAGES_DIR, 'box_*.html'))) + paths
+    print(f"FAST_PARSER={FAST_PARSER} repeat={REPEAT} pages={len(paths)}")
+    print(f"{'page':<28}{'KiB':>7}" + ''.join(f"{name + ' ms':>14}{name + ' KiB':>15}" for name, _ in MODES))
+    totals = {name: [0.0, 0.0] for name, _ in MODES}
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+        line = f"{os.path.basename(path):<28}{len(html.encode()) / 1024:>7.0f}"
+        expected = None
+        for name, options in MODES:
+            ms, kib, result = measure(html, options)
+            if expected is None:
+                expected = result
+            elif result != expected:
+                raise SystemExit(f"{path}: {name} の解析結果が full と一致しません")
+            totals[name][0] += ms
+            totals[name][1] = max(totals[name][1], kib)
+            line += f"{ms:>14.2f}{kib:>15.0f}"
+        print(line)
+    base_ms = totals['full'][0]
+    for name, (ms, kib) in totals.items():
+        print(f"{name:<10} 平均 {ms / len(paths):8.2f} ms/ページ  最大ピーク {kib:8.0f} KiB  (full比 {base_ms / ms:5.1f}倍)")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
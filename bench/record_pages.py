@@ -0,0 +1,47 @@
+"""
+NPB公式サイトの試合詳細ページ(box.html)を取得して tests/pages に保存する。
+
+保存したページは tests/test_box_score.py が部分解析（fast）とページ全体の解析（full）の結果が
+同じになるかを確かめ、bench/parse_box.py も計測に使う。
+確かめたい値があれば tests/test_box_score.py の EXPECTED に追加する。
+
+    python bench/record_pages.py /scores/2025/0701/t-g-12/box.html [...]
+"""
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_client import get_client  # noqa: E402
+
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests', 'pages')
+
+
+def page_name(url):
+    """/scores/2025/0701/t-g-12/box.html → box_20250701_t-g-12.html"""
+    m = re.search(r'/scores/(\d{4})/(\d{4})/([^/]+)', url)
+    if not m:
+        raise SystemExit(f"試合詳細ページのURLではありません: {url}")
+    return f"box_{m.group(1)}{m.group(2)}_{m.group(3)}.html"
+
+
+def record(urls, out_dir=PAGES_DIR):
+    client = get_client()
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for url in urls:
+        path = os.path.join(out_dir, page_name(url))
+        html = client.get_text(client.url(url))
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(html)
+        paths.append(path)
+    return paths
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        raise SystemExit(__doc__)
+    for p in record(sys.argv[1:]):
+        print(p)
@@ -0,0 +1,139 @@
+"""
+データ量ごとの各ページ（Flaskルート）のベンチマーク。
+
+bench/gen_history.py で作った rows 行の matches.csv・batters_stats.csv・pitchers_stats.csv を
+一時ディレクトリにコピーしてアプリを読み込み、GET できるすべてのルート（url_map から自動で列挙）と
+analyze_matches() をテストクライアントで実行して、
+- cold_ms   : 起動直後の1回目（キャッシュ作成を含む）
+- median_ms : 2回目以降 repeat 回の中央値
+- peak_mib  : 1回の処理中のピークメモリ（tracemalloc）
+を出す。データ量ごとに別プロセスで実行する。
+
+    python bench/routes.py [--sizes 1k,10k,100k,1m] [--repeat 5] [--save | --tolerance 0.25]
+
+--save で結果を bench/baselines/routes.json に保存し、以降の実行ではそれと比べて回帰を表示する。
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import baselines  # noqa: E402
+import gen_history  # noqa: E402
+
+
+# url_map から作れない（クエリ文字列付きの）パス
+EXTRA_PATHS = [
+    '/players?season=2024',
+    '/edit_match_by_date?date=2024-05-01&team=中日ドラゴンズ',
+]
+# URL変数のサンプル値
+SAMPLE_ARGS = {'row_id': 0, 'job_id': 'none', 'dataset': 'matches', 'fmt': 'csv'}
+
+
+def discover_paths(app):
+    """GET できるルートのパス一覧（static を除く）"""
+    from flask import url_for
+    paths = []
+    with app.test_request_context():
+        for rule in app.url_map.iter_rules():
+            if 'GET' not in rule.methods or rule.endpoint == 'static':
+                continue
+            paths.append(url_for(rule.endpoint, **{arg: SAMPLE_ARGS.get(arg, 0) for arg in rule.arguments}))
+    return sorted(set(paths)) + EXTRA_PATHS
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def peak_mib(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def run_size(rows, repeat):
+    """このプロセスの中で rows 行のデータに対して計測し、{パス: 指標} を返す"""
+    source = gen_history.data_dir(rows)
+    if not os.path.exists(os.path.join(source, 'matches.csv')):
+        gen_history.write_history(rows)
+    work_dir = tempfile.mkdtemp(prefix='bench_routes_')
+    shutil.copytree(source, os.path.join(work_dir, 'data'))
+    os.chdir(work_dir)
+    os.environ['JOB_WORKERS'] = '0'
+    sys.path.insert(0, REPO_DIR)
+
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        startup_ms, _ = timed(lambda: __import__('app'))
+        import app
+        client = app.app.test_client()
+        targets = [(path, lambda path=path: client.get(path)) for path in discover_paths(app.app)]
+        targets.append(('analyze_matches()', app.analyze_matches))
+        results['startup'] = {'cold_ms': round(startup_ms, 2)}
+        for name, func in targets:
+            cold_ms, response = timed(func)
+            warm = [timed(func)[0] for _ in range(repeat)]
+            results[name] = {
+                'status': getattr(response, 'status_code', 200),
+                'cold_ms': round(cold_ms, 2),
+                'median_ms': round(statistics.median(warm), 2),
+                'peak_mib': round(peak_mib(func), 2),
+            }
+    results['process'] = {'peak_rss_mib': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='データ量ごとの各ページのベンチマーク')
+    parser.add_argument('--sizes', default='1k,10k', help=f"カンマ区切り（{'/'.join(gen_history.SIZES)} または行数）")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--save', action='store_true', help='結果をベースラインとして保存する')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--run', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_size(args.run, args.repeat), ensure_ascii=False))
+        return 0
+
+    results = {}
+    for size in args.sizes.split(','):
+        rows = gen_history.size_rows(size.strip())
+        out = subprocess.run([sys.executable, __file__, '--run', str(rows), '--repeat', str(args.repeat)],
+                             check=True, capture_output=True, text=True).stdout
+        size_results = json.loads(out.strip().splitlines()[-1])
+        print(f"== {rows} 行  起動 {size_results['startup']['cold_ms']:.0f} ms  "
+              f"ピークRSS {size_results['process']['peak_rss_mib']:.0f} MiB")
+        print(f"{'route':<52}{'status':>7}{'cold ms':>11}{'median ms':>11}{'peak MiB':>10}")
+        for name, m in size_results.items():
+            if name in ('startup', 'process'):
+                continue
+            print(f"{name:<52}{m['status']:>7}{m['cold_ms']:>11.1f}{m['median_ms']:>11.1f}{m['peak_mib']:>10.1f}")
+        for name, m in size_results.items():
+            results[f'{rows}:{name}'] = m
+    return 1 if baselines.report('routes', results, {'repeat': args.repeat}, args.save, args.tolerance) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+スクレイピング〜記録処理のベンチマーク（npb.jp には接続しない）。
+
+bench/npb_standin.py のスタンドインサーバーを起動し、空のデータディレクトリで
+- sequential : 1試合ずつ record_match_job()（日程から試合URLを探す → 取得・解析 → 記録）
+- backfill   : backfill_matches() で期間内の試合をまとめて並列に取得・記録
+を実行して、試合/秒・1試合あたりの p50/p99 レイテンシ・ピークメモリ（RSS）を出す。
+シナリオごとに別プロセスで実行するので、キャッシュや読み込み済みのモジュールは持ち越さない。
+
+    python bench/scrape.py [--games 56] [--latency 0.02] [--error-rate 0.05] [--save | --tolerance 0.25]
+
+--save で結果を bench/baselines/scrape.json に保存し、以降の実行ではそれと比べて回帰を表示する
+（回帰があれば終了コード 1）。
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import baselines  # noqa: E402
+import fixtures  # noqa: E402
+from npb_standin import StandinServer  # noqa: E402
+
+
+TEAM = '中日ドラゴンズ'
+NPB_TEAM = '中日'
+SCENARIOS = ['sequential', 'backfill']
+
+
+def team_dates(games, year=2025, first_month=4):
+    """スタンドインの日程で TEAM が試合をする日付を、先頭から games 件"""
+    dates = []
+    month = first_month
+    while len(dates) < games:
+        for day, _, home, away in fixtures.season_games(year, month):
+            if NPB_TEAM in (home, away):
+                dates.append(datetime(year, month, day))
+        month += 1
+    return dates[:games]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = (len(values) - 1) * p
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def run_scenario(scenario, args):
+    """このプロセスの中で1シナリオを実行して指標の辞書を返す"""
+    server = StandinServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+    base_url = server.start()
+    work_dir = tempfile.mkdtemp(prefix='bench_scrape_')
+    os.chdir(work_dir)
+    os.environ.update({
+        'NPB_BASE_URL': base_url,
+        'NPB_HTTP_MIN_INTERVAL': '0',
+        'NPB_HTTP_BACKOFF': '0.05',
+        'NPB_HTTP_CACHE_DIR': os.path.join(work_dir, 'http_cache'),
+        'NPB_SCHEDULE_INDEX_DIR': os.path.join(work_dir, 'schedule_index'),
+        'NPB_BOX_CACHE_DIR': os.path.join(work_dir, 'box_cache'),
+        'JOB_WORKERS': '0',
+    })
+    sys.path.insert(0, REPO_DIR)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+
+    dates = team_dates(args.games)
+    latencies = []
+    ok = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if scenario == 'sequential':
+            for date in dates:
+                t0 = time.perf_counter()
+                success, _ = app.record_match_job(date.strftime('%Y-%m-%d'), TEAM)
+                latencies.append(time.perf_counter() - t0)
+                ok += bool(success)
+        else:
+            # 1試合ごとの取得・解析の時間を測るため load_box_score を包む
+            load_box_score = app.load_box_score
+
+            def timed_load(match_url):
+                t0 = time.perf_counter()
+                try:
+                    return load_box_score(match_url)
+                finally:
+                    latencies.append(time.perf_counter() - t0)
+            app.load_box_score = timed_load
+            ok, _, _ = app.backfill_matches(TEAM, dates[0], dates[-1], workers=args.workers)
+    elapsed = time.perf_counter() - start
+    server.stop()
+    return {
+        'games': len(dates),
+        'recorded': ok,
+        'elapsed_s': round(elapsed, 4),
+        'games_per_s': round(ok / elapsed, 3) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'peak_rss_mib': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'requests': server.requests,
+        'injected_errors': server.errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='スクレイピング〜記録処理のベンチマーク')
+    parser.add_argument('--games', type=int, default=56)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--jitter', type=float, default=0.01)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--scenario', choices=SCENARIOS, action='append', help='実行するシナリオ（既定: すべて）')
+    parser.add_argument('--save', action='store_true', help='結果をベースラインとして保存する')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--run', choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_scenario(args.run, args)))
+        return 0
+
+    child_args = [a for a in sys.argv[1:] if a != '--save']
+    results = {}
+    for scenario in args.scenario or SCENARIOS:
+        out = subprocess.run([sys.executable, __file__, '--run', scenario] + child_args,
+                             check=True, capture_output=True, text=True).stdout
+        results[scenario] = json.loads(out.strip().splitlines()[-1])
+        m = results[scenario]
+        print(f"{scenario:<11} {m['recorded']}/{m['games']} 試合  {m['games_per_s']:7.2f} 試合/秒  "
+              f"p50 {m['p50_ms']:8.1f} ms  p99 {m['p99_ms']:8.1f} ms  RSS {m['peak_rss_mib']:6.1f} MiB  "
+              f"リクエスト {m['requests']}（エラー注入 {m['injected_errors']}）")
+    # エラー注入なしで記録できなかった試合があれば、速度以前に壊れている
+    incomplete = [s for s, m in results.items() if m['recorded'] < m['games'] and not args.error_rate]
+    for scenario in incomplete:
+        print(f"[失敗] {scenario}: {results[scenario]['recorded']}/{results[scenario]['games']} 試合しか記録できませんでした")
+    name = 'scrape' if not args.error_rate else f'scrape_err{args.error_rate:g}'
+    params = {'games': args.games, 'workers': args.workers, 'latency': args.latency, 'jitter': args.jitter,
+              'error_rate': args.error_rate}
+    regressed = baselines.report(name, results, params, args.save and not incomplete, args.tolerance)
+    return 1 if incomplete or regressed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
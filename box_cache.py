@@ -0,0 +1,73 @@
+"""
+box.html の解析結果（parse_box_score() の辞書）を試合URLをキーにディスクへ保存するキャッシュ。
+
+終わった試合の box.html は変わらないので、一度解析した結果を
+<sha256(url)>.json.zz（zlib 圧縮した JSON）として保存しておき、
+同じ試合の記録し直し・一括取得・選手成績の作り直しでは通信もHTML解析もせずに使う。
+
+試合時間が載っていない（まだ終わっていない）試合は保存しない。
+解析処理を変えたときは box_score.PARSE_VERSION を上げれば、古い解析結果は使われなくなる。
+"""
+import hashlib
+import json
+import os
+import zlib
+
+from box_score import PARSE_VERSION
+from metrics import cache_event
+
+
+class BoxScoreCache:
+    """
+    cache_dir 以下に試合URLごとの解析結果を保存する。
+    """
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], key + '.json.zz')
+
+    def load(self, url):
+        """保存済みの解析結果を返す。なければ（または解析処理が変わっていれば）None"""
+        try:
+            with open(self._path(url), 'rb') as f:
+                entry = json.loads(zlib.decompress(f.read()).decode('utf-8'))
+        except (FileNotFoundError, ValueError, zlib.error):
+            self.misses += 1
+            cache_event('box_score', 'miss')
+            return None
+        if entry.get('version') != PARSE_VERSION or entry.get('url') != url:
+            self.misses += 1
+            cache_event('box_score', 'miss')
+            return None
+        self.hits += 1
+        cache_event('box_score', 'hit')
+        return entry['parsed']
+
+    def store(self, url, parsed):
+        """解析結果を保存する。試合が終わっていない（試合時間がない）場合は保存せず False"""
+        if not parsed.get('game_time'):
+            return False
+        path = self._path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps({'version': PARSE_VERSION, 'url': url, 'parsed': parsed},
+                          ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, 'wb') as f:
+            f.write(zlib.compress(data, 6))
+        os.replace(tmp_path, path)
+        return True
+
+
+_cache = None
+
+
+def get_box_cache():
+    """アプリ全体で共有するキャッシュ（保存先は NPB_BOX_CACHE_DIR、既定は data/box_cache）"""
+    global _cache
+    if _cache is None:
+        _cache = BoxScoreCache(os.environ.get('NPB_BOX_CACHE_DIR', os.path.join('data', 'box_cache')))
+    return _cache
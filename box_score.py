@@ -0,0 +1,308 @@
+"""
+NPB公式サイトの試合詳細ページ(box.html)の解析。
+
+1回取得・1回パースしたBeautifulSoupから、
+試合情報（日付・試合時間・入場者数）、スコア、チーム成績(tfoot)、選手ごとの成績を
+まとめて取り出し、JSONにそのまま変換できる辞書で返す。
+ホーム/ビジターどちら側の成績も含むので、どちらのチームの記録にも使える。
+
+make_box_soup() はページ全体ではなく、解析に使う部分
+（game_tit・game_info・tablefix_ls・table_{top,bottom}_{b,p}）だけを木にする。
+lxml があれば lxml で、なければ html.parser で解析する。
+環境変数 NPB_BOX_PARSE_MODE=full で従来どおりページ全体を html.parser で解析する。
+"""
+import os
+import re
+from datetime import datetime
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from app_logging import debug_sampled, get_logger
+from metrics import stage
+
+try:
+    import lxml  # noqa: F401
+    FAST_PARSER = 'lxml'
+except ImportError:
+    FAST_PARSER = 'html.parser'
+
+
+logger = get_logger(__name__)
+
+# ホーム/ビジター → box.html上の表の位置（ビジターが上段、ホームが下段）
+SIDE_BY_HOME_AWAY = {'ホーム': 'bottom', 'ビジター': 'top'}
+
+# チーム成績(tfoot)を読む表
+TEAM_STATS_DIV_IDS = ['table_top_b', 'table_top_p', 'table_bottom_b', 'table_bottom_p']
+
+
+# 解析に使う部分（これ以外のヘッダー・記事・フッターなどは木にしない）
+BOX_REGION_IDS = {'tablefix_ls', *TEAM_STATS_DIV_IDS}
+BOX_REGION_CLASSES = {'game_tit', 'game_info'}
+
+BOX_PARSE_MODE = os.environ.get('NPB_BOX_PARSE_MODE', 'fast')
+
+# parse_box_score() の出力形式・解析処理を変えたら上げる（保存済みの解析結果を使わなくなる）
+# 2: 投手の投球回を整数に切り捨てず、アウト数（投球アウト数）で持つ
+# 3: 端数だけの投球回（2/3 など）を整数の回と読み違えていたのを直した
+PARSE_VERSION = 3
+
+
+class BoxScoreError(Exception):
+    """box.htmlから必要な情報が取れなかった"""
+
+
+class BoxRegionStrainer(SoupStrainer):
+    """
+    BOX_REGION_IDS / BOX_REGION_CLASSES に当たる div・p・table だけを残す SoupStrainer。
+    （id と class のどちらかに当たればよいので、タグ生成の判定を上書きする）
+    """
+    def __init__(self):
+        super().__init__(['div', 'p', 'table'])
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        if name not in ('div', 'p', 'table') or not attrs:
+            return False
+        if attrs.get('id') in BOX_REGION_IDS:
+            return True
+        classes = attrs.get('class') or ''
+        if isinstance(classes, str):
+            classes = classes.split()
+        return any(c in BOX_REGION_CLASSES for c in classes)
+
+
+def make_box_soup(html, mode=None, parser=None):
+    """
+    box.htmlのBeautifulSoupを作る。
+    mode='fast'（既定）は必要な部分だけを parser（既定は FAST_PARSER）で、
+    mode='full' はページ全体を html.parser で解析する。
+    """
+    mode = mode or BOX_PARSE_MODE
+    if mode == 'full':
+        return BeautifulSoup(html, 'html.parser')
+    return BeautifulSoup(html, parser or FAST_PARSER, parse_only=BoxRegionStrainer())
+
+
+def extract_team_name(row):
+    """複数の方法でチーム名を抽出"""
+    # 方法1: span要素（クラス名に関係なく）
+    team_span = row.find('span')
+    if team_span:
+        return team_span.text.strip()
+
+    # 方法2: th要素内のspan
+    team_th = row.find('th')
+    if team_th:
+        span_in_th = team_th.find('span')
+        if span_in_th:
+            return span_in_th.text.strip()
+        else:
+            return team_th.text.strip()
+
+    # 方法3: 最初のtdから取得
+    first_td = row.find('td')
+    if first_td:
+        return first_td.get_text(strip=True)
+
+    # 方法4: 行全体から数字以外の部分を抽出
+    row_text = row.get_text(strip=True)
+    match = re.search(r'^([^\d]+)', row_text)
+    if match:
+        return match.group(1).strip()
+
+    return "不明"
+
+
+def _safe_int(text):
+    try:
+        return int(text.strip())
+    except (ValueError, AttributeError):
+        return 0
+
+
+def _tfoot_ths(soup, div_id):
+    """div内の表の合計行(tfoot)のth文字列をすべて返す。表がなければ None"""
+    div = soup.find('div', id=div_id)
+    if not div or not div.find('tfoot') or not div.find('tfoot').find('tr'):
+        return None
+    return [th.text.strip() for th in div.find('tfoot').find('tr').find_all('th')]
+
+
+def pick_stats(ths, indices):
+    """_tfoot_ths の結果から indices の位置の値を取り出す（足りなければ None）"""
+    if ths is None:
+        return [None] * len(indices)
+    return [ths[i] if len(ths) > i else None for i in indices]
+
+
+def _digit(td):
+    text = td.text.strip()
+    return int(text) if text.isdigit() else 0
+
+
+def _outs(td):
+    """
+    投球回のセル（'5' と '2/3' が別々の <th>）をアウト数にする（5 2/3 → 17）。
+    1アウトも取れずに降板した投手は整数部が空や 0 で、端数だけ（'' と '2/3' → 2）のこともある。
+    """
+    whole = thirds = 0
+    for th in td.find_all('th'):
+        m = re.fullmatch(r'(?:(\d+)\s*)?(?:([12])/3)?', th.get_text(strip=True))
+        if not m:
+            continue
+        if m.group(1):
+            whole = int(m.group(1))
+        if m.group(2):
+            thirds = int(m.group(2))
+    return whole * 3 + thirds
+
+
+def extract_batters(soup, side):
+    """side（'top' または 'bottom'）の打者ごとの成績"""
+    batters = []
+    bat_div = soup.find('div', id=f'table_{side}_b')
+    bat_table = bat_div.find('table', id=f'tablefix_{side[0]}_b') if bat_div else None
+    if bat_table and bat_table.find('tbody'):
+        for tr in bat_table.find('tbody').find_all('tr'):
+            tds = tr.find_all('td', recursive=False)
+            if not tds or len(tds) < 9:
+                continue
+            player_td = tr.find('td', class_='player')
+            if not player_td:
+                continue
+            batters.append({
+                '選手名': player_td.text.strip(),
+                '打数': _digit(tds[3]),
+                '安打': _digit(tds[5]),
+                '打点': _digit(tds[6]),
+                '盗塁': _digit(tds[7]),
+                '本塁打': sum('本' in td.get_text() for td in tds[5:]),
+                '三振': sum('三　振' in td.get_text() for td in tds),
+                '四球': sum('四' in td.get_text() for td in tds),
+                '死球': sum('死　球' in td.get_text() for td in tds),
+                '犠打': sum('犠打' in td.get_text() for td in tds),
+                '犠飛': sum('犠飛' in td.get_text() for td in tds)
+            })
+    return batters
+
+
+def extract_pitchers(soup, side):
+    """side（'top' または 'bottom'）の投手ごとの成績"""
+    pitchers = []
+    pitch_div = soup.find('div', id=f'table_{side}_p')
+    pitch_table = pitch_div.find('table', id=f'tablefix_{side[0]}_p') if pitch_div else None
+    if pitch_table and pitch_table.find('tbody'):
+        for tr in pitch_table.find('tbody').find_all('tr'):
+            tds = tr.find_all('td', recursive=False)
+            if not tds or len(tds) < 13:
+                continue
+            player_td = tr.find('td', class_='player')
+            if not player_td:
+                continue
+            pitchers.append({
+                '選手名': player_td.text.strip(),
+                # 投球回（5つ目<td>内の<th>）は 1/3 回単位なので、アウト数で持つ
+                '投球アウト数': _outs(tds[4]),
+                '投球数': _digit(tds[2]),
+                '打者数': _digit(tds[3]),
+                '被安打': _digit(tds[5]),
+                '被本塁打': _digit(tds[6]),
+                '与四球': _digit(tds[7]),
+                '与死球': _digit(tds[8]),
+                '奪三振': _digit(tds[9]),
+                '暴投': _digit(tds[10]),
+                'ボーク': _digit(tds[11]),
+                '失点': _digit(tds[12])
+            })
+    return pitchers
+
+
+def extract_player_stats(soup, side):
+    """
+    side の打者・投手ごとの成績を (batters, pitchers) で返す。
+    解析に失敗しても試合結果の記録は続けられるよう、例外は握りつぶして取れた分だけ返す。
+    """
+    batters, pitchers = [], []
+    try:
+        batters = extract_batters(soup, side)
+        pitchers = extract_pitchers(soup, side)
+    except Exception as e:
+        logger.error("選手個人成績スクレイピング失敗: %s", e)
+    return batters, pitchers
+
+
+def parse_box_score(soup):
+    """
+    box.htmlのBeautifulSoupを解析して辞書で返す。
+    必要な要素（日付・スコア表）が見つからない場合は BoxScoreError。
+    """
+    # 試合日付取得
+    game_tit_div = soup.find('div', class_='game_tit')
+    if not game_tit_div or not game_tit_div.find('time'):
+        raise BoxScoreError("試合タイトル部または日付が取得できませんでした。")
+    game_date_elem = game_tit_div.find('time')
+    date_match = re.search(r'(\d{4})年(\d{1,2})月(\d{1,2})日', game_date_elem.text)
+    if not date_match:
+        raise BoxScoreError("試合日付が取得できませんでした。")
+    match_date = datetime(int(date_match.group(1)), int(date_match.group(2)), int(date_match.group(3))).strftime('%Y-%m-%d')
+    game_info_p = soup.find('p', class_='game_info')
+    info_text = game_info_p.get_text(strip=True) if game_info_p else ""
+    # 試合時間は「5時間13分」→「5:13」の形で抽出・変換
+    m = re.search(r'試合時間\s*([0-9]{1,2})時間([0-9]{1,2})分', info_text)
+    if m:
+        match_time = f"{int(m.group(1))}:{m.group(2).zfill(2)}"
+    else:
+        match_time = ""
+    # 入場者数は数字のみ抽出（例: 36,292 → 36292）
+    m = re.search(r'入場者\s*([0-9,]+)', info_text)
+    attendance = m.group(1).replace(",", "") if m else ""
+    # スコア取得
+    linescore = soup.find('table', id='tablefix_ls')
+    if not linescore:
+        raise BoxScoreError("スコアテーブルが見つかりません。")
+    away_row = linescore.find('tr', class_='top')
+    home_row = linescore.find('tr', class_='bottom')
+    if not away_row or not home_row:
+        raise BoxScoreError("スコア行が見つかりません。")
+
+    # 行のHTMLは大きいので、DEBUG でも一部の試合だけ出す
+    debug_sampled(logger, "away_row HTML: %s", away_row)
+    debug_sampled(logger, "home_row HTML: %s", home_row)
+
+    away_team_text = extract_team_name(away_row)
+    home_team_text = extract_team_name(home_row)
+
+    logger.debug("away_team_text: %s home_team_text: %s", away_team_text, home_team_text)
+
+    away_total = away_row.find('td', class_='total-1')
+    home_total = home_row.find('td', class_='total-1')
+
+    players = {side: extract_player_stats(soup, side) for side in ('top', 'bottom')}
+
+    return {
+        'date': match_date,
+        'game_time': match_time,
+        'attendance': attendance,
+        'away_team': away_team_text,
+        'home_team': home_team_text,
+        'away_score': _safe_int(away_total.text if away_total else None),
+        'home_score': _safe_int(home_total.text if home_total else None),
+        'team_stats': {div_id: _tfoot_ths(soup, div_id) for div_id in TEAM_STATS_DIV_IDS},
+        'batters': {side: players[side][0] for side in players},
+        'pitchers': {side: players[side][1] for side in players},
+    }
+
+
+def parse_box_html(html):
+    """
+    box.htmlの文字列を解析して parse_box_score() の辞書を返す。
+    必要な部分だけの解析で要素が見つからなかった場合は、ページ全体の html.parser 解析でやり直す。
+    """
+    with stage('html_parse'):
+        try:
+            return parse_box_score(make_box_soup(html))
+        except BoxScoreError:
+            if BOX_PARSE_MODE == 'full':
+                raise
+            logger.debug("部分解析で要素が見つからないため、ページ全体を解析し直します")
+            return parse_box_score(make_box_soup(html, mode='full'))
@@ -0,0 +1,108 @@
+"""
+レスポンスの圧縮（gzip / brotli）と、静的ファイル（static/）の事前圧縮・フィンガープリント。
+
+- HTML・JSON などのテキストのレスポンスは、Accept-Encoding に合わせて圧縮して返す
+  （brotli は brotli パッケージが入っている場合だけ使う）
+- static/ のファイルは起動時（とファイルが変わったとき）に内容のハッシュ（フィンガープリント）と
+  圧縮済みのデータを作っておき、リクエストごとには圧縮しない。
+  url_for('static', ...) には ?v=<フィンガープリント> を付けるので、ファイルが変わればURLも変わり、
+  ブラウザには長期間キャッシュさせてよい
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# 優先する順（brotli が使えなければ gzip だけ）
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+COMPRESSIBLE_TYPES = {'text/html', 'text/css', 'text/plain', 'text/csv', 'application/json',
+                      'application/javascript', 'application/x-ndjson'}
+# これより小さいレスポンスは圧縮しない（ヘッダーの分だけ大きくなるため）
+MIN_SIZE = 512
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# 事前圧縮は1回だけなので最大の圧縮率で行う
+STATIC_GZIP_LEVEL = 9
+STATIC_BROTLI_QUALITY = 11
+
+
+def negotiate(accept_encodings, available=ENCODINGS):
+    """Accept-Encoding（request.accept_encodings）で受け付けられる圧縮方式のうち最適なもの。なければ None"""
+    best = None
+    best_quality = 0
+    for encoding in available:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding, static=False):
+    if encoding == 'br':
+        return brotli.compress(data, quality=STATIC_BROTLI_QUALITY if static else BROTLI_QUALITY)
+    if encoding == 'gzip':
+        # mtime=0 にして、同じ内容なら同じバイト列にする
+        return gzip.compress(data, compresslevel=STATIC_GZIP_LEVEL if static else GZIP_LEVEL, mtime=0)
+    raise ValueError(f"未対応の圧縮方式です: {encoding}")
+
+
+def compressible(mimetype):
+    return mimetype in COMPRESSIBLE_TYPES
+
+
+class StaticAsset:
+    """static/ の1ファイル（内容・フィンガープリント・圧縮済みデータ）"""
+    def __init__(self, path, stamp):
+        with open(path, 'rb') as f:
+            self.data = f.read()
+        self.stamp = stamp
+        self.fingerprint = hashlib.sha256(self.data).hexdigest()[:12]
+        self.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.encoded = {}
+        if compressible(self.mimetype) and len(self.data) >= MIN_SIZE:
+            for encoding in ENCODINGS:
+                self.encoded[encoding] = compress(self.data, encoding, static=True)
+
+
+class StaticAssets:
+    """
+    static_folder 以下のファイルのフィンガープリントと圧縮済みデータ。
+    ファイルの mtime・サイズが変わっていれば作り直す。
+    """
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self._lock = threading.Lock()
+        self._assets = {}
+
+    def _path(self, filename):
+        path = os.path.normpath(os.path.join(self.static_folder, filename))
+        if not path.startswith(os.path.normpath(self.static_folder) + os.sep):
+            return None
+        return path
+
+    def get(self, filename):
+        """filename の StaticAsset。ファイルがなければ None"""
+        path = self._path(filename)
+        if path is None:
+            return None
+        try:
+            st = os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            asset = self._assets.get(filename)
+            if asset is None or asset.stamp != stamp:
+                asset = self._assets[filename] = StaticAsset(path, stamp)
+            return asset
+
+    def fingerprint(self, filename):
+        asset = self.get(filename)
+        return asset.fingerprint if asset is not None else None
@@ -0,0 +1,65 @@
+"""
+データの書き出し（/export/<データ>.csv / .ndjson）を、行を少しずつ返すジェネレーターで組み立てる。
+
+全件を DataFrame や文字列にまとめてから返すのではなく、CHUNK_ROWS 行ずつ書式化して yield するので、
+履歴がどれだけ多くても書き出し中に増えるメモリは一定になる（レスポンスは chunked で送られる）。
+
+- 試合データ: MatchQueryIndex.iter_rows() で /api/matches と同じ絞り込み・並べ替えをした行
+- 選手成績（通算・試合ごとの台帳）: PlayerStatsStore / PlayerGameLedger がメモリに持つ DataFrame
+  （差分ログ・取消行を反映済み）から CHUNK_ROWS 行ずつ組み立てる
+"""
+import csv
+import io
+import json
+
+from match_query import frame_rows
+
+
+CHUNK_ROWS = 500
+
+
+def iter_csv(columns, rows):
+    """BOM付きのCSV（Excelでそのまま開けるように、アプリが保存するCSVと同じ形式）"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    buffer.write('\ufeff')
+    writer.writerow(columns)
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(columns, rows):
+    """1行1件のJSON（キーはカラム名）"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+        if len(lines) == CHUNK_ROWS:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def iter_frame_rows(df, columns, integer_columns, date_from=None, date_to=None, team=None):
+    """
+    選手成績の DataFrame（read_all() の形）の行を columns の順の値のタプルで返すジェネレーター。
+    integer_columns は int で返す。
+    date_from / date_to（'YYYY-MM-DD'、両端を含む）は台帳の日付、team はチーム名で絞り込む。
+    """
+    if team is not None:
+        df = df[df['チーム名'] == team]
+    if date_from is not None or date_to is not None:
+        dates = df['日付']
+        keep = dates != ''
+        if date_from is not None:
+            keep &= dates >= date_from
+        if date_to is not None:
+            keep &= dates <= date_to
+        df = df[keep]
+    for start in range(0, len(df), CHUNK_ROWS):
+        yield from frame_rows(df.iloc[start:start + CHUNK_ROWS], columns, integer_columns=integer_columns)
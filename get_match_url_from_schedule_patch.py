@@ -1,55 +1,193 @@
 from datetime import datetime
-import requests
 from bs4 import BeautifulSoup
 import re
-import traceback
+import os
+import json
+import threading
+import time
+from http_client import get_client
+from http_cache import get_cache
+from metrics import stage
+from app_logging import get_logger
+
+logger = get_logger(__name__)
+
+# 日程ページのキャッシュ有効期間（秒）。過去の月はほぼ変わらないので長く、今月以降は短くする
+SCHEDULE_TTL_PAST = int(os.environ.get('NPB_SCHEDULE_TTL_PAST', str(7 * 24 * 3600)))
+SCHEDULE_TTL_CURRENT = int(os.environ.get('NPB_SCHEDULE_TTL_CURRENT', '600'))
+
+def schedule_ttl(year, month, today=None):
+    """指定月の日程ページのキャッシュ有効期間（秒）"""
+    today = today or datetime.today()
+    if (year, month) < (today.year, today.month):
+        return SCHEDULE_TTL_PAST
+    return SCHEDULE_TTL_CURRENT
+
+def fetch_schedule_html(year, month):
+    """月別の日程ページ(schedule_MM_detail.html)を、ディスクキャッシュ経由で取得する"""
+    client = get_client()
+    schedule_url = client.url(f"/games/{year}/schedule_{month:02d}_detail.html")
+    return client.get_text_cached(schedule_url, get_cache(), schedule_ttl(year, month))
+
+def parse_schedule_games(html):
+    """
+    月別の日程ページから試合の一覧を取り出す。
+    [{'date': 'MMDD', 'home': ホーム(team1), 'visitor': ビジター(team2), 'url': box.htmlのURL or None}, ...]
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    games = []
+    for date_row_tr_tag in soup.find_all('tr', id=re.compile(r'^date\d{4}')):
+        mmdd = date_row_tr_tag['id'][4:8]
+        for cell in date_row_tr_tag.find_all('td'):
+            team1_elem = cell.find('div', class_='team1') # ホーム
+            team2_elem = cell.find('div', class_='team2') # ビジター
+            if not team1_elem and not team2_elem:
+                continue
+            target_match_url = None
+            match_link_tag = cell.find('a', href=re.compile(r'/scores/'))
+            if match_link_tag and '/stats' not in match_link_tag.get('href'):
+                target_match_url = match_link_tag.get('href')
+                if not target_match_url.endswith('/box.html'):
+                    target_match_url = target_match_url.rstrip('/') + '/box.html'
+            games.append({
+                'date': mmdd,
+                'home': team1_elem.text.strip() if team1_elem else "",
+                'visitor': team2_elem.text.strip() if team2_elem else "",
+                'url': target_match_url,
+            })
+    return games
+
+
+class ScheduleIndex:
+    """
+    (日付, NPB短縮名) → (試合URL, ホーム/ビジター, 相手チーム) の月別インデックス。
+
+    日程ページは月ごとに1回だけ解析し、index_dir/YYYY_MM.json に保存する。
+    保存から schedule_ttl() 以内ならファイル（またはメモリ）の内容をそのまま使い、
+    過ぎていれば日程ページを取り直して作り直す。
+    """
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        # _months（と保存済みファイルの読み込み）を守るロック。通信中は持たない
+        self._lock = threading.Lock()
+        self._months = {}
+        # 月ごとの取得中ロック（同じ月の日程ページを二重に取りに行かない）
+        self._fetching = {}
+
+    def _path(self, year, month):
+        return os.path.join(self.index_dir, f"{year}_{month:02d}.json")
+
+    @staticmethod
+    def _build(year, month, games, built_at):
+        days = {}
+        lookup = {}
+        for game in games:
+            date_str = f"{year}-{game['date'][:2]}-{game['date'][2:]}"
+            days.setdefault(date_str, []).append(game)
+            for team, status, opponent in ((game['home'], 'ホーム', game['visitor']),
+                                           (game['visitor'], 'ビジター', game['home'])):
+                if not team:
+                    continue
+                # 同じ日に同じチームが複数ある場合は、URLのある最初の試合を優先する
+                current = lookup.get((date_str, team))
+                if current is None or (current[0] is None and game['url']):
+                    lookup[(date_str, team)] = (game['url'], status, opponent)
+        return {'built_at': built_at, 'days': days, 'lookup': lookup}
+
+    def _read_file(self, year, month):
+        try:
+            with open(self._path(year, month), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        return self._build(year, month, data.get('games', []), data.get('built_at', 0))
+
+    def _write_file(self, year, month, games, built_at):
+        os.makedirs(self.index_dir, exist_ok=True)
+        path = self._path(year, month)
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'year': year, 'month': month, 'built_at': built_at, 'games': games}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _cached(self, year, month):
+        index = self._months.get((year, month))
+        if index is None:
+            index = self._read_file(year, month)
+            if index is not None:
+                self._months[(year, month)] = index
+        return index
+
+    def _fresh(self, year, month, index):
+        return index is not None and time.time() - index['built_at'] < schedule_ttl(year, month)
+
+    def month(self, year, month, fetch=True):
+        """
+        指定月のインデックス。fetch=False の場合は通信せず、保存済みのものだけを返す（なければ None）。
+        日程ページの取得・解析中は共有のロックを持たない（取得中も games_on() などは待たされない）。
+        同じ月を同時に取りに行くのは1スレッドだけで、ほかのスレッドはその結果を使う。
+        """
+        with self._lock:
+            index = self._cached(year, month)
+            if not fetch or self._fresh(year, month, index):
+                return index
+            month_lock = self._fetching.setdefault((year, month), threading.Lock())
+        with month_lock:
+            with self._lock:
+                index = self._cached(year, month)
+                if self._fresh(year, month, index):
+                    return index
+            html = fetch_schedule_html(year, month)
+            with stage('html_parse'):
+                games = parse_schedule_games(html)
+            built_at = time.time()
+            self._write_file(year, month, games, built_at)
+            index = self._build(year, month, games, built_at)
+            with self._lock:
+                self._months[(year, month)] = index
+            return index
+
+    def games_on(self, target_date_str):
+        """保存済みのインデックスから、その日の試合一覧を返す（通信しない）"""
+        target = datetime.strptime(target_date_str, '%Y-%m-%d')
+        index = self.month(target.year, target.month, fetch=False)
+        return index['days'].get(target_date_str, []) if index else []
+
+    def lookup(self, target_date_str, npb_team_name):
+        """(試合URL, ホーム/ビジター, 相手チーム) を返す。見つからなければ None"""
+        target = datetime.strptime(target_date_str, '%Y-%m-%d')
+        lookup = self.month(target.year, target.month)['lookup']
+        entry = lookup.get((target_date_str, npb_team_name))
+        if entry is None:
+            # 短縮名以外（正式名称など）が渡された場合は、その日のチーム名と部分一致で探す
+            for game in self.games_on(target_date_str):
+                for team in (game['home'], game['visitor']):
+                    if team and (team in npb_team_name or npb_team_name in team):
+                        return lookup[(target_date_str, team)]
+        return entry
+
+
+_schedule_index = None
+
+
+def get_schedule_index():
+    """アプリ全体で共有するインデックス（保存先は NPB_SCHEDULE_INDEX_DIR、既定は data/schedule_index）"""
+    global _schedule_index
+    if _schedule_index is None:
+        _schedule_index = ScheduleIndex(os.environ.get('NPB_SCHEDULE_INDEX_DIR', os.path.join('data', 'schedule_index')))
+    return _schedule_index
 
 def get_match_url_from_schedule(target_date_str, team_name_input, TEAM_NAME_MAPPING_NPB=None):
     """
     NPB公式サイトの試合日程ページから、指定された日付とチーム名の試合URLを抽出する。
     TEAM_NAME_MAPPING_NPBは辞書型で、display名→NPB短縮名のマッピングを想定。
+    日程ページの解析結果は ScheduleIndex に月単位で保存し、ここでは辞書を引くだけにする。
     """
     try:
-        input_date = datetime.strptime(target_date_str, '%Y-%m-%d')
-        npb_team_name = TEAM_NAME_MAPPING_NPB.get(team_name_input) if TEAM_NAME_MAPPING_NPB else team_name_input
-        schedule_url = f"https://npb.jp/games/{input_date.year}/schedule_{input_date.month:02d}_detail.html"
-        #print("schedule_url:", schedule_url)
-        #print("npb_team_name:", npb_team_name)
-        target_date_id_prefix = f"date{input_date.month:02d}{input_date.day:02d}"
-        #print("target_date_id_prefix:", target_date_id_prefix)
-        response = requests.get(schedule_url)
-        response.raise_for_status()
-        response.encoding = 'utf-8'
-        soup = BeautifulSoup(response.text, 'html.parser')
-        print("HTML取得長さ:", len(response.text))
-        all_tr_tags_for_date = soup.find_all('tr', id=lambda x: x and x.startswith(target_date_id_prefix))
-        #print("all_tr_tags_for_date件数:", len(all_tr_tags_for_date))
-        for date_row_tr_tag in all_tr_tags_for_date:
-            #print("trタグ:", date_row_tr_tag)
-            game_cells = [td for td in date_row_tr_tag.find_all('td') if td.find('div', class_='team1') or td.find('div', class_='team2')]
-            #print("game_cells件数:", len(game_cells))
-            for cell in game_cells:
-                team1_elem = cell.find('div', class_='team1') # ホーム
-                team2_elem = cell.find('div', class_='team2') # ビジター
-                team1_text = team1_elem.text.strip() if team1_elem else ""
-                team2_text = team2_elem.text.strip() if team2_elem else ""
-                #print("team1_text:", team1_text, ", team2_text:", team2_text)
-                home_away_status = ""
-                if team1_text in npb_team_name or npb_team_name in team1_text:
-                    home_away_status = "ホーム"
-                elif team2_text in npb_team_name or npb_team_name in team2_text:
-                    home_away_status = "ビジター"
-                #print("home_away_status:", home_away_status)
-                if home_away_status:
-                    match_link_tag = cell.find('a', href=re.compile(r'/scores/'))
-                    #print("match_link_tag:", match_link_tag)
-                    if match_link_tag and '/stats' not in match_link_tag.get('href'):
-                        target_match_url = match_link_tag.get('href')
-                        if not target_match_url.endswith('/box.html'):
-                            target_match_url = target_match_url.rstrip('/') + '/box.html'
-                        #print("target_match_url:", target_match_url)
-                        return target_match_url, home_away_status
-    except Exception as e:
-        print(f"ERROR: 試合URL抽出中にエラーが発生: {e}")
-        traceback.print_exc()
+        npb_team_name = TEAM_NAME_MAPPING_NPB.get(team_name_input, team_name_input) if TEAM_NAME_MAPPING_NPB else team_name_input
+        entry = get_schedule_index().lookup(target_date_str, npb_team_name)
+        if entry and entry[0]:
+            return entry[0], entry[1]
+    except Exception:
+        logger.exception("試合URL抽出中にエラーが発生")
     return None, None
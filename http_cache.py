@@ -0,0 +1,86 @@
+"""
+URLをキーにしたディスク上のHTTPキャッシュ。
+
+本文は zlib 圧縮して保存し、ETag / Last-Modified と取得時刻をメタデータとして持つ。
+TTL内なら通信せずに本文を返し、TTLを過ぎていれば If-None-Match / If-Modified-Since 付きで
+再検証する（304 ならキャッシュの本文をそのまま使う）。
+"""
+import hashlib
+import json
+import os
+import time
+import zlib
+
+
+class HttpCache:
+    """
+    cache_dir 以下に <sha256(url)>.json（メタデータ）と <sha256(url)>.zz（圧縮本文）を保存する。
+    """
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return base + '.json', base + '.zz'
+
+    @staticmethod
+    def _atomic_write(path, data, mode='wb'):
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, mode) as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def load(self, url):
+        """キャッシュ済みなら (メタデータ辞書, 本文bytes) を返す。なければ None"""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = zlib.decompress(f.read())
+        except (FileNotFoundError, ValueError, zlib.error):
+            return None
+        return meta, body
+
+    def store(self, url, body, etag=None, last_modified=None):
+        """本文とバリデータを保存する"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        meta_path, body_path = self._paths(url)
+        self._atomic_write(body_path, zlib.compress(body, 6))
+        meta = {'url': url, 'etag': etag, 'last_modified': last_modified, 'fetched_at': time.time()}
+        self._atomic_write(meta_path, json.dumps(meta, ensure_ascii=False), mode='w')
+
+    def touch(self, url, meta):
+        """304で再検証できたときに取得時刻だけ更新する"""
+        meta_path, _ = self._paths(url)
+        meta = dict(meta, fetched_at=time.time())
+        self._atomic_write(meta_path, json.dumps(meta, ensure_ascii=False), mode='w')
+
+    @staticmethod
+    def is_fresh(meta, ttl):
+        return time.time() - meta.get('fetched_at', 0) < ttl
+
+    @staticmethod
+    def conditional_headers(meta):
+        """再検証用のリクエストヘッダー"""
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+
+_cache = None
+
+
+def get_cache():
+    """アプリ全体で共有するキャッシュ（保存先は NPB_HTTP_CACHE_DIR、既定は data/http_cache）"""
+    global _cache
+    if _cache is None:
+        _cache = HttpCache(os.environ.get('NPB_HTTP_CACHE_DIR', os.path.join('data', 'http_cache')))
+    return _cache
@@ -0,0 +1,192 @@
+"""
+NPB公式サイトへのHTTPアクセスをまとめたクライアント。
+
+- requests.Session を使い回してコネクションを再利用（keep-alive・プール）
+- すべてのリクエストにタイムアウトを付ける（応答しないリクエストでワーカーを占有しない）
+- 接続エラー・タイムアウト・5xx/429 はジッター付き指数バックオフで回数を決めて再試行
+- User-Agent はどのスクレイパーからでも同じものを送る
+- 同じホストへのリクエストは最低間隔をあける（並列に取得しても相手サイトに負荷をかけすぎない）
+
+設定は環境変数で変えられる。NPB_BASE_URL を変えるとローカルの代替サーバーにも向けられる。
+    NPB_BASE_URL          既定: https://npb.jp
+    NPB_HTTP_TIMEOUT      1回のリクエストのタイムアウト秒（既定: 10）
+    NPB_HTTP_RETRIES      再試行回数（既定: 3）
+    NPB_HTTP_BACKOFF      バックオフの基準秒（既定: 0.5）
+    NPB_HTTP_BACKOFF_MAX  バックオフの上限秒（既定: 8）
+    NPB_HTTP_POOL_SIZE    ホストごとのコネクションプール数（既定: 10）
+    NPB_HTTP_MIN_INTERVAL 同じホストへのリクエストの最低間隔秒（既定: 0.5、0で制限なし）
+"""
+import os
+import random
+import threading
+import time
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app_logging import get_logger
+from metrics import cache_event, stage
+
+
+logger = get_logger(__name__)
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
+
+# 再試行するHTTPステータス
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HostRateLimiter:
+    """
+    ホストごとにリクエストの間隔を min_interval 秒以上あける。
+    複数スレッドから呼ばれても、各スレッドは自分の順番の時刻まで待つだけで済むようにする。
+    """
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def wait(self, url):
+        if self.min_interval <= 0:
+            return
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class HttpClient:
+    """
+    タイムアウト・再試行・コネクションプール付きのHTTPクライアント。
+    """
+    def __init__(self, base_url='https://npb.jp', timeout=10.0, retries=3, backoff=0.5,
+                 backoff_max=8.0, pool_size=10, user_agent=DEFAULT_USER_AGENT, session=None, min_interval=0.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.user_agent = user_agent
+        self.rate_limiter = HostRateLimiter(min_interval)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        session.headers['User-Agent'] = user_agent
+        self.session = session
+
+    def url(self, path):
+        """サイト内の相対パス（/scores/... など）を絶対URLにする"""
+        return urljoin(self.base_url + '/', path)
+
+    def _sleep_before_retry(self, attempt, response=None):
+        # 429/503 で Retry-After が秒数で返ってきた場合はそれに従う（上限あり）
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = min(float(retry_after), self.backoff_max)
+        else:
+            # フルジッター: 0 〜 min(上限, 基準 * 2^attempt) のランダムな時間だけ待つ
+            delay = random.uniform(0, min(self.backoff_max, self.backoff * (2 ** attempt)))
+        time.sleep(delay)
+
+    def get(self, url, headers=None, timeout=None):
+        """
+        GETリクエストを送り、成功(2xx/3xx/304)したレスポンスを返す。
+        再試行しても失敗した場合は requests の例外（HTTPError など）を送出する。
+        """
+        url = self.url(url)
+        timeout = self.timeout if timeout is None else timeout
+        for attempt in range(self.retries + 1):
+            self.rate_limiter.wait(url)
+            try:
+                with stage('http_fetch'):
+                    response = self.session.get(url, headers=headers, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.retries:
+                    raise
+                self._sleep_before_retry(attempt)
+                continue
+            if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                self._sleep_before_retry(attempt, response)
+                continue
+            response.raise_for_status()
+            return response
+
+    def get_text(self, url, encoding='utf-8'):
+        """GETして本文を文字列で返す（NPBのページはUTF-8）"""
+        response = self.get(url)
+        response.encoding = encoding
+        return response.text
+
+    def get_text_cached(self, url, cache, ttl, encoding='utf-8'):
+        """
+        HttpCache を使ってGETする。
+        TTL内ならキャッシュを返し、過ぎていれば条件付きGETで再検証する。
+        取得に失敗してもキャッシュがあれば古い本文を返す。
+        """
+        url = self.url(url)
+        cached = cache.load(url)
+        if cached is not None:
+            meta, body = cached
+            if cache.is_fresh(meta, ttl):
+                cache.hits += 1
+                cache_event('http', 'hit')
+                return body.decode(encoding)
+        try:
+            headers = cache.conditional_headers(cached[0]) if cached is not None else None
+            response = self.get(url, headers=headers)
+        except requests.RequestException as e:
+            if cached is None:
+                raise
+            logger.warning("再検証に失敗したためキャッシュを使います: %s (%s)", url, e)
+            return cached[1].decode(encoding)
+        if response.status_code == 304 and cached is not None:
+            cache.revalidated += 1
+            cache_event('http', 'revalidated')
+            cache.touch(url, cached[0])
+            return cached[1].decode(encoding)
+        cache.misses += 1
+        cache_event('http', 'miss')
+        cache.store(url, response.content,
+                    etag=response.headers.get('ETag'),
+                    last_modified=response.headers.get('Last-Modified'))
+        return response.content.decode(encoding, errors='replace')
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def client_from_env():
+    """環境変数の設定からクライアントを作る"""
+    return HttpClient(
+        base_url=os.environ.get('NPB_BASE_URL', 'https://npb.jp'),
+        timeout=float(os.environ.get('NPB_HTTP_TIMEOUT', '10')),
+        retries=int(os.environ.get('NPB_HTTP_RETRIES', '3')),
+        backoff=float(os.environ.get('NPB_HTTP_BACKOFF', '0.5')),
+        backoff_max=float(os.environ.get('NPB_HTTP_BACKOFF_MAX', '8')),
+        pool_size=int(os.environ.get('NPB_HTTP_POOL_SIZE', '10')),
+        min_interval=float(os.environ.get('NPB_HTTP_MIN_INTERVAL', '0.5')),
+    )
+
+
+def get_client():
+    """アプリ全体で共有するクライアント"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = client_from_env()
+    return _client
+
+
+def set_client(client):
+    """共有クライアントを差し替える（代替サーバーに向ける場合など）"""
+    global _client
+    with _client_lock:
+        _client = client
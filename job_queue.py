@@ -0,0 +1,196 @@
+"""
+スクレイピング・記録処理をリクエストの外で実行するジョブキュー。
+
+ジョブは SQLite（data/jobs.db）に保存し、同じプロセス内のワーカースレッドが順に実行する。
+- submit() はジョブIDをすぐに返す（処理の完了は待たない）
+- 同じ種類・同じキー（例: 日付とチーム名）のジョブが待機中・実行中なら、新しく積まずにそのIDを返す
+- ジョブの取り出しは UPDATE ... WHERE status='queued' で行うので、複数プロセスで同じDBを使っても二重に実行しない
+- 実行中のジョブは heartbeat_interval 秒ごとに heartbeat_at を更新する。更新が stale_after 秒止まったジョブ
+  （プロセスが落ちた場合など）は、ワーカー起動時に積み直す（時間のかかるバックフィルでも、実行中なら積み直さない）
+
+ワーカー数 0 の場合は submit() の中でその場で実行する（開発・デバッグ用）。
+"""
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+from app_logging import get_logger
+
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+logger = get_logger(__name__)
+
+
+class JobQueue:
+    """
+    handlers は {ジョブの種類: 関数} の辞書。関数は params をキーワード引数で受け取り、
+    (成功したか, メッセージ) を返す。
+    """
+    def __init__(self, db_path, handlers, workers=2, stale_after=600, poll_interval=1.0, heartbeat_interval=None):
+        self.db_path = db_path
+        self.handlers = handlers
+        self.workers = workers
+        self.stale_after = stale_after
+        self.heartbeat_interval = stale_after / 4 if heartbeat_interval is None else heartbeat_interval
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        self._wakeup = threading.Condition()
+        self._threads = []
+        self._started = False
+        self._start_lock = threading.Lock()
+        self._init_schema()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._connect()
+        with conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                params TEXT NOT NULL,
+                status TEXT NOT NULL,
+                message TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                heartbeat_at REAL)''')
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(jobs)')}
+            if 'heartbeat_at' not in columns:
+                conn.execute('ALTER TABLE jobs ADD COLUMN heartbeat_at REAL')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_kind_key ON jobs (kind, key)')
+
+    def start(self):
+        """ワーカースレッドを起動する（最初の submit() でも自動で起動する）"""
+        with self._start_lock:
+            if self._started or self.workers <= 0:
+                return
+            self._started = True
+            self._requeue_stale()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f'job-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _requeue_stale(self):
+        conn = self._connect()
+        with conn:
+            conn.execute('UPDATE jobs SET status = ?, started_at = NULL, heartbeat_at = NULL '
+                         'WHERE status = ? AND COALESCE(heartbeat_at, started_at) < ?',
+                         (QUEUED, RUNNING, time.time() - self.stale_after))
+
+    def submit(self, kind, key, params):
+        """
+        ジョブを積んで (ジョブID, 新しく積んだか) を返す。
+        同じ kind・key のジョブが待機中・実行中ならそのIDを返す（新しくは積まない）。
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"未知のジョブ種類です: {kind}")
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            # BEGIN IMMEDIATE で書き込みロックを取ってから確認するので、同時に投入されても1件にまとまる
+            conn.execute('BEGIN IMMEDIATE')
+            existing = conn.execute(
+                'SELECT id FROM jobs WHERE kind = ? AND key = ? '
+                'AND (status = ? OR (status = ? AND COALESCE(heartbeat_at, started_at) >= ?)) '
+                'ORDER BY created_at LIMIT 1',
+                (kind, key, QUEUED, RUNNING, now - self.stale_after)).fetchone()
+            if existing is not None:
+                return existing['id'], False
+            job_id = uuid.uuid4().hex
+            conn.execute('INSERT INTO jobs (id, kind, key, params, status, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+                         (job_id, kind, key, json.dumps(params, ensure_ascii=False), QUEUED, now))
+        if self.workers <= 0:
+            self._run(job_id)
+        else:
+            self.start()
+            with self._wakeup:
+                self._wakeup.notify()
+        return job_id, True
+
+    def get(self, job_id):
+        """ジョブの状態を辞書で返す。なければ None"""
+        row = self._connect().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        return job
+
+    def _claim(self):
+        """待機中のジョブを1件取り出して実行中にする。なければ None"""
+        conn = self._connect()
+        while True:
+            row = conn.execute('SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1', (QUEUED,)).fetchone()
+            if row is None:
+                return None
+            with conn:
+                now = time.time()
+                cur = conn.execute('UPDATE jobs SET status = ?, started_at = ?, heartbeat_at = ? WHERE id = ? AND status = ?',
+                                   (RUNNING, now, now, row['id'], QUEUED))
+            if cur.rowcount == 1:
+                return row['id']
+            # 他のワーカーが先に取った
+
+    def _finish(self, job_id, status, message):
+        conn = self._connect()
+        with conn:
+            conn.execute('UPDATE jobs SET status = ?, message = ?, finished_at = ? WHERE id = ?',
+                         (status, message, time.time(), job_id))
+
+    def _run(self, job_id):
+        job = self.get(job_id)
+        if job['status'] == QUEUED:
+            conn = self._connect()
+            with conn:
+                now = time.time()
+                conn.execute('UPDATE jobs SET status = ?, started_at = ?, heartbeat_at = ? WHERE id = ?',
+                             (RUNNING, now, now, job_id))
+        done = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(job_id, done), name=f'job-heartbeat-{job_id[:8]}',
+                         daemon=True).start()
+        try:
+            success, message = self.handlers[job['kind']](**job['params'])
+        except Exception as e:
+            logger.exception("ジョブ %s (%s) の処理中にエラー", job_id, job['kind'])
+            success, message = False, f"処理中にエラーが発生しました: {e}"
+        finally:
+            done.set()
+        self._finish(job_id, DONE if success else FAILED, message)
+
+    def _heartbeat(self, job_id, done):
+        """ジョブの実行中、heartbeat_at を heartbeat_interval 秒ごとに更新する"""
+        while not done.wait(self.heartbeat_interval):
+            try:
+                conn = self._connect()
+                with conn:
+                    conn.execute('UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = ?',
+                                 (time.time(), job_id, RUNNING))
+            except sqlite3.Error:
+                logger.exception("ジョブ %s の実行中の時刻を更新できませんでした", job_id)
+
+    def _worker(self):
+        while True:
+            job_id = self._claim()
+            if job_id is None:
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+                continue
+            self._run(job_id)
@@ -0,0 +1,67 @@
+"""
+試合データ(matches)のプロセス内キャッシュ。
+
+ストレージから読み込んだDataFrameを型変換済み（数値カラムは数値型、日付はdatetime）で保持し、
+ストレージのデータバージョン（CSVならmtime・サイズ、SQLiteなら更新カウンタ）が
+変わったときだけ読み直す。参照系のページはCSVパーサを通らずにこのキャッシュを使う。
+"""
+import threading
+
+import pandas as pd
+
+from metrics import cache_event
+
+
+class MatchDataCache:
+    """
+    ストレージの内容を型付きDataFrameとしてキャッシュする。
+    get() は呼び出し側が自由に加工できるようにコピーを返す。
+    """
+    def __init__(self, storage, text_columns, date_columns=('日付',)):
+        self.storage = storage
+        self.text_columns = set(text_columns)
+        self.date_columns = list(date_columns)
+        self._lock = threading.Lock()
+        self._df = None
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        # 読み込み時間はストレージ側（read_all）で csv_read として計測している
+        df = self.storage.read_all()
+        for col in df.columns:
+            if col in self.date_columns:
+                df[col] = pd.to_datetime(df[col], errors='coerce')
+            elif col not in self.text_columns and df[col].dtype == object:
+                # 数値カラムに混ざった文字列は欠損扱いにする
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+        return df
+
+    def version(self):
+        """現在のデータバージョン"""
+        return self.storage.version()
+
+    def get(self):
+        """型変換済みの試合データ（コピー）を返す"""
+        return self.get_with_version()[0]
+
+    def get_with_version(self):
+        """型変換済みの試合データ（コピー）と、そのデータバージョンを返す"""
+        version = self.storage.version()
+        with self._lock:
+            if self._df is None or version != self._version:
+                self.misses += 1
+                cache_event('match_data', 'miss')
+                self._df = self._load()
+                self._version = version
+            else:
+                self.hits += 1
+                cache_event('match_data', 'hit')
+            return self._df.copy(), self._version
+
+    def invalidate(self):
+        """次回の get() で必ず読み直す"""
+        with self._lock:
+            self._df = None
+            self._version = None
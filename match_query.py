@@ -0,0 +1,310 @@
+"""
+試合データの絞り込み・並べ替え・カーソルによるページ送り（/api/matches・一覧ページ・/export で使う）。
+
+MatchDataCache の試合データから、データバージョンごとに1回だけ
+- 絞り込み用の配列（日付・相手チーム・ホーム/ビジター・勝敗・チーム名）
+- 並べ替えキーごとの並び順（昇順・降順それぞれ、同じ値は row_id 順）
+を作っておき、リクエストごとには絞り込みのマスクを作って並び順から必要な件数を取り出すだけにする。
+
+カーソルは「前のページの最後の行の並べ替えキーの値と row_id」を base64 にしたもので、
+並び順の中の位置を二分探索で求めて続きから返す（途中で試合が追加・削除されても重複・欠落しにくい）。
+row_id はストレージの row_id（read_all() の index）なので、/edit_match・/delete_match にそのまま使える。
+"""
+import base64
+import json
+import math
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from metrics import stage
+
+
+# 並べ替えに使えるキー（sort=date / sort=-date のように指定する。'-' で降順）
+SORT_KEYS = {
+    'date': '日付',
+    'runs': '得点',
+    'allowed': '失点',
+    'attendance': '入場者数',
+    'minutes': '試合時間_分',
+}
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+# 完全一致で絞り込むカラム（クエリパラメータ名 → カラム名）
+EQUALITY_FILTERS = {
+    'team': 'チーム名',
+    'opponent': '相手チーム',
+    'home_away': 'ホーム/ビジター',
+    'result': '勝敗',
+}
+
+
+class MatchQuery:
+    """
+    絞り込み条件・並べ替え・件数・カーソル。
+    from_args() でクエリパラメータから作る（不正な値は ValueError）。
+    """
+    def __init__(self, date_from=None, date_to=None, equals=None, sort='date', descending=False,
+                 limit=DEFAULT_LIMIT, cursor=None):
+        self.date_from = date_from
+        self.date_to = date_to
+        self.equals = dict(equals or {})
+        self.sort = sort
+        self.descending = descending
+        self.limit = limit
+        self.cursor = cursor
+
+    @classmethod
+    def from_args(cls, args, default_sort='date', default_limit=DEFAULT_LIMIT):
+        """
+        クエリパラメータ（request.args）から作る。
+            from / to   日付の範囲（YYYY-MM-DD、両端を含む）
+            team / opponent / home_away / result   完全一致
+            sort        SORT_KEYS のキー（'-' を付けると降順）
+            limit       1ページの件数（1〜MAX_LIMIT）
+            cursor      前のページの next_cursor
+        """
+        def parse_date(name):
+            value = (args.get(name) or '').strip()
+            if not value:
+                return None
+            try:
+                return datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                raise ValueError(f"{name} は YYYY-MM-DD 形式で指定してください: {value}")
+
+        sort = (args.get('sort') or default_sort).strip()
+        descending = sort.startswith('-')
+        sort = sort.lstrip('-')
+        if sort not in SORT_KEYS:
+            raise ValueError(f"sort には {', '.join(SORT_KEYS)} のいずれかを指定してください: {sort}")
+        try:
+            limit = int(args.get('limit') or default_limit)
+        except ValueError:
+            raise ValueError(f"limit は整数で指定してください: {args.get('limit')}")
+        if not 1 <= limit <= MAX_LIMIT:
+            raise ValueError(f"limit は 1〜{MAX_LIMIT} で指定してください: {limit}")
+        equals = {}
+        for name, col in EQUALITY_FILTERS.items():
+            value = (args.get(name) or '').strip()
+            if value:
+                equals[col] = value
+        cursor = (args.get('cursor') or '').strip() or None
+        query = cls(parse_date('from'), parse_date('to'), equals, sort, descending, limit, cursor)
+        if cursor is not None:
+            query.decode_cursor()
+        return query
+
+    def filter_args(self):
+        """絞り込み条件と並べ替えをクエリパラメータに戻す（ページ送りのリンク用。cursor は含めない）"""
+        args = {}
+        if self.date_from is not None:
+            args['from'] = self.date_from.strftime('%Y-%m-%d')
+        if self.date_to is not None:
+            args['to'] = self.date_to.strftime('%Y-%m-%d')
+        for name, col in EQUALITY_FILTERS.items():
+            if col in self.equals:
+                args[name] = self.equals[col]
+        args['sort'] = ('-' if self.descending else '') + self.sort
+        args['limit'] = self.limit
+        return args
+
+    def encode_cursor(self, key, row_id):
+        payload = [self.sort, self.descending, None if math.isinf(key) else key, int(row_id)]
+        return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode_cursor(self):
+        """カーソルを (並べ替えキーの値, row_id) にする。並べ替えが違う・壊れているカーソルは ValueError"""
+        try:
+            raw = base64.urlsafe_b64decode(self.cursor + '=' * (-len(self.cursor) % 4))
+            sort, descending, key, row_id = json.loads(raw.decode('utf-8'))
+            key = math.inf if key is None else float(key)
+            row_id = int(row_id)
+        except (ValueError, TypeError, UnicodeDecodeError):
+            raise ValueError("cursor が不正です")
+        if sort != self.sort or bool(descending) != self.descending:
+            raise ValueError("cursor と sort の指定が一致しません")
+        return key, row_id
+
+
+class QueryPage:
+    """1ページ分の結果"""
+    def __init__(self, rows, total, next_cursor, version, integer_columns=()):
+        self.rows = rows
+        self.total = total
+        self.next_cursor = next_cursor
+        self.version = version
+        self.integer_columns = integer_columns
+
+    def records(self, columns=None, missing=None):
+        """
+        行を辞書のリストにする（row_id 付き、日付は 'YYYY-MM-DD'、欠損は missing）。
+        columns を渡すとそのカラムだけにする。整数だけのカラムは iter_rows と同じく int で返す。
+        """
+        columns = [c for c in (self.rows.columns if columns is None else columns)
+                   if c in self.rows.columns and c != 'row_id'] + ['row_id']
+        return [dict(zip(columns, row)) for row in frame_rows(self.rows, columns, missing, self.integer_columns)]
+
+
+def frame_rows(df, columns, missing=None, integer_columns=()):
+    """
+    df の columns の値を行ごとのタプルにする（日付は 'YYYY-MM-DD'、欠損と df にないカラムは missing）。
+    integer_columns のカラムは int にする（欠損があって float になったカラムを 35.0 のように出さない）。
+    DataFrame.to_dict は1ページ分でも遅いので、カラムごとに Python の値の配列にしてから組み立てる。
+    """
+    values = []
+    for col in columns:
+        if col not in df.columns:
+            values.append([missing] * len(df))
+            continue
+        series = df[col]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            series = series.dt.strftime('%Y-%m-%d')
+        elif col in integer_columns:
+            values.append(series.astype('Int64').to_numpy(dtype=object, na_value=missing))
+            continue
+        # object 型のカラムは読み取り専用のビューが返ることがある（copy-on-write）ので、コピーしてから書き換える
+        array = series.to_numpy(dtype=object, copy=True)
+        array[pd.isna(array)] = missing
+        values.append(array)
+    return zip(*values)
+
+
+def _integral_columns(df):
+    """float のカラムのうち、欠損以外の値がすべて整数のもの（欠損があるため float になった整数のカラム）"""
+    columns = set()
+    for col in df.columns:
+        if pd.api.types.is_float_dtype(df[col]):
+            values = df[col].to_numpy(dtype='float64', na_value=np.nan)
+            values = values[~np.isnan(values)]
+            if np.array_equal(values, np.round(values)):
+                columns.add(col)
+    return columns
+
+
+def _sort_values(series):
+    """並べ替えキーを float の配列にする（日付は日数。欠損は NaN）"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values = series.to_numpy(dtype='datetime64[D]').astype('float64')
+        values[series.isna().to_numpy()] = np.nan
+        return values
+    return pd.to_numeric(series, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+
+class SortIndex:
+    """
+    1つの並べ替えキー・向きの並び順。
+    keys は降順なら符号を反転し、欠損は +inf にして（どちらの向きでも最後）、
+    (keys, row_id) の昇順に並べた位置を order に持つ。
+    """
+    def __init__(self, values, descending, row_ids):
+        keys = -values if descending else values.copy()
+        keys[np.isnan(keys)] = np.inf
+        self.order = np.lexsort((row_ids, keys))
+        self.sorted_keys = keys[self.order]
+        self.sorted_ids = row_ids[self.order]
+        self.keys = keys
+        self.row_ids = row_ids
+
+    def start_after(self, key, row_id):
+        """(key, row_id) の次の位置（order 上の添字）"""
+        lo = int(np.searchsorted(self.sorted_keys, key, side='left'))
+        hi = int(np.searchsorted(self.sorted_keys, key, side='right'))
+        return lo + int(np.searchsorted(self.sorted_ids[lo:hi], row_id, side='right'))
+
+
+class MatchQueryIndex:
+    """
+    試合データの検索用インデックス。データバージョンが変わったときだけ作り直す。
+    """
+    def __init__(self, cache):
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._version = None
+        self._df = None
+        self._dates = None
+        self._row_ids = None
+        self._sort_values = {}
+        self._sort_indexes = {}
+        self._integral = set()
+
+    def _rebuild(self):
+        df, version = self.cache.get_with_version()
+        with stage('aggregate'):
+            row_ids = df.index.to_numpy(dtype='int64')
+            df = df.reset_index(drop=True)
+            df['row_id'] = self._row_ids = row_ids
+            if '日付' not in df.columns:
+                df['日付'] = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+            self._dates = df['日付'].to_numpy(dtype='datetime64[ns]')
+            self._sort_values = {
+                key: _sort_values(df[col]) if col in df.columns else np.full(len(df), np.nan)
+                for key, col in SORT_KEYS.items()
+            }
+            self._sort_indexes = {}
+            self._integral = _integral_columns(df)
+        self._df = df
+        self._version = version
+
+    def _ensure_current(self):
+        version = self.cache.version()
+        if self._df is None or version != self._version:
+            self._rebuild()
+
+    def _sort_index(self, sort, descending):
+        # 並び順は使われたものだけ作って、同じバージョンの間は使い回す
+        index = self._sort_indexes.get((sort, descending))
+        if index is None:
+            with stage('aggregate'):
+                index = self._sort_indexes[(sort, descending)] = SortIndex(self._sort_values[sort], descending, self._row_ids)
+        return index
+
+    def _mask(self, query):
+        df = self._df
+        mask = np.ones(len(df), dtype=bool)
+        if query.date_from is not None:
+            mask &= self._dates >= np.datetime64(query.date_from, 'ns')
+        if query.date_to is not None:
+            mask &= self._dates < np.datetime64(query.date_to, 'ns') + np.timedelta64(1, 'D')
+        for col, value in query.equals.items():
+            if col not in df.columns:
+                return np.zeros(len(df), dtype=bool)
+            mask &= (df[col] == value).to_numpy(dtype=bool, na_value=False)
+        return mask
+
+    def query(self, query):
+        """query に一致する行のうち、カーソルの次から limit 件を QueryPage で返す"""
+        with self._lock:
+            self._ensure_current()
+            df, version, integral = self._df, self._version, self._integral
+            index = self._sort_index(query.sort, query.descending)
+            mask = self._mask(query)
+        start = 0
+        if query.cursor is not None:
+            start = index.start_after(*query.decode_cursor())
+        remaining = index.order[start:]
+        positions = remaining[mask[remaining]][:query.limit + 1]
+        next_cursor = None
+        if len(positions) > query.limit:
+            positions = positions[:query.limit]
+            last = positions[-1]
+            next_cursor = query.encode_cursor(float(index.keys[last]), index.row_ids[last])
+        return QueryPage(df.iloc[positions], int(mask.sum()), next_cursor, version, integral)
+
+    def iter_rows(self, query, columns, chunk_size=500, missing=None):
+        """
+        query に一致する行を並び順に1行ずつ（columns の値のタプルで）返すジェネレーター。limit・カーソルは無視する。
+        呼び出した時点のデータで最後まで返し、行は chunk_size 件ずつ組み立てる。
+        整数だけのカラムは、欠損があって float になっていても int で返す（保存しているCSVと同じ形にする）。
+        """
+        with self._lock:
+            self._ensure_current()
+            df, integral = self._df, self._integral
+            index = self._sort_index(query.sort, query.descending)
+            mask = self._mask(query)
+        positions = index.order[mask[index.order]]
+        for start in range(0, len(positions), chunk_size):
+            yield from frame_rows(df.iloc[positions[start:start + chunk_size]], columns, missing, integral)
@@ -0,0 +1,169 @@
+"""
+アプリ内の計測値（カウンター・ヒストグラム）を集めて Prometheus のテキスト形式で出す。
+
+- baseball_http_request_duration_seconds : ルートごとのリクエスト処理時間
+- baseball_stage_duration_seconds        : 処理段階ごとの時間（csv_read / aggregate / render /
+                                            http_fetch / html_parse / csv_write）
+- baseball_cache_requests_total          : キャッシュごとのヒット・ミス
+- baseball_scrape_failures_total         : スクレイピングの失敗（理由別）
+
+計測したい処理は `with stage('csv_read'):` のように囲む。/metrics で render() の結果を返す。
+外部ライブラリは使わない（プロセス内の値だけを出す）。
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """増えるだけの値（ラベルの組み合わせごと）"""
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}' for key, v in items]
+
+
+class Histogram:
+    """観測値の分布（累積バケット・合計・件数）"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(state[0]), state[1], state[2])) for key, state in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), counts):
+                cumulative += n
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """Prometheus のテキスト形式（text/plain; version=0.0.4）"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics)
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    'baseball_http_request_duration_seconds', 'ルートごとのリクエスト処理時間（秒）', ('route', 'method', 'status'))
+STAGE_SECONDS = REGISTRY.histogram(
+    'baseball_stage_duration_seconds', '処理段階ごとの時間（秒）', ('stage',))
+CACHE_REQUESTS = REGISTRY.counter(
+    'baseball_cache_requests_total', 'キャッシュの参照回数（result=hit/miss/revalidated）', ('cache', 'result'))
+SCRAPE_FAILURES = REGISTRY.counter(
+    'baseball_scrape_failures_total', 'スクレイピングの失敗回数（理由別）', ('reason',))
+
+
+def stage(name):
+    """with stage('csv_read'): のように処理段階の時間を計測する"""
+    return STAGE_SECONDS.time(stage=name)
+
+
+def cache_event(cache, result):
+    CACHE_REQUESTS.inc(cache=cache, result=result)
+
+
+def scrape_failure(reason):
+    SCRAPE_FAILURES.inc(reason=reason)
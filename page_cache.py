@@ -0,0 +1,81 @@
+"""
+描画済みHTML（ページ全体や重い部分テンプレート）のプロセス内キャッシュ。
+
+/ ・/summary ・/totals ・/players などは、データが変わるまで誰が見ても同じHTMLになるので、
+描画結果を「依存するデータのバージョン」と一緒に保存しておき、バージョンが同じ間はそのまま返す。
+- エントリは LRU で、保存しているHTMLの合計サイズが max_bytes を超えたら古いものから捨てる
+- get() のときに依存データのバージョンが保存時と違えば、そのエントリは捨てて描画し直す
+- 試合データの書き込み通知（MatchStorage.add_listener）を受けたら、試合データに依存するエントリをすぐ捨てる
+"""
+import sys
+import threading
+from collections import OrderedDict
+
+from metrics import cache_event
+
+
+class RenderCache:
+    """
+    key → (依存データ名, バージョン, HTML) の LRU キャッシュ。
+    """
+    def __init__(self, max_bytes, name='render'):
+        self.max_bytes = max_bytes
+        self.name = name
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _sizeof(html):
+        return sys.getsizeof(html)
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= self._sizeof(entry[2])
+
+    def get(self, key, version):
+        """保存時と同じバージョンのHTMLがあれば返す。なければ None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                cache_event(self.name, 'hit')
+                return entry[2]
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            cache_event(self.name, 'miss')
+            return None
+
+    def put(self, key, sources, version, html):
+        """sources（依存データ名のタプル）のバージョン version で描画した html を保存する"""
+        size = self._sizeof(html)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (tuple(sources), version, html)
+            self.size += size
+            while self.size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def get_or_render(self, key, sources, version, render):
+        """キャッシュになければ render() で描画して保存し、HTMLを返す"""
+        html = self.get(key, version)
+        if html is None:
+            html = render()
+            self.put(key, sources, version, html)
+        return html
+
+    def invalidate(self, source=None):
+        """source に依存するエントリ（省略時はすべて）を捨てる"""
+        with self._lock:
+            for key in [k for k, entry in self._entries.items() if source is None or source in entry[0]]:
+                self._drop(key)
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,248 @@
+"""
+試合ごとの選手成績台帳（per-game ledger）。
+
+1試合・1チーム分の打者/投手成績を、試合URLをキーにして台帳CSVへ追記していく。
+通算成績（batters_stats.csv / pitchers_stats.csv）は台帳の集計結果として扱い、
+- 試合を記録したとき: その試合分だけ加算
+- 同じ試合を再取得したとき: 前回分を減算してから加算（二重計上しない）
+- 試合を削除したとき: その試合分を減算
+と差分で更新する。年度別の集計は台帳を groupby した結果をキャッシュして返す。
+
+台帳CSVは追記のみで更新する。試合を取り除くときは行を消して書き直すのではなく、
+(URL, チーム名) ごとに 日付 が TOMBSTONE の取消行を追記し、読み込むときに
+それより前にある同じ (URL, チーム名) の行ごと除く。取り除いた行と取消行が COMPACT_ROWS 行を超えたら
+残っている行だけでCSVを書き直す（PlayerStatsStore の差分ログと同じ考え方）。
+
+台帳導入前から batters_stats.csv にあった累計は、URL が LEGACY_URL の行として台帳に移す。
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from metrics import stage
+from player_store import LEGACY_COLUMNS, upgrade_legacy_columns
+
+
+LEGACY_URL = '移行前累計'
+
+# 取消行の 日付 の値
+TOMBSTONE = '取消'
+
+# 取り除いた行と取消行がこの行数を超えたら台帳CSVを書き直す
+COMPACT_ROWS = int(os.environ.get('PLAYER_LEDGER_COMPACT_ROWS', '5000'))
+
+
+class PlayerGameLedger:
+    """
+    選手成績の台帳。totals_store（PlayerStatsStore）を通算成績として一緒に更新する。
+    """
+    def __init__(self, ledger_path, totals_store):
+        self.ledger_path = ledger_path
+        self.totals_store = totals_store
+        self.key_columns = totals_store.key_columns
+        self.stat_columns = totals_store.stat_columns
+        self.columns = ['URL', '日付'] + self.key_columns + self.stat_columns
+        self._lock = threading.Lock()
+        self._df = None
+        self._stamp = None
+        self._rollups = {}
+        self._dead_rows = 0
+        self._initialize()
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.ledger_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def version(self):
+        """CSVが変わるたびに変化する値（描画キャッシュの無効化用）"""
+        return self._file_stamp()
+
+    def _initialize(self):
+        """台帳がなければ、既存の累計成績を LEGACY_URL 行として台帳を作る"""
+        if os.path.exists(self.ledger_path):
+            return
+        legacy = self.totals_store.read_all()
+        legacy.insert(0, '日付', '')
+        legacy.insert(0, 'URL', LEGACY_URL)
+        self._write(legacy[self.columns])
+
+    def _write(self, df):
+        """台帳CSVを df（取消行を含まない）で書き直す"""
+        tmp_path = f"{self.ledger_path}.tmp{os.getpid()}"
+        with stage('csv_write'):
+            df.to_csv(tmp_path, index=False, encoding='utf-8-sig')
+        os.replace(tmp_path, self.ledger_path)
+        self._df = df.reset_index(drop=True)
+        self._stamp = self._file_stamp()
+        self._rollups = {}
+        self._dead_rows = 0
+
+    def _append(self, rows):
+        """rows を台帳CSVに追記する（ファイル全体は書き直さない）"""
+        write_header = not os.path.exists(self.ledger_path)
+        with stage('csv_write'):
+            rows[self.columns].to_csv(self.ledger_path, mode='a', header=write_header, index=False,
+                                      encoding='utf-8-sig' if write_header else 'utf-8')
+
+    @staticmethod
+    def _fold(df):
+        """
+        取消行と、それより前にある同じ (URL, チーム名) の行を除く。
+        戻り値: (残りの行, 除いた行数)
+        """
+        tombstone = (df['日付'] == TOMBSTONE).to_numpy()
+        if not tombstone.any():
+            return df, 0
+        keys = pd.MultiIndex.from_frame(df[['URL', 'チーム名']])
+        order = np.arange(len(df))
+        last = pd.Series(order[tombstone], index=keys[tombstone]).groupby(level=[0, 1]).max()
+        found = last.index.get_indexer(keys)
+        cutoff = np.where(found >= 0, last.to_numpy()[found], -1)
+        dead = tombstone | (order < cutoff)
+        return df[~dead].reset_index(drop=True), int(dead.sum())
+
+    def _load(self):
+        stamp = self._file_stamp()
+        if self._df is not None and stamp == self._stamp:
+            return self._df
+        legacy = False
+        if stamp is None:
+            df = pd.DataFrame(columns=self.columns)
+        else:
+            with stage('csv_read'):
+                df = pd.read_csv(self.ledger_path, encoding='utf-8-sig', dtype={'URL': str, '日付': str})
+            legacy = not set(LEGACY_COLUMNS).isdisjoint(df.columns)
+            df = upgrade_legacy_columns(df)
+        df['URL'] = df['URL'].fillna('')
+        df['日付'] = df['日付'].fillna('')
+        for col in self.stat_columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(np.int64)
+        df, dead_rows = self._fold(df)
+        if legacy:
+            # 以降の追記とカラム順を合わせるため、現在の形式で書き直す
+            self._write(df[self.columns])
+            return self._df
+        self._df = df
+        self._stamp = stamp
+        self._rollups = {}
+        self._dead_rows = dead_rows
+        return df
+
+    def _game_mask(self, df, match_url, team_name=None):
+        mask = df['URL'] == match_url
+        if team_name is not None:
+            mask &= df['チーム名'] == team_name
+        return mask
+
+    def _remove(self, df, mask):
+        """台帳から mask の行を（取消行の追記で）取り除き、その分を通算成績から減算する"""
+        removed = df[mask]
+        for team_name, lines in removed.groupby('チーム名', sort=False):
+            self.totals_store.apply_batch(lines.to_dict(orient='records'), team_name, sign=-1)
+        remaining = df[~mask]
+        # 台帳に1試合も残らなくなった選手は通算成績からも消す
+        removed_keys = set(zip(*(removed[c] for c in self.key_columns)))
+        remaining_keys = set(zip(*(remaining[c] for c in self.key_columns)))
+        self.totals_store.drop_keys(removed_keys - remaining_keys)
+        tombstones = removed[['URL', 'チーム名']].drop_duplicates()
+        blanks = {col: '' for col in self.key_columns if col != 'チーム名'}
+        tombstones = tombstones.assign(日付=TOMBSTONE, **blanks, **{col: 0 for col in self.stat_columns})
+        self._append(tombstones)
+        self._df = remaining.reset_index(drop=True)
+        self._stamp = self._file_stamp()
+        self._rollups = {}
+        self._dead_rows += len(removed) + len(tombstones)
+        if self._dead_rows > COMPACT_ROWS:
+            self._write(self._df)
+
+    def record_game(self, match_url, match_date, team_name, lines):
+        """
+        1試合・1チーム分の成績を台帳に追記し、通算成績へ加算する。
+        同じ (URL, チーム名) が既にあれば置き換える。
+        """
+        self.record_games([(match_url, match_date, team_name, lines)])
+
+    def record_games(self, games):
+        """
+        複数試合分の成績 [(URL, 日付, チーム名, lines), ...] をまとめて記録する。
+        台帳への追記と通算成績の更新はチームごとに1回だけ行う。
+        """
+        with self._lock:
+            df = self._load()
+            keys = {(match_url, team_name) for match_url, _, team_name, _ in games}
+            mask = pd.MultiIndex.from_frame(df[['URL', 'チーム名']]).isin(list(keys))
+            if mask.any():
+                self._remove(df, mask)
+                df = self._df
+            frames = []
+            for match_url, match_date, team_name, lines in games:
+                if not lines:
+                    continue
+                new_rows = pd.DataFrame(lines)
+                for col in self.stat_columns:
+                    if col not in new_rows.columns:
+                        new_rows[col] = 0
+                new_rows[self.stat_columns] = new_rows[self.stat_columns].fillna(0).astype(np.int64)
+                new_rows['URL'] = match_url
+                new_rows['日付'] = match_date
+                new_rows['チーム名'] = team_name
+                frames.append(new_rows[self.columns])
+            if not frames:
+                return
+            new_rows = pd.concat(frames, ignore_index=True)
+            self._append(new_rows)
+            self._df = pd.concat([df, new_rows], ignore_index=True)
+            self._stamp = self._file_stamp()
+            self._rollups = {}
+            for team_name, lines in new_rows.groupby('チーム名', sort=False):
+                self.totals_store.apply_batch(lines[self.key_columns + self.stat_columns].to_dict(orient='records'), team_name)
+
+    def remove_game(self, match_url, team_name=None):
+        """試合URL（とチーム名）に該当する成績を台帳と通算成績から取り除く"""
+        with self._lock:
+            df = self._load()
+            mask = self._game_mask(df, match_url, team_name)
+            if mask.any():
+                self._remove(df, mask)
+
+    def has_game(self, match_url, team_name=None):
+        with self._lock:
+            return bool(self._game_mask(self._load(), match_url, team_name).any())
+
+    def read_all(self):
+        """台帳全体を返す"""
+        with self._lock:
+            return self._load().copy()
+
+    def rollup(self, season=None):
+        """
+        台帳を (選手名, チーム名) で集計した成績を返す。season（年）を指定するとその年の試合だけを集計する。
+        結果は台帳が変わるまでキャッシュする。
+        """
+        with self._lock:
+            df = self._load()
+            cached = self._rollups.get(season)
+            if cached is not None:
+                return cached.copy()
+            if season is not None:
+                df = df[df['日付'].str[:4] == str(season)]
+            with stage('aggregate'):
+                result = df.groupby(self.key_columns, sort=False)[self.stat_columns].sum().reset_index()
+            result = result[self.totals_store.columns]
+            self._rollups[season] = result
+            return result.copy()
+
+    def seasons(self):
+        """台帳に含まれる年の一覧（新しい順）"""
+        with self._lock:
+            years = self._load()['日付'].str[:4]
+        return sorted({y for y in years if y.isdigit()}, reverse=True)
+
+    def rebuild_totals(self):
+        """通算成績を台帳の集計結果で作り直す"""
+        self.totals_store.replace_all(self.rollup())
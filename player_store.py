@@ -0,0 +1,193 @@
+"""
+選手成績CSV（batters_stats.csv / pitchers_stats.csv）をキー付きで保持するストア。
+
+(選手名, チーム名) をインデックスにしたDataFrameをメモリに持ち、
+1試合分の成績はまとめて1回のベクトル演算で加算する。
+加算した分は通算CSVを書き直さず、差分ログ（batters_stats_deltas.csv など）に1試合分の行だけ追記する。
+通算は「通算CSV + 差分ログの合計」で、差分ログが COMPACT_ROWS 行を超えたとき
+（と compact() を呼んだとき）に通算CSVへ書き込んで差分ログを消す。
+ファイルは読み込んだときの mtime・サイズを覚えておき、他プロセスが更新した場合だけ読み直す。
+
+投球回は 1/3 回単位なので、整数のアウト数（投球アウト数）で持つ。
+以前の形式（整数に切り捨てた投球回）のCSVは読み込むときにアウト数へ読み替える。
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from metrics import stage
+
+
+# 差分ログがこの行数を超えたら通算CSVに書き込む
+COMPACT_ROWS = int(os.environ.get('PLAYER_STATS_COMPACT_ROWS', '5000'))
+
+# 以前のカラム → (現在のカラム, 倍率)
+LEGACY_COLUMNS = {'投球回': ('投球アウト数', 3)}
+
+
+def upgrade_legacy_columns(df):
+    """以前の形式のカラム（投球回）を現在のカラム（投球アウト数）に読み替える"""
+    for old, (new, factor) in LEGACY_COLUMNS.items():
+        if old in df.columns and new not in df.columns:
+            df[new] = pd.to_numeric(df[old], errors='coerce').fillna(0).astype(np.int64) * factor
+            df = df.drop(columns=[old])
+    return df
+
+
+class PlayerStatsStore:
+    """
+    選手ごとの累計成績ストア。
+    columns は CSV のカラム順（先頭にキーカラムを含む）。
+    """
+    def __init__(self, csv_path, columns, key_columns=('選手名', 'チーム名')):
+        self.csv_path = csv_path
+        self.delta_path = f"{os.path.splitext(csv_path)[0]}_deltas.csv"
+        self.columns = list(columns)
+        self.key_columns = list(key_columns)
+        self.stat_columns = [c for c in self.columns if c not in self.key_columns]
+        self._lock = threading.Lock()
+        self._df = None
+        self._stamp = None
+        self._delta_rows = 0
+
+    @staticmethod
+    def _path_stamp(path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _file_stamp(self):
+        return (self._path_stamp(self.csv_path), self._path_stamp(self.delta_path))
+
+    def version(self):
+        """通算CSV・差分ログが変わるたびに変化する値（描画キャッシュの無効化用）"""
+        return self._file_stamp()
+
+    def _read_csv(self, path):
+        if path is None:
+            df = pd.DataFrame(columns=self.columns)
+        else:
+            with stage('csv_read'):
+                df = pd.read_csv(path, encoding='utf-8-sig')
+            df = upgrade_legacy_columns(df)
+        for col in self.columns:
+            if col not in df.columns:
+                df[col] = 0
+        for col in self.stat_columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(np.int64)
+        return df[self.columns]
+
+    def _load(self):
+        stamp = self._file_stamp()
+        if self._df is not None and stamp == self._stamp:
+            return self._df
+        totals_stamp, delta_stamp = stamp
+        df = self._read_csv(self.csv_path if totals_stamp is not None else None)
+        self._delta_rows = 0
+        if delta_stamp is not None:
+            deltas = self._read_csv(self.delta_path)
+            self._delta_rows = len(deltas)
+            df = pd.concat([df, deltas], ignore_index=True)
+        df = df.set_index(self.key_columns)
+        if not df.index.is_unique:
+            # 同じ選手が複数行ある場合（差分ログの分を含む）は1行にまとめる
+            df = df.groupby(level=self.key_columns, sort=False).sum()
+        self._df = df
+        self._stamp = stamp
+        return df
+
+    def _save(self, df):
+        """通算CSVを df で書き直し、差分ログを消す"""
+        out = df.reset_index()[self.columns]
+        tmp_path = f"{self.csv_path}.tmp{os.getpid()}"
+        with stage('csv_write'):
+            out.to_csv(tmp_path, index=False, encoding='utf-8-sig')
+        os.replace(tmp_path, self.csv_path)
+        try:
+            os.remove(self.delta_path)
+        except FileNotFoundError:
+            pass
+        self._df = df
+        self._delta_rows = 0
+        self._stamp = self._file_stamp()
+
+    def _append_deltas(self, deltas):
+        """1試合分の差分（キーをインデックスにしたDataFrame）を差分ログに追記する"""
+        write_header = not os.path.exists(self.delta_path)
+        with stage('csv_write'):
+            deltas.reset_index()[self.columns].to_csv(self.delta_path, mode='a', header=write_header, index=False,
+                                                      encoding='utf-8-sig' if write_header else 'utf-8')
+        self._delta_rows += len(deltas)
+
+    def compact(self):
+        """差分ログの分を通算CSVに書き込む（通算CSVを直接読む前に呼ぶ）"""
+        with self._lock:
+            totals = self._load()
+            if self._stamp[1] is not None:
+                self._save(totals)
+
+    def read_all(self):
+        """累計成績をCSVと同じ形（キーもカラム）のDataFrameで返す"""
+        with self._lock:
+            return self._load().reset_index()[self.columns]
+
+    def replace_all(self, df):
+        """累計成績全体を df（CSVと同じ形）で置き換える"""
+        with self._lock:
+            df = df.copy()
+            for col in self.stat_columns:
+                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(np.int64)
+            self._save(df[self.columns].set_index(self.key_columns))
+
+    def drop_keys(self, keys):
+        """指定した (選手名, チーム名) の行を取り除く"""
+        if not keys:
+            return
+        with self._lock:
+            totals = self._load()
+            keep = ~totals.index.isin(list(keys))
+            if not keep.all():
+                self._save(totals[keep])
+
+    def _batch_frame(self, lines, team_name):
+        batch = pd.DataFrame(lines)
+        batch['チーム名'] = team_name
+        for col in self.stat_columns:
+            if col not in batch.columns:
+                batch[col] = 0
+        batch[self.stat_columns] = batch[self.stat_columns].fillna(0).astype(np.int64)
+        # 同じ試合に同名の行があれば先にまとめる（登場順は維持）
+        return batch.groupby(self.key_columns, sort=False)[self.stat_columns].sum()
+
+    def apply_batch(self, lines, team_name, sign=1):
+        """
+        1試合分の成績行 lines（[{'選手名': ..., '打数': ...}, ...]）を累計に加算する。
+        sign=-1 を渡すと減算する。既存選手はメモリ上の累計の行にその場で加算し、新しい選手の行だけを末尾に追加する。
+        ファイルには差分ログに lines の分だけを追記する（通算CSVは COMPACT_ROWS 行ごとにまとめて書き直す）。
+        """
+        if not lines:
+            return
+        batch = self._batch_frame(lines, team_name) * sign
+        with self._lock:
+            totals = self._load()
+            positions = totals.index.get_indexer(batch.index)
+            found = positions >= 0
+            try:
+                if found.any():
+                    totals.iloc[positions[found], :] += batch.to_numpy()[found]
+                if not found.all():
+                    totals = pd.concat([totals, batch[~found]])
+                if self._delta_rows + len(batch) > COMPACT_ROWS:
+                    self._save(totals)
+                    return
+                self._append_deltas(batch)
+            except BaseException:
+                # メモリ上の累計だけ変わった状態を残さないよう、次に使うときにファイルから読み直す
+                self._df = None
+                raise
+            self._df = totals
+            self._stamp = self._file_stamp()
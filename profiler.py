@@ -0,0 +1,131 @@
+"""
+リクエスト（やジョブ）単位のサンプリングプロファイラ。
+
+計測中は別スレッドが PROFILE_INTERVAL 秒ごとに対象スレッドのスタックを取り、
+同じスタックの出現回数を数える。結果は collapsed stack 形式
+（"呼び出し元;...;呼び出し先 回数" を1行ずつ）で PROFILE_DIR に書き出すので、
+flamegraph.pl や speedscope にそのまま渡せる。
+
+有効にする方法（どちらも既定では無効）:
+- PROFILE_TOKEN を設定し、リクエストに X-Profile: <トークン> ヘッダー
+  または ?_profile=<トークン> を付ける（管理者だけがプロファイルを取れる）。
+  書き出したファイルのパスはレスポンスの X-Profile-File ヘッダーで返す
+- PROFILE_SAMPLE_RATE（0〜1）の割合で、リクエストとジョブを無作為に計測する
+  （誰のリクエストかわからないので、パスはログにだけ出してヘッダーでは返さない）
+"""
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+from app_logging import get_logger
+
+
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL', '0.005'))
+PROFILE_HEADER = 'X-Profile'
+PROFILE_PARAM = '_profile'
+
+logger = get_logger(__name__)
+
+
+def frame_label(frame):
+    code = frame.f_code
+    name = getattr(code, 'co_qualname', code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ':')
+
+
+class StackSampler:
+    """
+    thread_id のスレッドのスタックを interval 秒ごとに数える。
+    """
+    def __init__(self, thread_id=None, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.counts = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return
+        stack = []
+        while frame is not None:
+            stack.append(frame_label(frame))
+            frame = frame.f_back
+        self.counts[';'.join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._loop, name='stack-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.elapsed = time.perf_counter() - self.started_at
+        return self
+
+    def collapsed(self):
+        """collapsed stack 形式の行（回数の多い順）"""
+        return [f"{stack} {count}" for stack, count in self.counts.most_common()]
+
+
+def write_profile(sampler, name, profile_dir=None):
+    """計測結果を profile_dir/<日時>_<name>.collapsed に書き出してパスを返す"""
+    profile_dir = profile_dir or PROFILE_DIR
+    os.makedirs(profile_dir, exist_ok=True)
+    slug = re.sub(r'[^0-9A-Za-z_-]+', '_', name).strip('_') or 'root'
+    path = os.path.join(profile_dir, f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{slug}.collapsed")
+    with open(path, 'w', encoding='utf-8') as f:
+        for line in sampler.collapsed():
+            f.write(line + '\n')
+    logger.info("プロファイルを書き出しました: %s（%.3f 秒, %d サンプル）", path, sampler.elapsed, sampler.samples)
+    return path
+
+
+def sampled():
+    """PROFILE_SAMPLE_RATE の割合で True"""
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def authorized(headers, args):
+    """リクエストが PROFILE_TOKEN の一致するトークンでプロファイルを求めているか"""
+    if not PROFILE_TOKEN:
+        return False
+    token = headers.get(PROFILE_HEADER) or args.get(PROFILE_PARAM)
+    # str どうしの compare_digest は ASCII 以外の文字で TypeError になるので、バイト列で比べる
+    return bool(token) and hmac.compare_digest(token.encode('utf-8'), PROFILE_TOKEN.encode('utf-8'))
+
+
+@contextmanager
+def profile(name, enabled=True):
+    """with profile('backfill'): のように囲んだ処理を計測して書き出す（enabled=False なら何もしない）"""
+    if not enabled:
+        yield None
+        return
+    sampler = StackSampler().start()
+    try:
+        yield sampler
+    finally:
+        sampler.stop()
+        write_profile(sampler, name)
@@ -0,0 +1,454 @@
+"""
+試合データ(matches)の保存先を抽象化するストレージ層。
+
+- CsvMatchStorage: 従来どおり matches.csv を丸ごと読み書きする互換バックエンド
+- SqliteMatchStorage: SQLite(WALモード)に1行単位で INSERT/UPDATE/DELETE する既定のバックエンド
+
+row_id は /edit_match/<row_id> や /delete_match/<row_id>・/api/matches のカーソルで使う行の番号。
+- CsvMatchStorage: 従来どおり「保存順での0始まりの行番号」（ほかの行を削除すると変わる）
+- SqliteMatchStorage: テーブルの主キー id（ほかの行を追加・削除しても変わらないので、
+  複数のワーカーが同時に書き込んでも別の行を編集・削除することがない）
+read_all() が返すDataFrameの index がそのまま row_id になっている。
+
+書き込みのたびに登録済みリスナーへ MatchChange を通知する。
+集計キャッシュなどはこれを使って全件を読み直さずに差分だけ反映できる。
+
+integer_columns に指定したカラム（試合時間_分・入場者数など）は整数として保存する
+（CSVに 36288.0 のような float 表記で書かない）。
+"""
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from app_logging import get_logger
+from metrics import stage
+
+
+logger = get_logger(__name__)
+
+
+class MatchChange:
+    """
+    1回の書き込みで起きた変更。
+    removed/added は行の辞書のリスト。removed が None の場合は全件置き換え（差分なし）を表す。
+    version_before/version_after は書き込み直前・直後のデータバージョン。
+    """
+    def __init__(self, removed, added, version_before, version_after):
+        self.removed = removed
+        self.added = added
+        self.version_before = version_before
+        self.version_after = version_after
+
+
+class MatchStorage:
+    """
+    試合データストレージの共通インターフェース。
+    """
+    def __init__(self, columns, integer_columns=()):
+        self.columns = list(columns)
+        self.integer_columns = [col for col in integer_columns if col in self.columns]
+        self._listeners = []
+
+    def add_listener(self, listener):
+        """書き込みのたびに listener(MatchChange) を呼び出すよう登録する"""
+        self._listeners.append(listener)
+
+    def _notify(self, removed, added, version_before, version_after):
+        change = MatchChange(removed, added, version_before, version_after)
+        for listener in self._listeners:
+            try:
+                listener(change)
+            except Exception:
+                logger.exception("ストレージ変更通知の処理中にエラー")
+
+    def read_all(self):
+        """全試合をDataFrameで返す（保存順。index は row_id）"""
+        raise NotImplementedError
+
+    def insert(self, row):
+        """1試合分の行を末尾に追加する"""
+        raise NotImplementedError
+
+    def insert_many(self, rows, replace=True):
+        """
+        複数行をまとめて書き込む。
+        replace=True の場合は (日付, チーム名) が一致する既存行を置き換える。
+        """
+        raise NotImplementedError
+
+    def upsert(self, row):
+        """(日付, チーム名) が一致する既存行を削除してから追加する"""
+        self.insert_many([row], replace=True)
+
+    def get(self, row_id):
+        """row_id の行を辞書で返す。存在しなければ None"""
+        raise NotImplementedError
+
+    def find_row_id(self, date, team):
+        """日付とチーム名に一致する最初の行の row_id を返す。なければ None"""
+        raise NotImplementedError
+
+    def update(self, row_id, values):
+        """row_id の行の指定カラムを更新する。更新できたら True"""
+        raise NotImplementedError
+
+    def delete(self, row_id):
+        """row_id の行を削除し、削除した行を辞書で返す。存在しなければ None"""
+        raise NotImplementedError
+
+    def version(self):
+        """データが変わるたびに変化する値（キャッシュ無効化用）"""
+        raise NotImplementedError
+
+    def import_csv(self, csv_path):
+        """CSVの内容でストレージを置き換える"""
+        df = pd.read_csv(csv_path, encoding='utf-8-sig')
+        self.replace_all(df)
+
+    def export_csv(self, csv_path):
+        """ストレージの内容を CSV_HEADERS 互換のCSVとして書き出す"""
+        df = self.read_all()
+        for col in self.columns:
+            if col not in df.columns:
+                df[col] = ''
+        df[self.columns].to_csv(csv_path, index=False, encoding='utf-8-sig')
+
+    def replace_all(self, df):
+        """DataFrameの内容でストレージ全体を置き換える"""
+        raise NotImplementedError
+
+    def _normalize_row(self, row):
+        """スキーマにないカラムを落とし、欠けているカラムを空欄で補う"""
+        return {col: row.get(col, '') for col in self.columns}
+
+    def _with_integer_columns(self, df):
+        """
+        integer_columns を整数（欠損ありの Int64）にしたDataFrameを返す。
+        数値にできない値（移行前の '36,288人' など）が残っているカラムはそのままにする。
+        """
+        df = df.copy()
+        for col in self.integer_columns:
+            if col not in df.columns:
+                continue
+            converted = pd.to_numeric(df[col], errors='coerce')
+            blank = df[col].isna() | (df[col].astype(object) == '')
+            if (converted.isna() & ~blank).any():
+                continue
+            df[col] = np.trunc(converted).astype('Int64')
+        return df
+
+
+class CsvMatchStorage(MatchStorage):
+    """
+    matches.csv をそのまま使う互換バックエンド。
+    書き込みのたびに全件を書き直すが、一時ファイル経由で置き換えるため
+    書き込み途中のファイルを他のリクエストが読むことはない。
+    """
+    def __init__(self, csv_path, columns, integer_columns=()):
+        super().__init__(columns, integer_columns)
+        self.csv_path = csv_path
+        self._lock = threading.Lock()
+
+    def read_all(self):
+        try:
+            with stage('csv_read'):
+                return pd.read_csv(self.csv_path, encoding='utf-8-sig')
+        except (FileNotFoundError, pd.errors.EmptyDataError):
+            return pd.DataFrame(columns=self.columns)
+
+    def _write(self, df):
+        tmp_path = f"{self.csv_path}.tmp{os.getpid()}"
+        df = self._with_integer_columns(df)
+        with stage('csv_write'):
+            df.to_csv(tmp_path, index=False, encoding='utf-8-sig')
+        os.replace(tmp_path, self.csv_path)
+
+    def insert(self, row):
+        with self._lock:
+            before = self.version()
+            df = self.read_all()
+            df = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
+            self._write(df)
+            self._notify([], [row], before, self.version())
+
+    def insert_many(self, rows, replace=True):
+        if not rows:
+            return
+        with self._lock:
+            before = self.version()
+            df = self.read_all()
+            new_df = pd.DataFrame([self._normalize_row(r) for r in rows])
+            removed = []
+            if replace and not df.empty:
+                keys = set(zip(new_df['日付'].astype(str), new_df['チーム名'].astype(str)))
+                existing_keys = zip(df['日付'].astype(str), df['チーム名'].astype(str))
+                keep = [k not in keys for k in existing_keys]
+                removed = df[[not k for k in keep]].to_dict(orient='records')
+                df = df[keep]
+            df = pd.concat([df, new_df], ignore_index=True)
+            for col in self.columns:
+                if col not in df.columns:
+                    df[col] = ''
+            self._write(df[self.columns])
+            self._notify(removed, new_df.to_dict(orient='records'), before, self.version())
+
+    def get(self, row_id):
+        df = self.read_all()
+        if row_id < 0 or row_id >= len(df):
+            return None
+        return df.iloc[row_id].to_dict()
+
+    def find_row_id(self, date, team):
+        df = self.read_all()
+        if df.empty:
+            return None
+        matches = df.index[(df['日付'] == date) & (df['チーム名'] == team)]
+        return int(matches[0]) if len(matches) else None
+
+    def update(self, row_id, values):
+        with self._lock:
+            before = self.version()
+            df = self.read_all()
+            if row_id < 0 or row_id >= len(df):
+                return False
+            old = df.iloc[row_id].to_dict()
+            for col, value in values.items():
+                if col in df.columns and df[col].dtype != object:
+                    df[col] = df[col].astype(object)
+                df.at[row_id, col] = value
+            self._write(df)
+            self._notify([old], [{**old, **values}], before, self.version())
+            return True
+
+    def delete(self, row_id):
+        with self._lock:
+            before = self.version()
+            df = self.read_all()
+            if row_id < 0 or row_id >= len(df):
+                return None
+            deleted = df.iloc[row_id].to_dict()
+            df = df.drop(df.index[row_id]).reset_index(drop=True)
+            self._write(df)
+            self._notify([deleted], [], before, self.version())
+            return deleted
+
+    def replace_all(self, df):
+        with self._lock:
+            before = self.version()
+            self._write(df)
+            self._notify(None, None, before, self.version())
+
+    def version(self):
+        try:
+            st = os.stat(self.csv_path)
+        except FileNotFoundError:
+            return ('csv', 0, 0)
+        return ('csv', st.st_mtime_ns, st.st_size)
+
+
+class SqliteMatchStorage(MatchStorage):
+    """
+    SQLite(WALモード)バックエンド。
+    1試合の追加・更新・削除は1行分のSQLだけで済み、
+    複数のgunicornワーカーから同時に書き込んでもSQLiteのロックで直列化される。
+    row_id は主キー id なので、取得・更新・削除は id の検索1回で済む。
+    """
+    TABLE = 'matches'
+
+    def __init__(self, db_path, columns, integer_columns=()):
+        super().__init__(columns, integer_columns)
+        self.db_path = db_path
+        self._local = threading.local()
+        self._init_schema()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _quote(name):
+        return '"' + name.replace('"', '""') + '"'
+
+    def _init_schema(self):
+        conn = self._connect()
+        # 型を宣言しないカラムは値をそのままの型で保持する（CSVとの往復で型が崩れない）
+        cols_sql = ', '.join(self._quote(c) for c in self.columns)
+        with conn:
+            conn.execute(f'CREATE TABLE IF NOT EXISTS {self.TABLE} (id INTEGER PRIMARY KEY AUTOINCREMENT, {cols_sql})')
+            # 後から増えたカラムは既存のテーブルに追加する
+            existing = {row[1] for row in conn.execute(f'PRAGMA table_info({self.TABLE})')}
+            for col in self.columns:
+                if col not in existing:
+                    conn.execute(f'ALTER TABLE {self.TABLE} ADD COLUMN {self._quote(col)}')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{self.TABLE}_date_team ON {self.TABLE} ("日付", "チーム名")')
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0)")
+
+    def _bump_version(self, conn):
+        """
+        トランザクションの最初に呼び、書き込みロックを取ったうえでバージョンを1つ進める。
+        戻り値は (書き込み前のバージョン, 書き込み後のバージョン)。
+        """
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+        after = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+        return ('sqlite', after - 1), ('sqlite', after)
+
+    def _select_rows(self, conn, where_sql, params):
+        cols_sql = ', '.join(self._quote(c) for c in self.columns)
+        cur = conn.execute(f'SELECT {cols_sql} FROM {self.TABLE} WHERE {where_sql} ORDER BY id', params)
+        return [dict(zip(self.columns, values)) for values in cur.fetchall()]
+
+    @staticmethod
+    def _to_db_value(value):
+        # 空欄・NaNはNULLとして保存する（CSVを読み込んだときのNaNと同じ扱い）
+        if value is None or value == '':
+            return None
+        try:
+            if pd.isna(value):
+                return None
+        except (TypeError, ValueError):
+            pass
+        if hasattr(value, 'item'):
+            return value.item()
+        return value
+
+    def _insert_sql(self):
+        cols_sql = ', '.join(self._quote(c) for c in self.columns)
+        placeholders = ', '.join('?' for _ in self.columns)
+        return f'INSERT INTO {self.TABLE} ({cols_sql}) VALUES ({placeholders})'
+
+    def _row_values(self, row):
+        values = [self._to_db_value(row.get(col, '')) for col in self.columns]
+        for i, col in enumerate(self.columns):
+            if col in self.integer_columns and isinstance(values[i], float) and values[i].is_integer():
+                values[i] = int(values[i])
+        return values
+
+    def read_all(self):
+        conn = self._connect()
+        cols_sql = ', '.join(self._quote(c) for c in self.columns)
+        # CSVバックエンドと比べられるよう、同じ段階名で計測する
+        with stage('csv_read'):
+            df = pd.read_sql_query(f'SELECT id, {cols_sql} FROM {self.TABLE} ORDER BY id', conn, index_col='id')
+        df.index.name = None
+        # pd.read_csv と同じく、全値が数値として読めるカラムは数値型にする
+        for col in df.columns:
+            if df[col].dtype == object:
+                converted = pd.to_numeric(df[col], errors='coerce')
+                if converted.notna().sum() == df[col].notna().sum() and df[col].notna().any():
+                    df[col] = converted
+        return df
+
+    def insert(self, row):
+        conn = self._connect()
+        with conn:
+            before, after = self._bump_version(conn)
+            conn.execute(self._insert_sql(), self._row_values(row))
+        self._notify([], [row], before, after)
+
+    def insert_many(self, rows, replace=True):
+        if not rows:
+            return
+        conn = self._connect()
+        removed = []
+        with conn:
+            before, after = self._bump_version(conn)
+            if replace:
+                keys = [(self._to_db_value(r.get('日付')), self._to_db_value(r.get('チーム名'))) for r in rows]
+                for key in dict.fromkeys(keys):
+                    removed.extend(self._select_rows(conn, '"日付" = ? AND "チーム名" = ?', key))
+                conn.executemany(f'DELETE FROM {self.TABLE} WHERE "日付" = ? AND "チーム名" = ?', keys)
+            conn.executemany(self._insert_sql(), [self._row_values(r) for r in rows])
+        self._notify(removed, [self._normalize_row(r) for r in rows], before, after)
+
+    def get(self, row_id):
+        rows = self._select_rows(self._connect(), 'id = ?', (row_id,))
+        return rows[0] if rows else None
+
+    def find_row_id(self, date, team):
+        conn = self._connect()
+        found = conn.execute(
+            f'SELECT id FROM {self.TABLE} WHERE "日付" = ? AND "チーム名" = ? ORDER BY id LIMIT 1',
+            (date, team)
+        ).fetchone()
+        return found[0] if found else None
+
+    def update(self, row_id, values):
+        values = {k: v for k, v in values.items() if k in self.columns}
+        if not values:
+            return self.get(row_id) is not None
+        conn = self._connect()
+        with conn:
+            before, after = self._bump_version(conn)
+            rows = self._select_rows(conn, 'id = ?', (row_id,))
+            if not rows:
+                conn.rollback()
+                return False
+            old = rows[0]
+            set_sql = ', '.join(f'{self._quote(c)} = ?' for c in values)
+            conn.execute(
+                f'UPDATE {self.TABLE} SET {set_sql} WHERE id = ?',
+                [self._to_db_value(v) for v in values.values()] + [row_id]
+            )
+        self._notify([old], [{**old, **values}], before, after)
+        return True
+
+    def delete(self, row_id):
+        conn = self._connect()
+        with conn:
+            before, after = self._bump_version(conn)
+            rows = self._select_rows(conn, 'id = ?', (row_id,))
+            if not rows:
+                conn.rollback()
+                return None
+            deleted = rows[0]
+            conn.execute(f'DELETE FROM {self.TABLE} WHERE id = ?', (row_id,))
+        self._notify([deleted], [], before, after)
+        return deleted
+
+    def replace_all(self, df):
+        rows = df.to_dict(orient='records')
+        conn = self._connect()
+        with conn:
+            before, after = self._bump_version(conn)
+            conn.execute(f'DELETE FROM {self.TABLE}')
+            conn.executemany(self._insert_sql(), [self._row_values(r) for r in rows])
+        self._notify(None, None, before, after)
+
+    def is_empty(self):
+        conn = self._connect()
+        return conn.execute(f'SELECT 1 FROM {self.TABLE} LIMIT 1').fetchone() is None
+
+    def version(self):
+        conn = self._connect()
+        value = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return ('sqlite', value[0] if value else 0)
+
+
+def create_match_storage(backend, data_dir, columns, csv_path=None, integer_columns=()):
+    """
+    設定値からストレージを生成する。
+    backend: 'sqlite'（既定） または 'csv'（従来互換）
+    sqliteのデータベースを新しく作るときだけ、既存のmatches.csvの内容を取り込む
+    （以降は matches.csv を読まないので、全試合を削除しても取り込み直さない）。
+    """
+    csv_path = csv_path or os.path.join(data_dir, 'matches.csv')
+    if backend == 'sqlite':
+        db_path = os.path.join(data_dir, 'matches.db')
+        created = not os.path.exists(db_path)
+        storage = SqliteMatchStorage(db_path, columns, integer_columns)
+        if created and os.path.exists(csv_path) and os.path.getsize(csv_path) > 0:
+            storage.import_csv(csv_path)
+            logger.info("%s の内容を %s に取り込みました", csv_path, db_path)
+        return storage
+    if backend == 'csv':
+        return CsvMatchStorage(csv_path, columns, integer_columns)
+    raise ValueError(f"未対応のストレージです: {backend}")
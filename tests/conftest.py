@@ -0,0 +1,54 @@
+"""
+pytest の共通設定。
+
+app.py は読み込んだ時点のカレントディレクトリの data/ を使うので、
+一時ディレクトリに移動してから（SQLite のストレージ・ジョブはその場で実行の設定で）読み込む。
+npb.jp の代わりには bench/npb_standin.py のスタンドインサーバーを使う（standin フィクスチャ）。
+"""
+import importlib
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'bench'))
+
+from npb_standin import StandinServer  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp('app')
+    cwd = os.getcwd()
+    os.environ['MATCH_STORAGE'] = 'sqlite'
+    os.environ['JOB_WORKERS'] = '0'
+    os.chdir(workdir)
+    try:
+        yield importlib.import_module('app')
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture
+def client(app_module):
+    app_module.app.config['TESTING'] = True
+    with app_module.app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def standin():
+    """StandinServer(**options) を起動して返す関数。テストの終わりに止める"""
+    servers = []
+
+    def start(**options):
+        server = StandinServer(**options)
+        server.start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
@@ -0,0 +1,63 @@
+import pytest
+
+from aggregates import Bucket, MatchAggregates, frame_buckets
+from match_cache import MatchDataCache
+from storage import CsvMatchStorage, SqliteMatchStorage
+
+COLUMNS = ['日付', 'チーム名', 'ホーム/ビジター', '相手チーム', '得点', '失点', '勝敗', 'URL',
+           '試合時間', '入場者数', 'コメント', '試合時間_分']
+TEXT_COLUMNS = ['日付', 'チーム名', 'ホーム/ビジター', '相手チーム', '勝敗', 'URL', '試合時間', 'コメント']
+NUMERIC_COLUMNS = [col for col in COLUMNS if col not in TEXT_COLUMNS]
+FIELDS = ('games', 'win', 'lose', 'draw', 'time_total', 'time_count', 'att_total', 'att_count')
+
+
+def game(day, opponent='巨人', runs=3, allowed=2, team='阪神', **values):
+    result = '勝' if runs > allowed else '敗' if runs < allowed else '引分'
+    row = {'日付': f'2025-08-{day:02d}', 'チーム名': team, 'ホーム/ビジター': 'ホーム', '相手チーム': opponent,
+           '得点': runs, '失点': allowed, '勝敗': result, 'URL': f'/scores/2025/08{day:02d}/',
+           '試合時間': '3:05', '入場者数': 42000, 'コメント': '', '試合時間_分': 185}
+    row.update(values)
+    return row
+
+
+def assert_same_buckets(actual, expected):
+    for key in set(actual) | set(expected):
+        a, e = actual.get(key, Bucket()), expected.get(key, Bucket())
+        assert {f: getattr(a, f) for f in FIELDS} == {f: getattr(e, f) for f in FIELDS}, key
+        for col in NUMERIC_COLUMNS:
+            assert a.total(col) == pytest.approx(e.total(col)), (key, col)
+
+
+@pytest.mark.parametrize('backend', ['csv', 'sqlite'])
+def test_incremental_buckets_match_full_rebuild(backend, tmp_path):
+    if backend == 'csv':
+        storage = CsvMatchStorage(str(tmp_path / 'matches.csv'), COLUMNS, integer_columns=['入場者数', '試合時間_分'])
+    else:
+        storage = SqliteMatchStorage(str(tmp_path / 'matches.db'), COLUMNS, integer_columns=['入場者数', '試合時間_分'])
+    aggregates = MatchAggregates(MatchDataCache(storage, TEXT_COLUMNS), NUMERIC_COLUMNS)
+    storage.add_listener(aggregates.on_change)
+    storage.insert_many([game(1)])
+    assert aggregates.bucket('all').games == 1
+
+    rebuilds = []
+    rebuild = aggregates._rebuild
+    aggregates._rebuild = lambda: (rebuilds.append(1), rebuild())
+    storage.insert_many([
+        game(2, '広島', 1, 4),
+        game(3, '広島', 2, 2, 入場者数=None),
+        # 移行前の行（試合時間_分がなく、試合時間の文字列だけある）
+        game(4, 'DeNA', 5, 0, 試合時間='3時間12分', 試合時間_分=None),
+        game(5, '', 0, 0, 勝敗=''),
+        game(6, '中日', 4, 3, team='その他'),
+    ])
+    # 再取得（同じ日付・チームの行の置き換え）
+    storage.upsert(game(2, '広島', 6, 4, コメント='再取得'))
+    row_id = storage.find_row_id('2025-08-03', '阪神')
+    storage.update(row_id, {'相手チーム': 'ヤクルト', '得点': 7, '勝敗': '勝', 'ホーム/ビジター': 'ビジター'})
+    storage.delete(storage.find_row_id('2025-08-04', '阪神'))
+
+    expected = frame_buckets(storage.read_all(), NUMERIC_COLUMNS)
+    assert aggregates.bucket('all').games == 5
+    assert rebuilds == []
+    assert_same_buckets(aggregates._buckets, expected)
+    assert aggregates.group('opponent').keys() == {'巨人', '広島', 'ヤクルト', '中日'}
@@ -0,0 +1,24 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bench'))
+
+import baselines  # noqa: E402
+
+PARAMS = {'games': 56, 'workers': 4, 'latency': 0.02}
+BASE = {'backfill': {'games_per_s': 10.0, 'p99_ms': 400.0, 'games': 56}}
+
+
+def test_compare_flags_regressions_beyond_tolerance():
+    results = {'backfill': {'games_per_s': 7.0, 'p99_ms': 450.0, 'games': 10}}
+    assert baselines.compare(results, BASE, tolerance=0.25) == [('backfill', 'games_per_s', 10.0, 7.0)]
+
+
+def test_report_compares_only_same_params(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(baselines, 'BASELINE_DIR', str(tmp_path))
+    slower = {'backfill': {'games_per_s': 5.0, 'p99_ms': 400.0, 'games': 56}}
+    assert not baselines.report('scrape', BASE, PARAMS, save_baseline=True)
+    assert baselines.report('scrape', slower, dict(PARAMS))
+    # --games・並列数などが違う実行は比べない
+    assert not baselines.report('scrape', slower, {**PARAMS, 'games': 200})
+    assert '実行パラメータが違う' in capsys.readouterr().out
@@ -0,0 +1,67 @@
+import glob
+import os
+
+import pytest
+from bs4 import BeautifulSoup
+
+from box_score import _outs, make_box_soup, parse_box_html, parse_box_score
+
+
+def innings_cell(*ths):
+    cells = ''.join(f'<th class="fraction">{t}</th>' if '/' in t else f'<th>{t}</th>' for t in ths)
+    return BeautifulSoup(f'<td><table><tr>{cells}</tr></table></td>', 'html.parser').td
+
+
+@pytest.mark.parametrize('ths, outs', [
+    (('5', '2/3'), 17),
+    (('7', ''), 21),
+    (('', '2/3'), 2),
+    (('', '1/3'), 1),
+    (('0', '1/3'), 1),
+    (('2/3',), 2),
+    (('0', ''), 0),
+    (('', ''), 0),
+])
+def test_outs(ths, outs):
+    assert _outs(innings_cell(*ths)) == outs
+
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+PAGES = sorted(glob.glob(os.path.join(PAGES_DIR, 'box_*.html')))
+
+# ページごとに確かめる値（投手の投球アウト数は登板順）
+EXPECTED = {
+    'box_relief_fractions.html': {
+        'date': '2025-07-01', 'game_time': '3:41', 'attendance': '42633',
+        'away_team': '巨人', 'home_team': '阪神', 'away_score': 3, 'home_score': 4,
+        'outs': {'top': [17, 1, 0, 2], 'bottom': [19, 5, 3]},
+    },
+    'box_extra_innings_sparse.html': {
+        'date': '2025-04-13', 'game_time': '4:05', 'attendance': '9870',
+        'away_team': '日本ハム', 'home_team': 'ロッテ', 'away_score': 2, 'home_score': 2,
+        'outs': {'top': [23, 1, 12], 'bottom': []},
+    },
+}
+
+
+def read_page(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('path', PAGES, ids=os.path.basename)
+def test_fast_parse_matches_full_parse(path):
+    html = read_page(path)
+    full = parse_box_score(make_box_soup(html, mode='full'))
+    assert parse_box_score(make_box_soup(html, mode='fast')) == full
+    assert parse_box_score(make_box_soup(html, mode='fast', parser='html.parser')) == full
+    assert parse_box_html(html) == full
+
+
+@pytest.mark.parametrize('name', sorted(EXPECTED))
+def test_page_values(name):
+    expected = dict(EXPECTED[name])
+    outs = expected.pop('outs')
+    parsed = parse_box_html(read_page(os.path.join(PAGES_DIR, name)))
+    assert {key: parsed[key] for key in expected} == expected
+    assert {side: [p['投球アウト数'] for p in parsed['pitchers'][side]] for side in outs} == outs
@@ -0,0 +1,26 @@
+import gzip
+import json
+
+
+def test_gzip_page_is_valid_and_varies(client):
+    plain = client.get('/summary')
+    response = client.get('/summary', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert 'Accept-Encoding' in plain.headers['Vary']
+    assert gzip.decompress(response.data) == plain.data
+    # 圧縮した表現には別の ETag が付き、その ETag でも 304 になる
+    assert response.headers['ETag'] != plain.headers['ETag']
+    revalidated = client.get('/summary', headers={'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304
+
+
+def test_gzip_json(app_module, client):
+    row = {col: 0 for col in app_module.CSV_HEADERS}
+    row.update({'チーム名': '西武', 'ホーム/ビジター': 'ホーム', '相手チーム': '楽天', '勝敗': '勝', 'URL': '手動入力'})
+    app_module.match_storage.insert_many([{**row, '日付': f'2025-09-{day:02d}'} for day in range(1, 11)])
+    plain = client.get('/api/matches?team=西武')
+    response = client.get('/api/matches?team=西武', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert json.loads(gzip.decompress(response.data)) == plain.get_json()
@@ -0,0 +1,53 @@
+import csv
+import io
+import json
+import os
+
+
+def insert_matches(app_module):
+    base = {col: 0 for col in app_module.CSV_HEADERS}
+    base.update({'チーム名': 'ヤクルト', 'ホーム/ビジター': 'ホーム', '相手チーム': '広島', '勝敗': '勝',
+                 'URL': '手動入力', '試合時間': '', 'コメント': ''})
+    rows = [
+        {**base, '日付': '2025-06-01', '得点': 5, '自チーム_打数': 35, '入場者数': 36288, '試合時間_分': 185},
+        # 打数・入場者数が空欄の行があると、そのカラムは float で読み込まれる
+        {**base, '日付': '2025-06-02', '得点': 2, '自チーム_打数': '', '入場者数': '', '試合時間_分': ''},
+    ]
+    app_module.match_storage.insert_many(rows, replace=True)
+
+
+def test_matches_csv_writes_integers(app_module, client):
+    insert_matches(app_module)
+    response = client.get('/export/matches.csv?team=ヤクルト&sort=date')
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True).lstrip('\ufeff'))))
+    assert [(r['自チーム_打数'], r['入場者数'], r['試合時間_分']) for r in rows] == [('35', '36288', '185'), ('', '', '')]
+
+
+def test_matches_ndjson_writes_integers(app_module, client):
+    insert_matches(app_module)
+    response = client.get('/export/matches.ndjson?team=ヤクルト&sort=date&to=2025-06-01')
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert records[-1]['自チーム_打数'] == 35 and isinstance(records[-1]['自チーム_打数'], int)
+    assert records[-1]['入場者数'] == 36288 and isinstance(records[-1]['入場者数'], int)
+
+
+def test_batters_export_includes_unsaved_deltas(app_module, client):
+    app_module.batter_store.apply_batch([{'選手名': '村上', '打数': 4, '安打': 2, '本塁打': 1}], 'ヤクルト')
+    response = client.get('/export/batters.ndjson?team=ヤクルト')
+    assert response.status_code == 200
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    murakami = [r for r in records if r['選手名'] == '村上']
+    assert murakami and murakami[0]['本塁打'] >= 1 and isinstance(murakami[0]['打数'], int)
+    # 書き出しでは通算CSVを書き直さない（差分ログは残ったまま）
+    assert os.path.exists(app_module.batter_store.delta_path)
+
+
+def test_ledger_export_skips_removed_games(app_module, client):
+    ledger = app_module.batter_ledger
+    ledger.record_game('/scores/2025/0610/s-c-01/', '2025-06-10', 'ヤクルト', [{'選手名': '長岡', '打数': 4, '安打': 2}])
+    ledger.record_game('/scores/2025/0611/s-c-02/', '2025-06-11', 'ヤクルト', [{'選手名': '長岡', '打数': 3, '安打': 1}])
+    ledger.remove_game('/scores/2025/0610/s-c-01/')
+    response = client.get('/export/batters_games.ndjson?team=ヤクルト&from=2025-06-10&to=2025-06-11')
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [(r['URL'], r['安打']) for r in records] == [('/scores/2025/0611/s-c-02/', 1)]
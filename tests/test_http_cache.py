@@ -0,0 +1,31 @@
+from http_cache import HttpCache
+from http_client import HttpClient
+
+SCHEDULE_PATH = '/games/2025/schedule_04_detail.html'
+
+
+def test_not_modified_returns_cached_body(standin, tmp_path):
+    server = standin()
+    client = HttpClient(base_url=server.base_url, retries=0)
+    cache = HttpCache(str(tmp_path))
+    body = client.get_text_cached(SCHEDULE_PATH, cache, ttl=0)
+    assert cache.misses == 1
+
+    # TTL を過ぎていれば If-None-Match で再検証し、304 ならキャッシュの本文を返す
+    assert client.get_text_cached(SCHEDULE_PATH, cache, ttl=0) == body
+    assert cache.revalidated == 1 and server.not_modified == 1
+
+    # TTL 内なら通信しない
+    requests = server.requests
+    assert client.get_text_cached(SCHEDULE_PATH, cache, ttl=600) == body
+    assert cache.hits == 1 and server.requests == requests
+
+
+def test_stale_body_is_used_when_revalidation_fails(standin, tmp_path):
+    server = standin()
+    client = HttpClient(base_url=server.base_url, retries=1, backoff=0.01)
+    cache = HttpCache(str(tmp_path))
+    body = client.get_text_cached(SCHEDULE_PATH, cache, ttl=0)
+    server.error_rate = 1.0
+    assert client.get_text_cached(SCHEDULE_PATH, cache, ttl=0) == body
+    assert server.errors == 2
@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from http_client import HostRateLimiter, HttpClient
+
+SCHEDULE_PATH = '/games/2025/schedule_04_detail.html'
+
+
+def test_retries_503_then_succeeds(standin):
+    # seed=1 では1回目が 503、2回目が 200 になる
+    server = standin(error_rate=0.5, seed=1)
+    client = HttpClient(base_url=server.base_url, retries=3, backoff=0.01)
+    assert client.get(SCHEDULE_PATH).status_code == 200
+    assert (server.requests, server.errors) == (2, 1)
+
+
+def test_gives_up_after_retries(standin):
+    server = standin(error_rate=1.0)
+    client = HttpClient(base_url=server.base_url, retries=2, backoff=0.01)
+    with pytest.raises(requests.HTTPError) as excinfo:
+        client.get(SCHEDULE_PATH)
+    assert excinfo.value.response.status_code == 503
+    assert server.requests == server.errors == 3
+
+
+def test_not_found_is_not_retried(standin):
+    server = standin()
+    client = HttpClient(base_url=server.base_url, retries=3, backoff=0.01)
+    with pytest.raises(requests.HTTPError):
+        client.get('/scores/2025/0429/0/box.html')
+    assert server.requests == 1
+
+
+def test_timeouts_are_retried_then_raised(standin):
+    server = standin(hang_rate=1.0, hang_seconds=0.5)
+    client = HttpClient(base_url=server.base_url, timeout=0.1, retries=1, backoff=0.01)
+    started = time.monotonic()
+    with pytest.raises(requests.Timeout):
+        client.get(SCHEDULE_PATH)
+    # 応答しないサーバーでも、タイムアウト × 試行回数 程度で諦める
+    assert time.monotonic() - started < 0.5
+    assert server.hangs == 2
+
+
+def test_latency_below_timeout_succeeds(standin):
+    server = standin(latency=0.05, jitter=0.02)
+    client = HttpClient(base_url=server.base_url, timeout=1.0, retries=0)
+    assert '<table class="schedule">' in client.get_text(SCHEDULE_PATH)
+    assert server.errors == 0
+
+
+def test_requests_to_one_host_are_spaced(standin):
+    server = standin(latency=0.01)
+    client = HttpClient(base_url=server.base_url, min_interval=0.1, retries=0)
+    started = time.monotonic()
+    threads = [threading.Thread(target=client.get, args=(SCHEDULE_PATH,)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    # 並列に送っても同じホストへは 0.1 秒以上あけるので、4件で 0.3 秒以上かかる
+    assert time.monotonic() - started >= 0.3
+    assert server.requests == 4
+
+
+def test_rate_limiter_is_per_host():
+    limiter = HostRateLimiter(0.5)
+    started = time.monotonic()
+    for host in ('a.example', 'b.example', 'c.example'):
+        limiter.wait(f'http://{host}/games/')
+    assert time.monotonic() - started < 0.1
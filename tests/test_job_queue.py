@@ -0,0 +1,79 @@
+import threading
+import time
+
+from job_queue import DONE, QUEUED, RUNNING, JobQueue
+
+
+def wait_for(queue, job_id, status, timeout=5):
+    deadline = time.monotonic() + timeout
+    while queue.get(job_id)['status'] != status:
+        assert time.monotonic() < deadline, queue.get(job_id)
+        time.sleep(0.01)
+
+
+def blocking_queue(db_path, **options):
+    """'record' ジョブが release されるまで終わらないキュー"""
+    started, release = threading.Event(), threading.Event()
+
+    def record(date):
+        started.set()
+        release.wait(5)
+        return True, f'{date} を記録しました'
+
+    queue = JobQueue(db_path, {'record': record}, workers=1, poll_interval=0.05, **options)
+    return queue, started, release
+
+
+def test_duplicate_submits_are_coalesced(tmp_path):
+    queue, started, release = blocking_queue(str(tmp_path / 'jobs.db'))
+    running, created = queue.submit('record', '2025-08-01', {'date': '2025-08-01'})
+    assert created and started.wait(5)
+    # 実行中・待機中のジョブと同じキーなら、新しく積まずに同じIDを返す
+    assert queue.submit('record', '2025-08-01', {'date': '2025-08-01'}) == (running, False)
+    queued, created = queue.submit('record', '2025-08-02', {'date': '2025-08-02'})
+    assert created and queued != running
+    assert queue.submit('record', '2025-08-02', {'date': '2025-08-02'}) == (queued, False)
+    release.set()
+    wait_for(queue, running, DONE)
+    wait_for(queue, queued, DONE)
+    # 終わったジョブと同じキーなら新しく積む
+    assert queue.submit('record', '2025-08-01', {'date': '2025-08-01'})[1]
+
+
+def insert_running(queue, job_id, started_at, heartbeat_at):
+    conn = queue._connect()
+    with conn:
+        conn.execute('INSERT INTO jobs (id, kind, key, params, status, created_at, started_at, heartbeat_at) '
+                     'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                     (job_id, 'record', job_id, '{}', RUNNING, started_at, started_at, heartbeat_at))
+
+
+def test_requeue_stale_uses_heartbeat(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.db'), {'record': lambda: (True, '')}, workers=0, stale_after=600)
+    now = time.time()
+    insert_running(queue, 'crashed', now - 3600, now - 3600)
+    insert_running(queue, 'long_backfill', now - 3600, now - 30)
+    insert_running(queue, 'before_heartbeat', now - 3600, None)
+    queue._requeue_stale()
+    assert queue.get('crashed')['status'] == QUEUED
+    assert queue.get('crashed')['started_at'] is None
+    # 開始から stale_after を過ぎていても、heartbeat が更新されていれば実行中のまま
+    assert queue.get('long_backfill')['status'] == RUNNING
+    # heartbeat のない（列を追加する前の）行は開始時刻で判断する
+    assert queue.get('before_heartbeat')['status'] == QUEUED
+
+
+def test_heartbeat_keeps_long_job_from_going_stale(tmp_path):
+    db_path = str(tmp_path / 'jobs.db')
+    queue, started, release = blocking_queue(db_path, stale_after=0.3, heartbeat_interval=0.05)
+    job_id, _ = queue.submit('record', '2025-08-01', {'date': '2025-08-01'})
+    assert started.wait(5)
+    time.sleep(0.6)
+    # 別のプロセスのワーカーが起動しても、実行中のジョブは積み直さない
+    JobQueue(db_path, queue.handlers, workers=0, stale_after=0.3)._requeue_stale()
+    assert queue.get(job_id)['status'] == RUNNING
+    assert queue.get(job_id)['heartbeat_at'] > queue.get(job_id)['started_at'] + 0.3
+    assert queue.submit('record', '2025-08-01', {'date': '2025-08-01'}) == (job_id, False)
+    release.set()
+    wait_for(queue, job_id, DONE)
+    assert queue.get(job_id)['message'] == '2025-08-01 を記録しました'
@@ -0,0 +1,28 @@
+import pytest
+
+import metrics
+from match_cache import MatchDataCache
+from storage import CsvMatchStorage, SqliteMatchStorage
+
+COLUMNS = ['日付', 'チーム名', '得点']
+
+
+def csv_reads():
+    state = metrics.STAGE_SECONDS._values.get(('csv_read',))
+    return state[2] if state else 0
+
+
+@pytest.mark.parametrize('backend', ['csv', 'sqlite'])
+def test_cache_miss_times_one_read(backend, tmp_path):
+    if backend == 'csv':
+        storage = CsvMatchStorage(str(tmp_path / 'matches.csv'), COLUMNS)
+    else:
+        storage = SqliteMatchStorage(str(tmp_path / 'matches.db'), COLUMNS)
+    storage.insert_many([{'日付': '2025-08-01', 'チーム名': '阪神', '得点': 3}])
+    cache = MatchDataCache(storage, ['チーム名'])
+    before = csv_reads()
+    df = cache.get()
+    assert csv_reads() == before + 1
+    cache.get()
+    assert csv_reads() == before + 1
+    assert df['日付'].dtype.kind == 'M' and list(df['得点']) == [3]
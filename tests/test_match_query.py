@@ -0,0 +1,56 @@
+import pandas as pd
+
+from match_query import frame_rows
+
+
+def test_frame_rows_fills_missing_in_object_columns():
+    df = pd.DataFrame({'試合時間': pd.Series(['3:01', None], dtype=object), '得点': [3.0, None]})
+    rows = list(frame_rows(df, ['試合時間', '得点', 'なし'], missing=''))
+    assert rows == [('3:01', 3.0, ''), ('', '', '')]
+
+
+def test_pages_after_manual_record_on_sqlite(app_module, client):
+    assert app_module.MATCH_STORAGE_BACKEND == 'sqlite'
+    # 試合時間・コメントが文字列の試合と、手動記録（どちらも 0）が混ざると object 型のカラムになる
+    row = {col: 0 for col in app_module.CSV_HEADERS}
+    row.update({'日付': '2025-07-31', 'チーム名': '阪神', 'ホーム/ビジター': 'ホーム', '相手チーム': '巨人',
+                '得点': 4, '失点': 1, '勝敗': '勝', 'URL': '/scores/2025/0731/t-g-01/',
+                '試合時間': '3:01', '入場者数': 42600, 'コメント': '完投', '試合時間_分': 181})
+    app_module.match_storage.insert_many([row])
+    response = client.post('/record_manual', data={
+        'date': '2025-08-01', 'home_team': '阪神', 'away_team': '巨人',
+        'home_score': '3', 'away_score': '2',
+    })
+    assert response.status_code == 302
+    assert app_module.match_cache.get()['試合時間'].dtype == object
+    for path in ('/summary', '/results', '/api/matches'):
+        assert client.get(path).status_code == 200, path
+
+
+def test_api_row_id_deletes_that_match_on_sqlite(app_module, client):
+    storage = app_module.match_storage
+    row = {col: 0 for col in app_module.CSV_HEADERS}
+    row.update({'チーム名': 'ロッテ', 'ホーム/ビジター': 'ホーム', '相手チーム': '西武', '勝敗': '勝', 'URL': '手動入力'})
+    storage.insert_many([{**row, '日付': f'2025-05-0{day}'} for day in (1, 2, 3)])
+    matches = client.get('/api/matches?team=ロッテ&sort=date').get_json()['matches']
+    first, last = matches[0]['row_id'], matches[-1]['row_id']
+    # 前の行を消しても、一覧で受け取った row_id は同じ試合を指したまま
+    assert client.post(f'/delete_match/{first}').status_code == 302
+    assert storage.get(last)['日付'] == '2025-05-03'
+    assert client.post(f'/delete_match/{last}').status_code == 302
+    remaining = client.get('/api/matches?team=ロッテ').get_json()['matches']
+    assert [m['日付'] for m in remaining] == ['2025-05-02']
+
+
+def test_api_returns_counts_as_ints(app_module, client):
+    row = {col: 0 for col in app_module.CSV_HEADERS}
+    row.update({'日付': '2025-06-01', 'チーム名': 'オリックス', 'ホーム/ビジター': 'ホーム', '相手チーム': '楽天',
+                '得点': 5, '失点': 2, '勝敗': '勝', 'URL': '手動入力', '試合時間': '', 'コメント': ''})
+    # 入場者数が欠損の試合があると、そのカラムは float で読み込まれる
+    app_module.match_storage.insert_many([row, {**row, '日付': '2025-06-02', '入場者数': None}])
+    matches = client.get('/api/matches?team=オリックス&sort=date').get_json()['matches']
+    assert [m['入場者数'] for m in matches] == [0, None]
+    for match in matches:
+        for col in ('得点', '失点'):
+            assert type(match[col]) is int, col
+    assert type(matches[0]['入場者数']) is int
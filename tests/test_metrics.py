@@ -0,0 +1,21 @@
+import re
+
+LABELS = '{route="/about",method="GET",status="200"}'
+
+
+def request_count(text):
+    m = re.search(r'^baseball_http_request_duration_seconds_count' + re.escape(LABELS) + r' (\d+)$', text, re.M)
+    return int(m.group(1)) if m else 0
+
+
+def test_metrics_exposes_request_count_and_latency(client):
+    before = request_count(client.get('/metrics').get_data(as_text=True))
+    assert client.get('/about').status_code == 200
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    text = response.get_data(as_text=True)
+    assert '# TYPE baseball_http_request_duration_seconds histogram' in text
+    assert request_count(text) == before + 1
+    assert 'baseball_http_request_duration_seconds_bucket{route="/about",method="GET",status="200",le="+Inf"}' in text
+    assert 'baseball_http_request_duration_seconds_sum' + LABELS in text
@@ -0,0 +1,29 @@
+def record(app_module, date, opponent):
+    row = {col: 0 for col in app_module.CSV_HEADERS}
+    row.update({'日付': date, 'チーム名': '広島', 'ホーム/ビジター': 'ホーム', '相手チーム': opponent,
+                '得点': 3, '失点': 1, '勝敗': '勝', 'URL': '手動入力', '試合時間': '', 'コメント': ''})
+    app_module.match_storage.insert_many([row])
+
+
+def test_recording_a_match_changes_cached_summary(app_module, client):
+    record(app_module, '2026-09-01', '描画確認A')
+    first = client.get('/summary')
+    hits = app_module.render_cache.hits
+    again = client.get('/summary')
+    assert again.data == first.data and again.headers['ETag'] == first.headers['ETag']
+    assert app_module.render_cache.hits > hits
+
+    record(app_module, '2026-09-02', '描画確認B')
+    after = client.get('/summary')
+    assert '描画確認B' in after.get_data(as_text=True)
+    assert after.headers['ETag'] != first.headers['ETag']
+
+
+def test_matching_if_none_match_gets_304(app_module, client):
+    first = client.get('/summary')
+    response = client.get('/summary', headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 304 and response.data == b''
+    assert response.headers['ETag'] == first.headers['ETag']
+
+    record(app_module, '2026-09-03', '描画確認C')
+    assert client.get('/summary', headers={'If-None-Match': first.headers['ETag']}).status_code == 200
@@ -0,0 +1,75 @@
+import pandas as pd
+
+import player_ledger
+from player_ledger import TOMBSTONE, PlayerGameLedger
+from player_store import PlayerStatsStore
+
+COLUMNS = ['選手名', 'チーム名', '打数', '安打']
+
+
+def make_ledger(tmp_path):
+    store = PlayerStatsStore(str(tmp_path / 'batters_stats.csv'), COLUMNS)
+    return PlayerGameLedger(str(tmp_path / 'batters_games.csv'), store)
+
+
+def rollup(ledger, season=None):
+    df = ledger.rollup(season)
+    return {(r['選手名'], r['チーム名']): (r['打数'], r['安打']) for r in df.to_dict(orient='records')}
+
+
+def totals(store):
+    df = store.read_all()
+    return {(r['選手名'], r['チーム名']): (r['打数'], r['安打']) for r in df.to_dict(orient='records')}
+
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_rerecord_and_remove_append_tombstones(tmp_path):
+    ledger = make_ledger(tmp_path)
+    ledger.record_games([
+        ('/scores/2025/0401/g-t-01/', '2025-04-01', '阪神', [{'選手名': '近本', '打数': 4, '安打': 2}]),
+        ('/scores/2025/0401/g-t-01/', '2025-04-01', '巨人', [{'選手名': '岡本', '打数': 4, '安打': 1}]),
+        ('/scores/2025/0402/g-t-02/', '2025-04-02', '阪神', [{'選手名': '近本', '打数': 5, '安打': 1}]),
+    ])
+    before = read_bytes(ledger.ledger_path)
+
+    # 再取得（同じ URL・チーム名）と削除は、台帳CSVの末尾への追記だけで反映する
+    ledger.record_game('/scores/2025/0401/g-t-01/', '2025-04-01', '阪神', [{'選手名': '近本', '打数': 3, '安打': 3}])
+    ledger.remove_game('/scores/2025/0401/g-t-01/', '巨人')
+    assert read_bytes(ledger.ledger_path).startswith(before)
+
+    expected = {('近本', '阪神'): (8, 4)}
+    assert rollup(ledger) == expected
+    assert totals(ledger.totals_store) == expected
+    assert not ledger.has_game('/scores/2025/0401/g-t-01/', '巨人')
+    assert ledger.has_game('/scores/2025/0401/g-t-01/', '阪神')
+
+    # 別のプロセス（新しいインスタンス）が読み込んでも取消行が反映される
+    reloaded = make_ledger(tmp_path)
+    assert rollup(reloaded) == expected
+    assert rollup(reloaded, 2025) == expected
+    assert TOMBSTONE not in set(reloaded.read_all()['日付'])
+    assert reloaded.seasons() == ['2025']
+
+
+def test_record_after_remove_keeps_new_rows(tmp_path):
+    ledger = make_ledger(tmp_path)
+    game = ('/scores/2025/0401/g-t-01/', '2025-04-01', '阪神', [{'選手名': '近本', '打数': 4, '安打': 2}])
+    ledger.record_games([game])
+    ledger.remove_game(game[0])
+    ledger.record_games([game])
+    assert rollup(make_ledger(tmp_path)) == {('近本', '阪神'): (4, 2)}
+
+
+def test_ledger_is_compacted_after_compact_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(player_ledger, 'COMPACT_ROWS', 4)
+    ledger = make_ledger(tmp_path)
+    for hits in range(4):
+        ledger.record_game('/scores/2025/0401/g-t-01/', '2025-04-01', '阪神', [{'選手名': '近本', '打数': 4, '安打': hits}])
+    rows = pd.read_csv(ledger.ledger_path, encoding='utf-8-sig', dtype=str)
+    # 取り除いた3行と取消行3行で COMPACT_ROWS を超えたので、残っている1行だけで書き直されている
+    assert len(rows) == 1 and TOMBSTONE not in set(rows['日付'])
+    assert rollup(make_ledger(tmp_path)) == {('近本', '阪神'): (4, 3)}
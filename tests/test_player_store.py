@@ -0,0 +1,71 @@
+import os
+
+import pandas as pd
+
+import player_store
+from player_store import PlayerStatsStore
+
+COLUMNS = ['選手名', 'チーム名', '打数', '安打']
+
+
+def totals(store):
+    df = store.read_all()
+    return {(r['選手名'], r['チーム名']): (r['打数'], r['安打']) for r in df.to_dict(orient='records')}
+
+
+def test_apply_batch_appends_deltas_without_rewriting_totals(tmp_path):
+    path = str(tmp_path / 'batters_stats.csv')
+    pd.DataFrame([['近本', '阪神', 100, 30]], columns=COLUMNS).to_csv(path, index=False, encoding='utf-8-sig')
+    store = PlayerStatsStore(path, COLUMNS)
+    stamp = os.stat(path).st_mtime_ns
+
+    store.apply_batch([{'選手名': '近本', '打数': 4, '安打': 2}, {'選手名': '森下', '打数': 3, '安打': 1}], '阪神')
+    store.apply_batch([{'選手名': '近本', '打数': 5, '安打': 1}], '阪神', sign=-1)
+
+    assert os.stat(path).st_mtime_ns == stamp
+    assert len(pd.read_csv(store.delta_path, encoding='utf-8-sig')) == 3
+    expected = {('近本', '阪神'): (99, 31), ('森下', '阪神'): (3, 1)}
+    assert totals(store) == expected
+    # 別のプロセス（新しいインスタンス）からも通算CSV + 差分ログで同じ値になる
+    assert totals(PlayerStatsStore(path, COLUMNS)) == expected
+
+    store.compact()
+    assert not os.path.exists(store.delta_path)
+    assert totals(PlayerStatsStore(path, COLUMNS)) == expected
+
+
+def test_deltas_are_folded_in_after_compact_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(player_store, 'COMPACT_ROWS', 3)
+    path = str(tmp_path / 'batters_stats.csv')
+    store = PlayerStatsStore(path, COLUMNS)
+    for _ in range(3):
+        store.apply_batch([{'選手名': '岡本', '打数': 4, '安打': 1}], '巨人')
+    assert os.path.exists(store.delta_path) and not os.path.exists(path)
+    store.apply_batch([{'選手名': '岡本', '打数': 4, '安打': 1}], '巨人')
+    assert os.path.exists(path) and not os.path.exists(store.delta_path)
+    assert totals(PlayerStatsStore(path, COLUMNS)) == {('岡本', '巨人'): (16, 4)}
+
+
+def test_drop_keys_and_replace_all_clear_deltas(tmp_path):
+    path = str(tmp_path / 'batters_stats.csv')
+    store = PlayerStatsStore(path, COLUMNS)
+    store.apply_batch([{'選手名': '岡本', '打数': 4, '安打': 1}, {'選手名': '坂本', '打数': 3, '安打': 0}], '巨人')
+    store.drop_keys({('坂本', '巨人')})
+    assert not os.path.exists(store.delta_path)
+    assert totals(PlayerStatsStore(path, COLUMNS)) == {('岡本', '巨人'): (4, 1)}
+
+
+def test_apply_batch_updates_cached_totals_in_place(tmp_path):
+    path = str(tmp_path / 'batters_stats.csv')
+    pd.DataFrame([['近本', '阪神', 100, 30], ['中野', '阪神', 90, 25]], columns=COLUMNS).to_csv(
+        path, index=False, encoding='utf-8-sig')
+    store = PlayerStatsStore(path, COLUMNS)
+    before = store.read_all()
+    cached = store._df
+
+    store.apply_batch([{'選手名': '中野', '打数': 4, '安打': 2}], '阪神')
+    assert store._df is cached
+    assert (store._df.dtypes == 'int64').all()
+    # 先に返した DataFrame は書き換わらない
+    assert before.to_dict(orient='records')[1] == {'選手名': '中野', 'チーム名': '阪神', '打数': 90, '安打': 25}
+    assert totals(store) == {('近本', '阪神'): (100, 30), ('中野', '阪神'): (94, 27)}
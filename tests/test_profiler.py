@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+import profiler
+
+
+def test_profile_file_header_only_for_token_requests(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler, 'PROFILE_DIR', str(tmp_path))
+    monkeypatch.setattr(profiler, 'PROFILE_TOKEN', 'secret')
+    monkeypatch.setattr(profiler, 'PROFILE_SAMPLE_RATE', 1.0)
+
+    sampled = client.get('/api/matches?limit=1')
+    assert 'X-Profile-File' not in sampled.headers
+    wrong = client.get('/api/matches?limit=1', headers={'X-Profile': 'wrong'})
+    assert 'X-Profile-File' not in wrong.headers
+    assert len(os.listdir(tmp_path)) == 2
+
+    authorized = client.get('/api/matches?limit=1', headers={'X-Profile': 'secret'})
+    assert os.path.exists(authorized.headers['X-Profile-File'])
+    assert len(os.listdir(tmp_path)) == 3
+
+
+def test_authorized(monkeypatch):
+    monkeypatch.setattr(profiler, 'PROFILE_TOKEN', '')
+    assert not profiler.authorized({'X-Profile': ''}, {})
+    monkeypatch.setattr(profiler, 'PROFILE_TOKEN', 'secret')
+    assert profiler.authorized({}, {'_profile': 'secret'})
+    assert not profiler.authorized({'X-Profile': 'secre'}, {})
+
+
+def test_non_ascii_token_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(profiler, 'PROFILE_TOKEN', 'secret')
+    monkeypatch.setattr(profiler, 'PROFILE_SAMPLE_RATE', 0.0)
+    assert not profiler.authorized({}, {'_profile': 'あ'})
+    assert client.get('/api/matches?limit=1&_profile=%E3%81%82').status_code == 200
+
+
+def test_sampler_stops_when_view_raises(app_module, client, tmp_path, monkeypatch):
+    samplers = []
+
+    class RecordingSampler(profiler.StackSampler):
+        def start(self):
+            samplers.append(self)
+            return super().start()
+
+    def fail(query):
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr(profiler, 'PROFILE_DIR', str(tmp_path))
+    monkeypatch.setattr(profiler, 'PROFILE_SAMPLE_RATE', 1.0)
+    monkeypatch.setattr(profiler, 'StackSampler', RecordingSampler)
+    monkeypatch.setattr(app_module.match_index, 'query', fail)
+    with pytest.raises(RuntimeError):
+        client.get('/api/matches')
+    assert len(samplers) == 1
+    assert samplers[0]._stop.is_set() and not samplers[0]._thread.is_alive()
+    assert len(os.listdir(tmp_path)) == 1
@@ -0,0 +1,37 @@
+import threading
+
+import get_match_url_from_schedule_patch as schedule
+
+SCHEDULE_HTML = ('<table><tr id="date0801"><th>8/1</th><td><div class="team1">中日</div>'
+                 '<div class="team2">DeNA</div><a href="/scores/2025/0801/d-db-01/">試合結果</a></td></tr></table>')
+
+
+def test_games_on_does_not_wait_for_fetch(tmp_path, monkeypatch):
+    index = schedule.ScheduleIndex(str(tmp_path))
+    index.month(2025, 8, fetch=False)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_fetch(year, month):
+        calls.append((year, month))
+        started.set()
+        release.wait(5)
+        return SCHEDULE_HTML
+
+    monkeypatch.setattr(schedule, 'fetch_schedule_html', slow_fetch)
+    monkeypatch.setattr(schedule, 'schedule_ttl', lambda year, month: 600)
+    fetchers = [threading.Thread(target=index.month, args=(2025, 8)) for _ in range(3)]
+    for t in fetchers:
+        t.start()
+    assert started.wait(5)
+    # 取得中でも保存済みのインデックスはすぐに読める（まだ何もないので空）
+    reader = threading.Thread(target=index.games_on, args=('2025-08-01',))
+    reader.start()
+    reader.join(1)
+    assert not reader.is_alive()
+    release.set()
+    for t in fetchers:
+        t.join(5)
+    assert calls == [(2025, 8)]
+    assert index.lookup('2025-08-01', 'DeNA') == ('/scores/2025/0801/d-db-01/box.html', 'ビジター', '中日')
+    assert [g['home'] for g in index.games_on('2025-08-01')] == ['中日']
@@ -0,0 +1,131 @@
+import pytest
+
+import box_cache
+import fixtures
+import get_match_url_from_schedule_patch as schedule
+import http_cache
+import http_client
+from http_client import HttpClient
+
+TEAM = '中日ドラゴンズ'
+
+
+@pytest.fixture
+def use_standin(app_module, tmp_path, monkeypatch):
+    """アプリの共有クライアント・キャッシュを、スタンドインサーバーと一時ディレクトリに向ける関数"""
+    def use(server, **options):
+        options = {'min_interval': 0, 'backoff': 0.01, **options}
+        monkeypatch.setattr(http_client, '_client', HttpClient(base_url=server.base_url, **options))
+        monkeypatch.setattr(http_cache, '_cache', http_cache.HttpCache(str(tmp_path / 'http_cache')))
+        monkeypatch.setattr(box_cache, '_cache', box_cache.BoxScoreCache(str(tmp_path / 'box_cache')))
+        monkeypatch.setattr(schedule, '_schedule_index', schedule.ScheduleIndex(str(tmp_path / 'schedule_index')))
+        return server
+    return use
+
+
+def chunichi_game(month):
+    """スタンドインの日程で中日がその月に最初に試合をする (日付, box.html のパス, ホーム/ビジター)"""
+    for day, game_no, home, away in fixtures.season_games(2025, month):
+        if '中日' in (home, away):
+            return (f'2025-{month:02d}-{day:02d}', fixtures.box_path(2025, month, day, game_no) + 'box.html',
+                    'ホーム' if home == '中日' else 'ビジター')
+
+
+def stored_matches(app_module, url):
+    df = app_module.match_storage.read_all()
+    return df[df['URL'] == url].to_dict(orient='records')
+
+
+def batter_totals(app_module):
+    df = app_module.batter_store.read_all()
+    df = df[df['チーム名'] == TEAM]
+    return {r['選手名']: (r['打数'], r['安打']) for r in df.to_dict(orient='records')}
+
+
+def ledger_rows(app_module, url):
+    df = app_module.batter_ledger.read_all()
+    return df[df['URL'] == url]
+
+
+def test_records_match_and_player_totals(app_module, standin, use_standin):
+    server = use_standin(standin())
+    date, path, status = chunichi_game(4)
+    url, home_away = schedule.get_match_url_from_schedule(date, TEAM, app_module.TEAM_NAME_MAPPING_NPB)
+    assert (url, home_away) == (path, status)
+
+    before = batter_totals(app_module)
+    ok, message = app_module.scrape_and_record_match_from_url(url, TEAM, home_away)
+    assert ok, message
+
+    full_url = server.base_url + path
+    rows = stored_matches(app_module, full_url)
+    assert len(rows) == 1
+    assert str(rows[0]['日付'])[:10] == date and rows[0]['ホーム/ビジター'] == status
+    batters, pitchers = app_module.scrape_player_stats_from_box(url, home_away)
+    assert batters and pitchers and all(b['選手名'].startswith('中日') for b in batters)
+    assert len(ledger_rows(app_module, full_url)) == len(batters)
+    after = batter_totals(app_module)
+    for b in batters:
+        at_bats, hits = before.get(b['選手名'], (0, 0))
+        assert after[b['選手名']] == (at_bats + b['打数'], hits + b['安打'])
+
+
+def test_rerecording_same_url_does_not_double_count(app_module, standin, use_standin):
+    server = use_standin(standin())
+    date, path, status = chunichi_game(5)
+    ok, message = app_module.record_match_job(date, TEAM)
+    assert ok, message
+    after_first = batter_totals(app_module)
+
+    ok, message = app_module.scrape_and_record_match_from_url(path, TEAM, status, comment='再取得')
+    assert ok, message
+    full_url = server.base_url + path
+    rows = stored_matches(app_module, full_url)
+    assert len(rows) == 1 and rows[0]['コメント'] == '再取得'
+    batters, _ = app_module.scrape_player_stats_from_box(path, status)
+    assert len(ledger_rows(app_module, full_url)) == len(batters)
+    assert batter_totals(app_module) == after_first
+
+
+def test_missing_schedule_entry(app_module, standin, use_standin):
+    use_standin(standin())
+    # スタンドインの日程は各月28日まで
+    assert schedule.get_match_url_from_schedule('2025-04-29', TEAM, app_module.TEAM_NAME_MAPPING_NPB) == (None, None)
+    ok, message = app_module.record_match_job('2025-04-29', TEAM)
+    assert not ok and '見つかりませんでした' in message
+
+
+def test_recovers_from_transient_5xx(app_module, standin, use_standin):
+    # seed=1 では最初の日程ページのリクエストが 503 になり、再試行で取れる
+    server = use_standin(standin(error_rate=0.5, seed=1), retries=3)
+    date, path, _ = chunichi_game(6)
+    ok, message = app_module.record_match_job(date, TEAM)
+    assert ok, message
+    assert server.errors >= 1
+    assert len(stored_matches(app_module, server.base_url + path)) == 1
+
+
+def test_gives_up_after_repeated_5xx(app_module, standin, use_standin):
+    server = use_standin(standin(error_rate=1.0), retries=2)
+    date, path, status = chunichi_game(7)
+    before = batter_totals(app_module)
+    ok, message = app_module.scrape_and_record_match_from_url(path, TEAM, status)
+    assert not ok and '取得できませんでした' in message
+    assert server.requests == server.errors == 3
+    assert app_module.scrape_player_stats_from_box(path, status) == ([], [])
+    # 日程ページが取れない場合は、試合が見つからなかったものとして扱う
+    ok, message = app_module.record_match_job(date, TEAM)
+    assert not ok and '見つかりませんでした' in message
+    full_url = server.base_url + path
+    assert stored_matches(app_module, full_url) == []
+    assert ledger_rows(app_module, full_url).empty
+    assert batter_totals(app_module) == before
+
+
+def test_gives_up_after_timeouts(app_module, standin, use_standin):
+    server = use_standin(standin(hang_rate=1.0, hang_seconds=0.5), retries=1, timeout=0.1)
+    _, path, status = chunichi_game(8)
+    ok, message = app_module.scrape_and_record_match_from_url(path, TEAM, status)
+    assert not ok and '取得できませんでした' in message
+    assert server.hangs == 2
+    assert stored_matches(app_module, server.base_url + path) == []
@@ -0,0 +1,85 @@
+import pytest
+
+from storage import CsvMatchStorage, SqliteMatchStorage, create_match_storage
+
+COLUMNS = ['日付', 'チーム名', '相手チーム', '得点', '入場者数', 'コメント']
+
+
+def make_storage(backend, tmp_path):
+    if backend == 'csv':
+        return CsvMatchStorage(str(tmp_path / 'matches.csv'), COLUMNS, integer_columns=['入場者数'])
+    return SqliteMatchStorage(str(tmp_path / 'matches.db'), COLUMNS, integer_columns=['入場者数'])
+
+
+def match(day, team='阪神', runs=3):
+    return {'日付': f'2025-08-{day:02d}', 'チーム名': team, '相手チーム': '巨人', '得点': runs,
+            '入場者数': 42000.0, 'コメント': ''}
+
+
+@pytest.fixture(params=['csv', 'sqlite'])
+def storage(request, tmp_path):
+    return make_storage(request.param, tmp_path)
+
+
+def test_read_all_index_is_row_id(storage):
+    storage.insert_many([match(1), match(2), match(3)])
+    df = storage.read_all()
+    assert [storage.get(row_id)['日付'] for row_id in df.index] == list(df['日付'])
+    assert list(df['入場者数']) == [42000] * 3
+
+
+def test_update_delete_and_find(storage):
+    storage.insert_many([match(1), match(2), match(3)])
+    row_id = storage.find_row_id('2025-08-02', '阪神')
+    assert storage.update(row_id, {'コメント': '逆転勝ち'})
+    assert storage.get(row_id)['コメント'] == '逆転勝ち'
+    assert storage.delete(row_id)['日付'] == '2025-08-02'
+    assert storage.find_row_id('2025-08-02', '阪神') is None
+    assert list(storage.read_all()['日付']) == ['2025-08-01', '2025-08-03']
+    assert storage.get(10_000) is None
+    assert not storage.update(10_000, {'コメント': 'x'})
+    assert storage.delete(10_000) is None
+
+
+def test_insert_many_replaces_same_date_and_team(storage):
+    storage.insert_many([match(1, runs=1), match(1, team='巨人')])
+    storage.insert_many([match(1, runs=7)], replace=True)
+    df = storage.read_all()
+    assert sorted(zip(df['チーム名'], df['得点'])) == [('巨人', 3), ('阪神', 7)]
+
+
+def test_version_changes_on_write(storage):
+    before = storage.version()
+    storage.insert_many([match(1)])
+    assert storage.version() != before
+
+
+def test_sqlite_row_id_is_stable(tmp_path):
+    storage = make_storage('sqlite', tmp_path)
+    storage.insert_many([match(1), match(2), match(3)])
+    row_id = storage.find_row_id('2025-08-03', '阪神')
+    # 前の行を消しても（別のワーカーが消した場合も）同じ row_id で同じ試合を指す
+    storage.delete(storage.find_row_id('2025-08-01', '阪神'))
+    assert storage.get(row_id)['日付'] == '2025-08-03'
+    assert storage.delete(row_id)['日付'] == '2025-08-03'
+    assert list(storage.read_all()['日付']) == ['2025-08-02']
+
+
+def test_csv_row_id_is_position(tmp_path):
+    storage = make_storage('csv', tmp_path)
+    storage.insert_many([match(1), match(2), match(3)])
+    storage.delete(0)
+    assert storage.find_row_id('2025-08-03', '阪神') == 1
+    assert list(storage.read_all().index) == [0, 1]
+
+
+def test_sqlite_imports_matches_csv_only_once(tmp_path):
+    csv_storage = make_storage('csv', tmp_path)
+    csv_storage.insert_many([match(1), match(2)])
+    storage = create_match_storage('sqlite', str(tmp_path), COLUMNS, integer_columns=['入場者数'])
+    assert list(storage.read_all()['日付']) == ['2025-08-01', '2025-08-02']
+    for row_id in list(storage.read_all().index):
+        storage.delete(row_id)
+    # 全試合を削除しても、次の起動で matches.csv を取り込み直さない
+    storage = create_match_storage('sqlite', str(tmp_path), COLUMNS, integer_columns=['入場者数'])
+    assert storage.is_empty()